@@ -0,0 +1,106 @@
+"""
+Benchmark: request throughput under many simultaneous clients.
+
+Starts the API with uvicorn against a throwaway database, registers a user,
+then has N concurrent clients (default 200) hammer a mix of endpoints: login
+(bcrypt), profile reads (async endpoints) and task/employee lists (sync
+endpoints on the threadpool). Reports requests/sec and p50/p95 latency per
+endpoint. A blocking call on the event loop shows up as every endpoint's
+latency climbing together.
+
+    cd ai-brain
+    python benchmarks/bench_concurrency.py                 # 200 clients × 25 requests
+    python benchmarks/bench_concurrency.py 50 10
+    THREADPOOL_SIZE=200 python benchmarks/bench_concurrency.py
+
+Uses MONGO_URI from .env and the database in BENCH_DB_NAME (dropped afterwards).
+STORAGE_BACKEND=memory is passed through to the server, so this also runs
+without MongoDB.
+SECRET_KEY must be set, as for the server itself.
+"""
+import os
+import sys
+import time
+import random
+import subprocess
+import statistics
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from dotenv import load_dotenv
+from pymongo import MongoClient
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PORT = int(os.getenv("BENCH_PORT", "8765"))
+BASE_URL = f"http://127.0.0.1:{PORT}"
+DB_NAME = os.getenv("BENCH_DB_NAME", "ai_project_manager_bench")
+USERNAME, PASSWORD = "bench_user", "bench_password"
+
+def start_server():
+    env = {**os.environ, "MONGO_DB_NAME": DB_NAME, "MONGO_INDEX_CHECK": "off"}
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server:app", "--port", str(PORT), "--log-level", "warning"],
+        cwd=BASE_DIR, env=env
+    )
+    for _ in range(120):  # The LLM/vector clients make startup slow
+        try:
+            if requests.get(f"{BASE_URL}/openapi.json", timeout=1).status_code == 200:
+                return proc
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    proc.terminate()
+    raise RuntimeError("Server did not start")
+
+def login(session: requests.Session) -> str:
+    resp = session.post(f"{BASE_URL}/token", data={"username": USERNAME, "password": PASSWORD})
+    resp.raise_for_status()
+    return resp.json()["access_token"]
+
+def client(n_requests: int):
+    """One simulated user: logs in, then issues a random mix of reads."""
+    timings = defaultdict(list)
+    session = requests.Session()
+    start = time.perf_counter()
+    token = login(session)
+    timings["POST /token"].append(time.perf_counter() - start)
+    headers = {"Authorization": f"Bearer {token}"}
+    for _ in range(n_requests - 1):
+        path = random.choice(["/user/profile", "/tasks", "/employees"])
+        start = time.perf_counter()
+        session.get(f"{BASE_URL}{path}", headers=headers).raise_for_status()
+        timings[f"GET {path}"].append(time.perf_counter() - start)
+    return timings
+
+if __name__ == "__main__":
+    load_dotenv(os.path.join(BASE_DIR, ".env"))
+    n_clients, n_requests = (int(a) for a in sys.argv[1:3]) if len(sys.argv) >= 3 else (200, 25)
+
+    print(f"Starting API on {BASE_URL} with database '{DB_NAME}'...")
+    server = start_server()
+    try:
+        requests.post(f"{BASE_URL}/register", json={"username": USERNAME, "password": PASSWORD})
+
+        print(f"{n_clients} concurrent clients × {n_requests} requests...")
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=n_clients) as pool:
+            results = list(pool.map(client, [n_requests] * n_clients))
+        elapsed = time.perf_counter() - start
+
+        merged = defaultdict(list)
+        for timings in results:
+            for endpoint, samples in timings.items():
+                merged[endpoint].extend(samples)
+        total = sum(len(v) for v in merged.values())
+
+        print(f"total: {total} requests in {elapsed:.1f}s = {total / elapsed:,.0f} req/s")
+        for endpoint, samples in sorted(merged.items()):
+            samples.sort()
+            p95 = samples[int(len(samples) * 0.95) - 1]
+            print(f"  {endpoint:<20} n={len(samples):>6}   p50 {statistics.median(samples) * 1000:7.1f} ms   p95 {p95 * 1000:7.1f} ms")
+    finally:
+        server.terminate()
+        server.wait()
+        if os.getenv("STORAGE_BACKEND", "mongo") == "mongo":
+            MongoClient(os.getenv("MONGO_URI", "mongodb://localhost:27017")).drop_database(DB_NAME)
@@ -0,0 +1,72 @@
+"""
+Benchmark: GET /export/{name} streaming exports.
+
+Seeds a throwaway database with tasks, then drains the NDJSON and CSV export
+generators and reports throughput (docs/sec) and peak Python memory, next to
+the old approach of building the whole list before serializing it.
+
+    cd ai-brain
+    python benchmarks/bench_exports.py            # 100k tasks
+    python benchmarks/bench_exports.py 20000
+
+Uses MONGO_URI from .env and the database in BENCH_DB_NAME (dropped afterwards).
+With STORAGE_BACKEND=memory it runs against an in-process mongomock database
+instead (no MongoDB needed; isolates the Python side from database latency).
+"""
+import os
+import sys
+import json
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["MONGO_DB_NAME"] = os.getenv("BENCH_DB_NAME", "ai_project_manager_bench")
+
+import server
+
+def seed(n_tasks: int, batch: int = 10000):
+    server.tasks_collection.delete_many({})
+    for start in range(0, n_tasks, batch):
+        server.tasks_collection.insert_many([
+            {"name": f"Task {i}", "description": "x" * 200, "status": ("todo", "in_progress", "done")[i % 3],
+             "assigned_to": f"Dev {i % 25}", "epic_id": "", "story_id": "", "estimated_hours": 4, "actual_hours": i % 8,
+             "start_date": "2026-01-05", "due_date": "2026-01-09", "depends_on": []}
+            for i in range(start, min(start + batch, n_tasks))
+        ])
+
+def list_then_serialize():
+    """The previous shape: materialize every document, then serialize the whole list."""
+    all_tasks = []
+    for t in server.tasks_collection.find({}):
+        t["id"] = str(t.pop("_id"))
+        all_tasks.append(t)
+    return len(json.dumps(all_tasks, default=str))
+
+def drain(chunks):
+    return sum(len(c) for c in chunks)
+
+def measure(fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    size = fn()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak, size
+
+if __name__ == "__main__":
+    n_tasks = int(sys.argv[1]) if len(sys.argv) >= 2 else 100000
+
+    print(f"Seeding {n_tasks} tasks into '{os.environ['MONGO_DB_NAME']}'...")
+    seed(n_tasks)
+
+    runs = [
+        ("list + json.dumps", list_then_serialize),
+        ("stream ndjson", lambda: drain(server.iter_export("tasks", "ndjson"))),
+        ("stream csv", lambda: drain(server.iter_export("tasks", "csv"))),
+    ]
+    for label, fn in runs:
+        elapsed, peak, size = measure(fn)
+        print(f"{label:<18} {n_tasks / elapsed:>10,.0f} docs/sec   peak {peak / 1e6:7.1f} MB   {size / 1e6:7.1f} MB out")
+
+    server.storage.drop()
@@ -0,0 +1,103 @@
+"""
+Benchmark: GET /work-breakdown tree builder.
+
+Seeds a throwaway database with epics × stories × tasks, then times the bulk
+(three-query) builder against the previous per-epic / per-story query loop.
+
+    cd ai-brain
+    python benchmarks/bench_work_breakdown.py            # 100 epics × 1k stories × 20k tasks
+    python benchmarks/bench_work_breakdown.py 10 100 2000
+
+Uses MONGO_URI from .env and the database in BENCH_DB_NAME (dropped afterwards).
+With STORAGE_BACKEND=memory it runs against an in-process mongomock database
+instead (no MongoDB needed; isolates the Python side from database latency).
+"""
+import os
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["MONGO_DB_NAME"] = os.getenv("BENCH_DB_NAME", "ai_project_manager_bench")
+
+from bson import ObjectId
+import server
+
+def seed(n_epics: int, n_stories: int, n_tasks: int):
+    for coll in (server.epics_collection, server.stories_collection, server.tasks_collection):
+        coll.delete_many({})
+
+    epic_ids = [ObjectId() for _ in range(n_epics)]
+    server.epics_collection.insert_many([
+        {"_id": eid, "name": f"Epic {i}", "description": "", "color": "#6C5DD3", "status": "active"}
+        for i, eid in enumerate(epic_ids)
+    ])
+
+    stories = [{"_id": ObjectId(), "epic_id": str(random.choice(epic_ids)), "name": f"Story {i}", "status": "todo"} for i in range(n_stories)]
+    server.stories_collection.insert_many(stories)
+
+    tasks = []
+    for i in range(n_tasks):
+        if i % 10 == 0:  # Every 10th task hangs directly off an epic
+            tasks.append({"epic_id": str(random.choice(epic_ids)), "story_id": "", "name": f"Task {i}", "status": "todo"})
+        else:
+            story = random.choice(stories)
+            tasks.append({"epic_id": story["epic_id"], "story_id": str(story["_id"]), "name": f"Task {i}", "status": "todo"})
+    server.tasks_collection.insert_many(tasks)
+
+def legacy_work_breakdown():
+    """The previous implementation: one stories query per epic, one tasks query per story."""
+    tree = []
+    for epic in server.epics_collection.find({}):
+        epic_id = str(epic["_id"])
+        epic_node = {"id": epic_id, "name": epic.get("name"), "description": epic.get("description", ""),
+                     "color": epic.get("color", "#6C5DD3"), "status": epic.get("status", "active"), "type": "epic", "stories": []}
+        for story in server.stories_collection.find({"epic_id": epic_id}):
+            story_id = str(story["_id"])
+            story_node = {"id": story_id, "name": story.get("name"), "description": story.get("description", ""),
+                          "story_points": story.get("story_points", 0), "assigned_to": story.get("assigned_to", "Unassigned"),
+                          "status": story.get("status", "todo"), "type": "story", "tasks": []}
+            for task in server.tasks_collection.find({"story_id": story_id}):
+                story_node["tasks"].append({
+                    "id": str(task["_id"]), "name": task.get("name"), "description": task.get("description", ""),
+                    "assigned_to": task.get("assigned_to", "Unassigned"), "status": task.get("status", "todo"),
+                    "due_date": task.get("due_date"), "start_date": task.get("start_date"),
+                    "estimated_hours": task.get("estimated_hours", 0), "actual_hours": task.get("actual_hours", 0),
+                    "depends_on": task.get("depends_on", []), "type": "task"
+                })
+            epic_node["stories"].append(story_node)
+        for task in server.tasks_collection.find({"epic_id": epic_id, "story_id": ""}):
+            epic_node["stories"].append({
+                "id": str(task["_id"]), "name": task.get("name"), "assigned_to": task.get("assigned_to", "Unassigned"),
+                "status": task.get("status", "todo"), "due_date": task.get("due_date"),
+                "start_date": task.get("start_date"), "type": "task"
+            })
+        tree.append(epic_node)
+    return tree
+
+def timed(fn, runs: int = 3):
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+if __name__ == "__main__":
+    n_epics, n_stories, n_tasks = (int(a) for a in sys.argv[1:4]) if len(sys.argv) >= 4 else (100, 1000, 20000)
+
+    print(f"Seeding {n_epics} epics × {n_stories} stories × {n_tasks} tasks into '{os.environ['MONGO_DB_NAME']}'...")
+    seed(n_epics, n_stories, n_tasks)
+
+    bulk_time, bulk_tree = timed(server.build_work_breakdown)
+    legacy_time, legacy_tree = timed(legacy_work_breakdown, runs=1)
+
+    def normalize(tree):  # Order inside a story/epic is not guaranteed across query plans
+        return sorted((e["id"], sorted(str(s) for s in e["stories"])) for e in tree)
+    assert normalize(bulk_tree) == normalize(legacy_tree), "Bulk tree differs from legacy tree"
+
+    print(f"legacy (1 + epics×2 + stories queries): {legacy_time * 1000:8.1f} ms")
+    print(f"bulk   (3 queries):                     {bulk_time * 1000:8.1f} ms")
+    print(f"speedup: {legacy_time / bulk_time:.1f}x")
+
+    server.storage.drop()
@@ -7,9 +7,10 @@ load_dotenv()
 
 # === CONFIGURATION ===
 MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
+MONGO_DB_NAME = os.getenv("MONGO_DB_NAME", "ai_project_manager")
 
 client = MongoClient(MONGO_URI)
-db = client["ai_project_manager"]
+db = client[MONGO_DB_NAME]
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 def create_admin():
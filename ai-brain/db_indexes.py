@@ -0,0 +1,293 @@
+import os
+from datetime import datetime
+from dotenv import load_dotenv
+from pymongo import MongoClient, IndexModel, UpdateOne, ASCENDING, DESCENDING
+from pymongo.errors import OperationFailure, CollectionInvalid
+
+# ==========================================
+# 🔑 NORMALIZED LOOKUP KEYS
+# ==========================================
+# Case-insensitive matches on people/task names go through a casefolded copy of
+# the field ("<field>_key"), written on insert, so they are plain indexed
+# equality lookups instead of unanchored "$regex ... $options: i" scans.
+KEY_FIELDS = {
+    "employees": {"name_key": "name", "email_key": "email"},
+    "time_logs": {"logged_by_key": "logged_by", "task_name_key": "task_name"},
+    "mood_entries": {"username_key": "username"},
+    "commit_logs": {"author_key": "author"},
+}
+
+def normalize_key(value) -> str:
+    """Case- and whitespace-insensitive lookup key for names and emails."""
+    return " ".join(str(value or "").split()).casefold()
+
+def with_keys(collection: str, doc: dict) -> dict:
+    """Adds the normalized key fields for `collection` to a document about to be written."""
+    for key, field in KEY_FIELDS.get(collection, {}).items():
+        if field in doc:
+            doc[key] = normalize_key(doc[field])
+    return doc
+
+def time_series_names(db) -> set:
+    """Names of the existing time-series collections."""
+    try:
+        return {c["name"] for c in db.list_collections(filter={"type": "timeseries"})}
+    except NotImplementedError:
+        return set()  # mongomock (STORAGE_BACKEND=memory): no listCollections, and no time-series either
+
+def backfill_keys(db, batch_size: int = 1000):
+    """
+    Fills key fields on documents written before they existed. Only touches documents missing one.
+    Time-series collections are skipped: their documents get keys on insert (or from
+    migrate_timeseries.py, which computes them while copying), and before MongoDB 7.0
+    updates there may only touch the metaField.
+    """
+    time_series = time_series_names(db)
+    filled = 0
+    for collection, keys in KEY_FIELDS.items():
+        if collection in time_series:
+            continue
+        missing = {"$or": [{key: {"$exists": False}} for key in keys]}
+        projection = {field: 1 for field in keys.values()}
+        ops = []
+        for doc in db[collection].find(missing, projection):
+            ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": {key: normalize_key(doc.get(field)) for key, field in keys.items()}}))
+            if len(ops) >= batch_size:
+                filled += db[collection].bulk_write(ops, ordered=False).modified_count
+                ops = []
+        if ops:
+            filled += db[collection].bulk_write(ops, ordered=False).modified_count
+    return filled
+
+# ==========================================
+# ⏳ TIME-SERIES COLLECTIONS
+# ==========================================
+# Append-only event logs, stored as MongoDB time-series collections (6.0+): native
+# datetime `timestamp`, bucketed per person/project (the metaField) for compressed
+# storage and fast time-range scans. The normalized key is the meta so case variants
+# of one name share buckets and per-person queries hit the meta index.
+TIME_SERIES = {
+    "time_logs": {"timeField": "timestamp", "metaField": "logged_by_key", "granularity": "hours"},
+    "mood_entries": {"timeField": "timestamp", "metaField": "username_key", "granularity": "hours"},
+    "commit_logs": {"timeField": "timestamp", "metaField": "author_key", "granularity": "minutes"},
+    "task_events": {"timeField": "timestamp", "metaField": "project_id", "granularity": "minutes"},
+}
+
+# Time-series collections exist from 5.0, but the manifest also indexes measurement fields
+# (task_name_key, timestamp + _id), which needs 6.0. Older servers keep regular collections.
+TIME_SERIES_MIN_VERSION = (6, 0)
+
+def supports_time_series(db) -> bool:
+    return tuple(db.client.server_info()["versionArray"][:2]) >= TIME_SERIES_MIN_VERSION
+
+def ensure_time_series(db):
+    """Creates missing time-series collections. Existing regular ones are left for migrate_timeseries.py."""
+    if not supports_time_series(db):
+        print(f"⚠️ MongoDB < {'.'.join(map(str, TIME_SERIES_MIN_VERSION))}: event logs stay regular collections")
+        return
+    existing = {c["name"]: c for c in db.list_collections(filter={"name": {"$in": list(TIME_SERIES)}})}
+    for name, spec in TIME_SERIES.items():
+        if name not in existing:
+            try:
+                db.create_collection(name, timeseries=spec)
+            except (CollectionInvalid, OperationFailure) as e:
+                print(f"⚠️ Could not create time-series collection '{name}': {e}")
+        elif existing[name].get("type") != "timeseries":
+            print(f"⚠️ '{name}' is a regular collection; run 'python migrate_timeseries.py' to convert it")
+
+# ==========================================
+# 📇 INDEX MANIFEST
+# ==========================================
+# Every index the API relies on, per collection. Applied idempotently at startup
+# (create_indexes is a no-op for indexes that already exist).
+INDEX_MANIFEST = {
+    "users": [
+        IndexModel([("username", ASCENDING)], unique=True),
+    ],
+    "chats": [
+        IndexModel([("session_id", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)]),
+    ],
+    "system_chats": [
+        IndexModel([("session_id", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)]),
+    ],
+    "chats_archive": [
+        IndexModel([("session_id", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)]),
+    ],
+    "tasks": [
+        IndexModel([("sprint_id", ASCENDING), ("status", ASCENDING)]),
+        IndexModel([("status", ASCENDING)]),
+        IndexModel([("story_id", ASCENDING), ("_id", ASCENDING)]),
+        IndexModel([("epic_id", ASCENDING), ("story_id", ASCENDING), ("_id", ASCENDING)]),
+        IndexModel([("start_date", ASCENDING), ("due_date", ASCENDING)]),
+        IndexModel([("updated_at", ASCENDING)]),
+        IndexModel([("due_date", ASCENDING)]),
+    ],
+    "stories": [
+        IndexModel([("epic_id", ASCENDING), ("_id", ASCENDING)]),
+    ],
+    "sprints": [
+        IndexModel([("status", ASCENDING), ("created_at", DESCENDING)]),
+        IndexModel([("project_id", ASCENDING)]),
+        IndexModel([("updated_at", ASCENDING)]),
+    ],
+    "employees": [
+        IndexModel([("name_key", ASCENDING), ("_id", ASCENDING)]),
+        IndexModel([("email_key", ASCENDING)]),
+    ],
+    "time_logs": [
+        IndexModel([("task_name_key", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)]),
+        IndexModel([("logged_by_key", ASCENDING), ("timestamp", DESCENDING)]),
+        IndexModel([("timestamp", DESCENDING)]),
+    ],
+    "mood_entries": [
+        IndexModel([("timestamp", DESCENDING)]),
+        IndexModel([("username_key", ASCENDING), ("timestamp", DESCENDING)]),
+    ],
+    "commit_logs": [
+        IndexModel([("timestamp", DESCENDING), ("_id", DESCENDING)]),
+        IndexModel([("author_key", ASCENDING), ("timestamp", DESCENDING)]),
+    ],
+    "risks": [
+        IndexModel([("project_id", ASCENDING), ("risk_score", DESCENDING), ("_id", DESCENDING)]),
+        IndexModel([("project_id", ASCENDING), ("status", ASCENDING), ("risk_score", DESCENDING), ("_id", DESCENDING)]),
+        IndexModel([("project_id", ASCENDING), ("status", ASCENDING), ("subject_type", ASCENDING), ("subject_id", ASCENDING)]),
+        # One row per detected condition; legacy rows without a fingerprint are exempt
+        IndexModel([("project_id", ASCENDING), ("fingerprint", ASCENDING)], unique=True,
+                   partialFilterExpression={"fingerprint": {"$exists": True}}),
+    ],
+    "approvals": [
+        IndexModel([("timestamp", DESCENDING)]),
+    ],
+    "task_events": [
+        IndexModel([("project_id", ASCENDING), ("timestamp", DESCENDING)]),
+    ],
+    "task_status_daily": [
+        IndexModel([("project_id", ASCENDING), ("scope", ASCENDING), ("day", ASCENDING)]),
+    ],
+    "time_log_daily": [
+        IndexModel([("task_name_key", ASCENDING), ("day", ASCENDING)]),
+        IndexModel([("logged_by_key", ASCENDING), ("day", ASCENDING)]),
+        IndexModel([("day", ASCENDING)]),
+    ],
+    "commit_daily": [
+        IndexModel([("day", ASCENDING), ("author_key", ASCENDING)]),
+        IndexModel([("author_key", ASCENDING), ("day", ASCENDING)]),
+    ],
+    "trello_card_states": [
+        IndexModel([("project_id", ASCENDING), ("card_id", ASCENDING)], unique=True,
+                   partialFilterExpression={"card_id": {"$exists": True}}),
+    ],
+}
+
+# TTL indexes: collection -> (date field, seconds). 0 disables expiry. Kept apart from the
+# manifest because the lifetime is configurable and must be changed with collMod.
+SYSTEM_CHAT_TTL_DAYS = int(os.getenv("SYSTEM_CHAT_TTL_DAYS", "30"))
+TTL_INDEXES = {
+    "system_chats": ("timestamp", SYSTEM_CHAT_TTL_DAYS * 86400),
+}
+
+def ensure_ttl_indexes(db):
+    for collection, (field, seconds) in TTL_INDEXES.items():
+        current = next((i for i in db[collection].list_indexes() if dict(i["key"]) == {field: 1}), None)
+        try:
+            if not seconds:
+                if current and "expireAfterSeconds" in current:
+                    db[collection].drop_index(current["name"])
+            elif current is None:
+                db[collection].create_index([(field, ASCENDING)], expireAfterSeconds=seconds)
+            elif current.get("expireAfterSeconds") != seconds:
+                db.command("collMod", collection, index={"keyPattern": {field: 1}, "expireAfterSeconds": seconds})
+        except OperationFailure as e:
+            print(f"⚠️ TTL index update failed on '{collection}': {e}")
+
+# Hot queries: (collection, filter, sort). Each must be served by an index.
+HOT_QUERIES = [
+    ("users", {"username": "probe"}, None),
+    ("chats", {"session_id": "probe"}, [("timestamp", -1), ("_id", -1)]),
+    ("system_chats", {"session_id": "system_probe"}, [("timestamp", -1), ("_id", -1)]),
+    ("chats_archive", {"session_id": "probe"}, [("timestamp", -1), ("_id", -1)]),
+    ("tasks", {"sprint_id": "probe"}, None),
+    ("tasks", {"sprint_id": "probe", "status": "done"}, None),
+    ("tasks", {"status": {"$ne": "done"}}, None),
+    ("tasks", {"story_id": "probe"}, None),
+    ("tasks", {"epic_id": "probe", "story_id": ""}, None),
+    ("tasks", {"start_date": {"$lte": "2000-12-31"}, "due_date": {"$gte": "2000-01-01"}}, None),
+    ("stories", {"epic_id": "probe"}, None),
+    ("sprints", {"status": "active"}, [("created_at", -1)]),
+    ("sprints", {"project_id": "probe"}, None),
+    ("employees", {"name_key": "probe"}, None),
+    ("employees", {}, [("name_key", 1), ("_id", 1)]),
+    ("employees", {"email_key": "probe"}, None),
+    ("time_logs", {"task_name_key": "probe"}, [("timestamp", -1), ("_id", -1)]),
+    ("time_logs", {"logged_by_key": "probe", "timestamp": {"$gte": datetime(2000, 1, 1)}}, None),
+    ("time_logs", {"timestamp": {"$gte": datetime(2000, 1, 1)}}, [("timestamp", -1)]),
+    ("mood_entries", {"timestamp": {"$gte": datetime(2000, 1, 1)}}, [("timestamp", -1)]),
+    ("mood_entries", {"username_key": "probe"}, [("timestamp", -1)]),
+    ("commit_logs", {"timestamp": {"$gte": datetime(2000, 1, 1)}}, [("timestamp", -1), ("_id", -1)]),
+    ("commit_logs", {"author_key": "probe", "timestamp": {"$gte": datetime(2000, 1, 1)}}, [("timestamp", -1)]),
+    ("risks", {"project_id": "probe"}, [("risk_score", -1), ("_id", -1)]),
+    ("risks", {"project_id": "probe", "status": "open"}, [("risk_score", -1), ("_id", -1)]),
+    ("risks", {"project_id": "probe", "fingerprint": "probe"}, None),
+    ("risks", {"project_id": "probe", "status": {"$in": ["open", "mitigated"]}, "subject_type": "task", "subject_id": {"$in": ["probe"]}}, None),
+    ("tasks", {"updated_at": {"$gte": datetime(2000, 1, 1)}}, None),
+    ("tasks", {"due_date": {"$gte": "2000-01-01", "$lte": "2000-01-03"}}, None),
+    ("sprints", {"updated_at": {"$gte": datetime(2000, 1, 1)}}, None),
+    ("approvals", {}, [("timestamp", -1)]),
+    ("task_events", {"project_id": "probe"}, [("timestamp", -1)]),
+    ("task_status_daily", {"project_id": "probe", "scope": "tasks", "day": {"$gte": "2000-01-01"}}, None),
+    ("time_log_daily", {"task_name_key": {"$in": ["probe"]}}, None),
+    ("time_log_daily", {"logged_by_key": {"$in": ["probe"]}, "day": {"$gte": "2000-01-01"}}, None),
+    ("commit_daily", {"day": {"$gte": "2000-01-01"}}, None),
+    ("commit_daily", {"day": {"$gte": "2000-01-01"}, "author_key": "probe"}, None),
+]
+
+def ensure_indexes(db):
+    """Creates every index in INDEX_MANIFEST and syncs TTL_INDEXES. Safe to run on every startup."""
+    for collection, indexes in INDEX_MANIFEST.items():
+        try:
+            db[collection].create_indexes(indexes)
+        except OperationFailure as e:
+            # e.g. duplicate usernames blocking the unique index, or an index with the same name but other options
+            print(f"⚠️ Index creation failed on '{collection}': {e}")
+    ensure_ttl_indexes(db)
+
+def _plan_stages(plan):
+    """All stage names in an explain() plan tree."""
+    stages = [plan.get("stage")]
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            stages += _plan_stages(plan[key])
+    for child in plan.get("inputStages", []):
+        stages += _plan_stages(child)
+    return stages
+
+def find_collscans(db):
+    """Runs explain() on every hot query and returns the ones planned as a COLLSCAN."""
+    offenders = []
+    for collection, query, sort in HOT_QUERIES:
+        cursor = db[collection].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        explained = cursor.explain()
+        if "stages" in explained:  # Time-series finds explain as an aggregation over the buckets
+            explained = explained["stages"][0].get("$cursor", {})
+        winning_plan = explained.get("queryPlanner", {}).get("winningPlan", {})
+        if "COLLSCAN" in _plan_stages(winning_plan):
+            offenders.append(f"{collection}.find({query}){'.sort(' + str(sort) + ')' if sort else ''}")
+    return offenders
+
+def verify_hot_queries(db):
+    """Raises if any registered hot query would scan its whole collection."""
+    offenders = find_collscans(db)
+    if offenders:
+        raise RuntimeError("Hot queries without an index (COLLSCAN):\n  " + "\n  ".join(offenders))
+
+if __name__ == "__main__":
+    load_dotenv()
+    client = MongoClient(os.getenv("MONGO_URI", "mongodb://localhost:27017"))
+    db = client[os.getenv("MONGO_DB_NAME", "ai_project_manager")]
+    ensure_time_series(db)
+    ensure_indexes(db)
+    print(f"🔑 Backfilled lookup keys on {backfill_keys(db)} documents")
+    verify_hot_queries(db)
+    print(f"✅ SUCCESS: {sum(len(i) for i in INDEX_MANIFEST.values())} indexes in place, {len(HOT_QUERIES)} hot queries use them")
@@ -0,0 +1,73 @@
+import os
+import re
+from dotenv import load_dotenv
+from pymongo import MongoClient, UpdateOne
+
+load_dotenv()
+
+# === CONFIGURATION ===
+MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
+MONGO_DB_NAME = os.getenv("MONGO_DB_NAME", "ai_project_manager")
+
+client = MongoClient(MONGO_URI)
+db = client[MONGO_DB_NAME]
+
+def parse_amount(pattern: str, content: str) -> float:
+    match = re.search(pattern, content)
+    if not match:
+        return 0
+    return float(match.group(1).replace("$", "").replace(",", ""))
+
+def parse_approval_message(content: str):
+    """Turns an old '✅ *APPROVED:* ...' dashboard chat message into an approval record."""
+    # Capture text after APPROVED: up until the first newline or emoji
+    name_match = re.search(r"APPROVED:?\*?\*?\s*([^\n\r🚨💰✅💵*]+)", content)
+    if not name_match:
+        return None
+    goal = name_match.group(1).replace("\\n", "").replace("*", "").strip()
+    if not goal:
+        return None
+
+    total_cost = parse_amount(r"Total(?: Project Cost)?:?\*?\*?\s*(\$[\d,.]+)", content)
+
+    # The budget limit is only implied by the remaining/overrun line
+    budget = 0
+    remaining = parse_amount(r"Under Budget:?\*?\*?\s*(\$[\d,.]+)", content)
+    overrun = parse_amount(r"Over Budget by:?\*?\*?\s*(\$[\d,.]+)", content)
+    if remaining:
+        budget = total_cost + remaining
+    elif overrun:
+        budget = total_cost - overrun
+
+    task_count = sum(1 for line in content.split("\n") if line.startswith("Created:"))
+
+    return {"goal": goal, "total_cost": total_cost, "budget": budget, "task_count": task_count}
+
+def backfill_approvals():
+    ops = []
+    # Approval messages live in the system_* partition; older installs still have them in chats
+    messages = [m for coll in (db.chats, db.system_chats) for m in coll.find({"content": {"$regex": "APPROVED:"}})]
+    for msg in messages:
+        record = parse_approval_message(msg.get("content", ""))
+        if not record:
+            continue
+        record.update({
+            "approved_by": "migration",
+            "session_id": msg.get("session_id", ""),
+            "project_id": "default",
+            "timestamp": msg.get("timestamp"),
+            "source_chat_id": msg["_id"]
+        })
+        # Keyed on the source message so re-running the migration is a no-op
+        ops.append(UpdateOne({"source_chat_id": msg["_id"]}, {"$setOnInsert": record}, upsert=True))
+
+    if not ops:
+        print("✅ No approval messages to migrate.")
+        return
+
+    result = db.approvals.bulk_write(ops, ordered=False)
+    db.approvals.create_index([("timestamp", -1)])
+    print(f"✅ SUCCESS: Backfilled {result.upserted_count} approvals ({len(ops) - result.upserted_count} already present)")
+
+if __name__ == "__main__":
+    backfill_approvals()
@@ -0,0 +1,74 @@
+import os
+import sys
+from datetime import datetime
+from dotenv import load_dotenv
+from pymongo import MongoClient
+from db_indexes import TIME_SERIES, TIME_SERIES_MIN_VERSION, supports_time_series, ensure_indexes, with_keys
+
+load_dotenv()
+
+# === CONFIGURATION ===
+MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
+BATCH_SIZE = 1000
+
+client = MongoClient(MONGO_URI)
+db = client[os.getenv("MONGO_DB_NAME", "ai_project_manager")]
+
+def to_datetime(value):
+    """Old mood/commit rows stored "%Y-%m-%d %H:%M" strings; time-series needs real datetimes."""
+    if isinstance(value, datetime):
+        return value
+    for fmt in ("%Y-%m-%d %H:%M", "%Y-%m-%d %H:%M:%S", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(str(value), fmt)
+        except ValueError:
+            continue
+    try:
+        return datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+
+def migrate_collection(name: str, spec: dict, drop_legacy: bool):
+    info = next(db.list_collections(filter={"name": name}), None)
+    if info and info.get("type") == "timeseries":
+        print(f"✅ '{name}' is already a time-series collection.")
+        return
+
+    legacy = None
+    if info:
+        # Regular collections can't be converted in place: move aside, recreate, copy back
+        legacy = f"{name}_legacy_{datetime.now().strftime('%Y%m%d%H%M%S')}"
+        db[name].rename(legacy)
+    db.create_collection(name, timeseries=spec)
+    if not legacy:
+        print(f"✅ Created empty time-series collection '{name}'.")
+        return
+
+    copied, skipped, batch = 0, 0, []
+    for doc in db[legacy].find({}):
+        doc[spec["timeField"]] = to_datetime(doc.get(spec["timeField"]))
+        if doc[spec["timeField"]] is None:
+            skipped += 1
+            continue
+        batch.append(with_keys(name, doc))  # Keys computed here: backfill_keys never updates time-series documents
+        if len(batch) >= BATCH_SIZE:
+            copied += len(db[name].insert_many(batch, ordered=False).inserted_ids)
+            batch = []
+    if batch:
+        copied += len(db[name].insert_many(batch, ordered=False).inserted_ids)
+
+    if drop_legacy and not skipped:
+        db[legacy].drop()
+        legacy_note = "legacy copy dropped"
+    else:
+        legacy_note = f"legacy copy kept as '{legacy}'"
+    print(f"✅ '{name}': copied {copied} documents, skipped {skipped} with unreadable timestamps ({legacy_note})")
+
+if __name__ == "__main__":
+    if not supports_time_series(db):
+        sys.exit(f"❌ Time-series event logs need MongoDB {'.'.join(map(str, TIME_SERIES_MIN_VERSION))}+ (indexes on measurement fields)")
+    drop_legacy = "--drop-legacy" in sys.argv
+    for name, spec in TIME_SERIES.items():
+        migrate_collection(name, spec, drop_legacy)
+    ensure_indexes(db)
+    print("✅ SUCCESS: Event logs are time-series collections with native datetime timestamps")
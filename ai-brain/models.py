@@ -1,5 +1,6 @@
 from pydantic import BaseModel
 from typing import List, Optional
+from datetime import datetime
 
 # ==========================================
 # 🔐 RBAC — ROLES
@@ -190,6 +191,11 @@ class DashboardStats(BaseModel):
     user_display_name: Optional[str] = "Project Manager"
     team_workload: Optional[List[WorkloadItem]] = []
     user_role: Optional[str] = "developer"  # For RBAC-aware UI
+    committed_budget: Optional[str] = "$0"
+    burn_percentage: Optional[float] = 0
+    burndown_chart: Optional[dict] = None
+    cumulative_flow: Optional[dict] = None
+    generated_at: Optional[datetime] = None  # When the snapshot was built
 
 # ==========================================
 # 📋 MEETING-TO-TASKS PIPELINE
@@ -4,18 +4,28 @@ import json
 import requests
 import time as time_module
 from typing import List, Dict, Any
-from collections import Counter, defaultdict  # Needed for counting tasks
+from collections import Counter, defaultdict, deque  # Needed for counting tasks
 from pydantic import BaseModel
 import random 
+import threading
+import asyncio
+import base64
+import csv
+import io
 from graphlib import TopologicalSorter
 from datetime import datetime, timedelta, time
 from typing import List, Optional
-from fastapi import FastAPI, HTTPException, Depends, Request, UploadFile, File
+from fastapi import FastAPI, HTTPException, Depends, Request, Response, UploadFile, File
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
+from starlette.concurrency import run_in_threadpool
+import anyio
 from pydantic import BaseModel
-from pymongo import MongoClient
+from pymongo import UpdateOne, ReturnDocument
+from pymongo.errors import BulkWriteError
+from db_indexes import verify_hot_queries, normalize_key, with_keys
+from storage import open_storage
 from passlib.context import CryptContext
 from jose import jwt
 from langchain_groq import ChatGroq
@@ -51,6 +61,7 @@ GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
 PINECONE_HOST = os.getenv("PINECONE_HOST")
 MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
+MONGO_DB_NAME = os.getenv("MONGO_DB_NAME", "ai_project_manager")
 SECRET_KEY = os.getenv("SECRET_KEY", "default_secret")
 ALGORITHM = "HS256"
 DEFAULT_OWNER = os.getenv("DEFAULT_OWNER", "")
@@ -127,7 +138,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"], # Explicitly list methods
     allow_headers=["Content-Type", "Authorization", "X-Requested-With"], # Be explicit
-    expose_headers=["*"],
+    expose_headers=["*", "X-Next-Cursor"],  # "*" is ignored on credentialed requests; name the paging header
 )
 
 # ensure CORS headers on unexpected exceptions
@@ -144,12 +155,16 @@ async def global_exception_handler(request: Request, exc: Exception):
     )
 
 # --------------------
-# DATABASE (pymongo)
+# DATABASE (pymongo, via storage.py)
 # --------------------
+storage = None
 client = None
 db = None
 users_collection = None
 employees_collection = None
+chats_collection = None
+system_chats_collection = None
+chats_archive_collection = None
 time_logs_collection = None
 projects_collection = None
 epics_collection = None
@@ -158,29 +173,75 @@ tasks_collection = None
 sprints_collection = None
 meetings_collection = None
 risks_collection = None
+risk_scans_collection = None
 mood_collection = None
 commit_logs_collection = None
+dashboard_snapshots_collection = None
+approvals_collection = None
+task_events_collection = None
+task_status_daily_collection = None
+time_log_daily_collection = None
+commit_daily_collection = None
+trello_card_states_collection = None
 try:
-    client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=5000)
-    db = client["ai_project_manager"]
-    users_collection = db["users"]
-    employees_collection = db["employees"]
-    chats_collection = db["chats"]
-    time_logs_collection = db["time_logs"]
-    projects_collection = db["projects"]
-    epics_collection = db["epics"]
-    stories_collection = db["stories"]
-    tasks_collection = db["tasks"]
-    sprints_collection = db["sprints"]
-    meetings_collection = db["meetings"]
-    risks_collection = db["risks"]
-    mood_collection = db["mood_entries"]
-    commit_logs_collection = db["commit_logs"]
-    client.admin.command("ping")
-    print("[OK] Connected to MongoDB")
+    # Pool sized to the threadpool so concurrent sync endpoints don't queue on connections
+    storage = open_storage(MONGO_URI, MONGO_DB_NAME, serverSelectionTimeoutMS=5000, maxPoolSize=max(100, int(os.getenv("THREADPOOL_SIZE", "100"))))
+    client, db = storage.client, storage.db
+    users_collection = storage.collection("users")
+    employees_collection = storage.collection("employees")
+    chats_collection = storage.collection("chats")
+    system_chats_collection = storage.collection("system_chats")
+    chats_archive_collection = storage.collection("chats_archive")
+    time_logs_collection = storage.collection("time_logs")
+    projects_collection = storage.collection("projects")
+    epics_collection = storage.collection("epics")
+    stories_collection = storage.collection("stories")
+    tasks_collection = storage.collection("tasks")
+    sprints_collection = storage.collection("sprints")
+    meetings_collection = storage.collection("meetings")
+    risks_collection = storage.collection("risks")
+    risk_scans_collection = storage.collection("risk_scans")
+    mood_collection = storage.collection("mood_entries")
+    commit_logs_collection = storage.collection("commit_logs")
+    dashboard_snapshots_collection = storage.collection("dashboard_snapshots")
+    approvals_collection = storage.collection("approvals")
+    task_events_collection = storage.collection("task_events")
+    task_status_daily_collection = storage.collection("task_status_daily")
+    time_log_daily_collection = storage.collection("time_log_daily")
+    commit_daily_collection = storage.collection("commit_daily")
+    trello_card_states_collection = storage.collection("trello_card_states")
+    storage.prepare()
+    print(f"[OK] Connected to {storage.backend} storage")
 except Exception as e:
     print("[ERROR] MongoDB Error:", e)
 
+# --------------------
+# ASYNC DATA ACCESS
+# --------------------
+# Sync `def` endpoints already run on the threadpool. `async def` endpoints must not
+# call pymongo (or bcrypt, requests, the LLM) directly: that blocks the event loop and
+# stalls every in-flight request. They go through aio() / run_in_threadpool instead.
+THREADPOOL_SIZE = int(os.getenv("THREADPOOL_SIZE", "100"))
+
+class AsyncCollection:
+    """Awaitable view of a pymongo collection: every method call runs on the threadpool."""
+    def __init__(self, collection):
+        self._collection = collection
+
+    def __getattr__(self, name):
+        method = getattr(self._collection, name)
+        async def call(*args, **kwargs):
+            return await run_in_threadpool(method, *args, **kwargs)
+        return call
+
+def aio(collection) -> AsyncCollection:
+    return AsyncCollection(collection)
+
+@app.on_event("startup")
+async def size_threadpool():
+    # Sync endpoints share one thread limiter (40 by default); size it for bursts of concurrent clients
+    anyio.to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
+
 # --------------------
 # SECURITY & MODELS
 # --------------------
@@ -393,9 +454,50 @@ def get_trello_id_by_email(email: str) -> str:
         pass
     return ""
 
+# --------------------
+# EMPLOYEE DIRECTORY (in-process cache)
+# --------------------
+# Employees are read on almost every planning/assignment path but change rarely.
+# The directory is loaded once, indexed by normalized name and email, and dropped
+# by the /employees write endpoints. The TTL bounds staleness across workers.
+# Callers must treat the returned dicts as read-only.
+EMPLOYEE_DIRECTORY_TTL_SECONDS = int(os.getenv("EMPLOYEE_DIRECTORY_TTL_SECONDS", "300"))
+_employee_directory = None  # {"loaded_at", "employees", "by_name", "by_email"}
+_employee_directory_lock = threading.Lock()
+
+def get_employee_directory() -> dict:
+    global _employee_directory
+    directory = _employee_directory
+    if directory and time_module.time() - directory["loaded_at"] < EMPLOYEE_DIRECTORY_TTL_SECONDS:
+        return directory
+    with _employee_directory_lock:
+        if _employee_directory is directory:  # Nobody reloaded while we waited
+            employees = list(employees_collection.find({}, {"_id": 0, "name_key": 0, "email_key": 0}))
+            by_name, by_email = {}, {}
+            for emp in employees:
+                by_name.setdefault(normalize_key(emp.get("name")), emp)
+                if emp.get("email"):
+                    by_email.setdefault(normalize_key(emp["email"]), emp)
+            _employee_directory = {"loaded_at": time_module.time(), "employees": employees, "by_name": by_name, "by_email": by_email}
+        return _employee_directory
+
+def invalidate_employee_directory():
+    global _employee_directory
+    with _employee_directory_lock:
+        _employee_directory = None
+
+def list_employees() -> list:
+    return get_employee_directory()["employees"]
+
+def find_employee(name_or_email: str):
+    """Employee by name or email (case-insensitive), or None."""
+    directory = get_employee_directory()
+    key = normalize_key(name_or_email)
+    return directory["by_name"].get(key) or directory["by_email"].get(key)
+
 def get_dynamic_roster():
     try:
-        employees = list(employees_collection.find({}, {"_id": 0}))
+        employees = list_employees()
         if not employees:
             return "No employees found."
         roster = "TEAM ROSTER:\n"
@@ -412,7 +514,7 @@ def auto_assign_owner(task_name: str, task_desc: str) -> str:
     text = (task_name + " " + task_desc).lower()
     
     try:
-        employees = list(employees_collection.find({}, {"_id": 0}))
+        employees = list_employees()
         
         # --- STRATEGY 1: Exact Skill Match ---
         # (e.g. Task has "React", Employee has "React")
@@ -470,9 +572,9 @@ def get_default_owner():
     if DEFAULT_OWNER:
         return DEFAULT_OWNER
     try:
-        first_emp = employees_collection.find_one({}, {"_id": 0, "name": 1})
-        if first_emp and first_emp.get("name"):
-            return first_emp["name"]
+        employees = list_employees()
+        if employees and employees[0].get("name"):
+            return employees[0]["name"]
     except:
         pass
     return "Unassigned"
@@ -516,7 +618,7 @@ def get_active_workflow_count():
 
 def get_trello_id_from_db(name: str):
     try:
-        emp = employees_collection.find_one({"name": {"$regex": f"^{name}$", "$options": "i"}})
+        emp = find_employee(name)
         if emp:
             return emp.get("trello_id", "")
     except:
@@ -530,6 +632,288 @@ def estimate_due_date(task_name: str) -> str:
             days = max(days, v)
     return (datetime.now() + timedelta(days=days)).isoformat()
 
+# --------------------
+# DAILY LOG ROLLUPS
+# --------------------
+# time_log_daily holds one document per (day, task, person) and commit_daily one per
+# (day, author). Both are $inc-upserted next to every raw insert, so readers scan
+# O(days) rollups instead of every raw log. Rebuildable from the raw collections.
+
+def _day(ts: datetime) -> str:
+    return ts.strftime("%Y-%m-%d")
+
+def record_time_log(entry: dict):
+    """Inserts a raw time log and folds it into the daily rollup."""
+    entry = with_keys("time_logs", entry)
+    time_logs_collection.insert_one(entry)
+    day = _day(entry["timestamp"])
+    time_log_daily_collection.update_one(
+        {"_id": f"{day}|{entry['task_name_key']}|{entry['logged_by_key']}"},
+        {
+            "$inc": {"hours": entry.get("hours", 0) or 0, "entries": 1},
+            "$setOnInsert": {"day": day, "task_name": entry["task_name"], "task_name_key": entry["task_name_key"],
+                             "logged_by": entry["logged_by"], "logged_by_key": entry["logged_by_key"]}
+        },
+        upsert=True
+    )
+
+def record_commit(doc: dict):
+    """Inserts a raw commit log and folds it into the daily per-author rollup."""
+    doc = with_keys("commit_logs", doc)
+    commit_logs_collection.insert_one(doc)
+    day = _day(doc["timestamp"])
+    commit_daily_collection.update_one(
+        {"_id": f"{day}|{doc['author_key']}"},
+        {
+            "$inc": {"commits": 1, "lines_added": doc.get("lines_added", 0), "lines_removed": doc.get("lines_removed", 0),
+                     "files_changed": doc.get("files_changed", 0)},
+            "$setOnInsert": {"day": day, "author": doc["author"], "author_key": doc["author_key"]}
+        },
+        upsert=True
+    )
+
+def rebuild_log_rollups():
+    """Recomputes both rollups from the raw logs ($out swaps each collection in atomically)."""
+    day = {"$dateToString": {"format": "%Y-%m-%d", "date": "$timestamp"}}
+    time_logs_collection.aggregate([
+        {"$group": {
+            "_id": {"day": day, "task": "$task_name_key", "person": "$logged_by_key"},
+            "hours": {"$sum": "$hours"}, "entries": {"$sum": 1},
+            "task_name": {"$first": "$task_name"}, "logged_by": {"$first": "$logged_by"}
+        }},
+        {"$project": {
+            "_id": {"$concat": ["$_id.day", "|", {"$ifNull": ["$_id.task", ""]}, "|", {"$ifNull": ["$_id.person", ""]}]},
+            "day": "$_id.day", "task_name_key": {"$ifNull": ["$_id.task", ""]}, "logged_by_key": {"$ifNull": ["$_id.person", ""]},
+            "task_name": 1, "logged_by": 1, "hours": 1, "entries": 1
+        }},
+        {"$out": "time_log_daily"}
+    ])
+    commit_logs_collection.aggregate([
+        {"$group": {
+            "_id": {"day": day, "author": "$author_key"},
+            "commits": {"$sum": 1}, "lines_added": {"$sum": "$lines_added"}, "lines_removed": {"$sum": "$lines_removed"},
+            "files_changed": {"$sum": "$files_changed"}, "author": {"$first": "$author"}
+        }},
+        {"$project": {
+            "_id": {"$concat": ["$_id.day", "|", {"$ifNull": ["$_id.author", ""]}]},
+            "day": "$_id.day", "author_key": {"$ifNull": ["$_id.author", ""]}, "author": 1,
+            "commits": 1, "lines_added": 1, "lines_removed": 1, "files_changed": 1
+        }},
+        {"$out": "commit_daily"}
+    ])
+
+def aggregate_logged_hours(task_names=None, by_day: bool = False):
+    """
+    Sums logged hours from the daily rollup in ONE $group round trip.
+    - by_day=False -> {task_name: hours}
+    - by_day=True  -> {"YYYY-MM-DD": hours}
+    Pass task_names to restrict the rollup to a set of tasks (matched case-insensitively).
+    """
+    pipeline = []
+    names_by_key = defaultdict(list)
+    if task_names is not None:
+        for name in task_names:
+            names_by_key[normalize_key(name)].append(name)
+        pipeline.append({"$match": {"task_name_key": {"$in": list(names_by_key)}}})
+    group_key = "$day" if by_day else "$task_name_key"
+    pipeline.append({"$group": {"_id": group_key, "hours": {"$sum": "$hours"}, "task_name": {"$first": "$task_name"}}})
+    try:
+        rows = list(time_log_daily_collection.aggregate(pipeline))
+    except Exception as e:
+        print(f"⚠️ Time log rollup failed: {e}")
+        return {}
+    if by_day:
+        return {row["_id"]: row["hours"] for row in rows}
+    hours = {}
+    for row in rows:
+        for name in names_by_key.get(row["_id"], [row["task_name"]]):
+            hours[name] = row["hours"]
+    return hours
+
+def logged_hours_by_person(person_keys, since_day: str) -> dict:
+    """{logged_by_key: hours} since `since_day` (inclusive), from the daily rollup."""
+    rows = time_log_daily_collection.aggregate([
+        {"$match": {"logged_by_key": {"$in": list(person_keys)}, "day": {"$gte": since_day}}},
+        {"$group": {"_id": "$logged_by_key", "hours": {"$sum": "$hours"}}}
+    ])
+    return {row["_id"]: row["hours"] for row in rows}
+
+def commit_stats_by_author(since_day: str, author_key: Optional[str] = None) -> dict:
+    """{author: {commits, lines_added, lines_removed, files_changed}} since `since_day`, from the daily rollup."""
+    match = {"day": {"$gte": since_day}}
+    if author_key is not None:
+        match["author_key"] = author_key
+    rows = commit_daily_collection.aggregate([
+        {"$match": match},
+        {"$group": {"_id": "$author_key", "author": {"$first": "$author"}, "commits": {"$sum": "$commits"},
+                    "lines_added": {"$sum": "$lines_added"}, "lines_removed": {"$sum": "$lines_removed"},
+                    "files_changed": {"$sum": "$files_changed"}}}
+    ])
+    return {
+        (row["author"] or "Unknown"): {"author_key": row["_id"], "commits": row["commits"], "lines_added": row["lines_added"],
+                                       "lines_removed": row["lines_removed"], "files_changed": row["files_changed"]}
+        for row in rows
+    }
+
+# --------------------
+# TASK STATUS EVENTS
+# --------------------
+# Every status transition is appended to task_events and folded into one
+# task_status_daily document per (project, scope, day) holding that day's closing
+# counts. Charts read the daily documents, so their cost is per day, not per task.
+# scope = "tasks" (native MongoDB tasks) or "board" (the Trello mirror).
+TASK_STATUSES = ["todo", "in_progress", "done"]
+
+def _status_day_id(project_id: str, scope: str, day: str) -> str:
+    return f"{project_id}:{scope}:{day}"
+
+def current_status_counts(project_id: str, scope: str) -> dict:
+    """Live counts per status, from one $group: tasks, or the project's mirrored board cards."""
+    if scope == "board":
+        rows = trello_card_states_collection.aggregate([
+            {"$match": {"project_id": project_id, "card_id": {"$exists": True}}},
+            {"$group": {"_id": "$status", "count": {"$sum": 1}}},
+        ])
+    else:
+        rows = tasks_collection.aggregate([{"$group": {"_id": {"$ifNull": ["$status", "todo"]}, "count": {"$sum": 1}}}])
+    counts = dict.fromkeys(TASK_STATUSES, 0)
+    for row in rows:
+        if row["_id"] in counts:
+            counts[row["_id"]] = row["count"]
+    return counts
+
+def ensure_status_day(project_id: str, scope: str, day: str, applied: dict = None):
+    """
+    Creates the day's rollup if missing, carrying forward the previous day's counts.
+    The first rollup of a project/scope is seeded from the live data instead, minus
+    `applied` ({"counts.<status>": delta} already written there but not yet rolled up).
+    """
+    day_id = _status_day_id(project_id, scope, day)
+    if task_status_daily_collection.find_one({"_id": day_id}, {"_id": 1}):
+        return
+    prev = task_status_daily_collection.find_one(
+        {"project_id": project_id, "scope": scope, "day": {"$lt": day}},
+        {"counts": 1}, sort=[("day", -1)]
+    )
+    counts = (prev or {}).get("counts")
+    if not counts:
+        counts = current_status_counts(project_id, scope)
+        for field, delta in (applied or {}).items():
+            status = field.split(".", 1)[1]
+            counts[status] = counts.get(status, 0) - delta
+    task_status_daily_collection.update_one(
+        {"_id": day_id},
+        {"$setOnInsert": {"project_id": project_id, "scope": scope, "day": day, "counts": counts}},
+        upsert=True
+    )
+
+def record_task_transitions(transitions, scope: str = "tasks", source: str = "api", project_id: str = "default"):
+    """
+    Logs status transitions and applies them to today's rollup.
+    transitions: [{"task_id", "task_name", "from_status", "to_status"}]
+    from_status=None means the task was created, to_status=None that it was removed.
+    """
+    transitions = [t for t in transitions if t.get("from_status") != t.get("to_status")]
+    if not transitions or task_events_collection is None:
+        return
+    try:
+        now = datetime.now()
+        task_events_collection.insert_many([
+            {**t, "scope": scope, "source": source, "project_id": project_id, "timestamp": now}
+            for t in transitions
+        ], ordered=False)
+
+        deltas = Counter()
+        for t in transitions:
+            if t.get("from_status") in TASK_STATUSES: deltas[f"counts.{t['from_status']}"] -= 1
+            if t.get("to_status") in TASK_STATUSES: deltas[f"counts.{t['to_status']}"] += 1
+        deltas = {k: v for k, v in deltas.items() if v}
+        if deltas:
+            day = now.strftime("%Y-%m-%d")
+            # Native tasks are written before their transitions are recorded; the board mirror
+            # records first and updates card states after
+            ensure_status_day(project_id, scope, day, applied=deltas if scope == "tasks" else None)
+            task_status_daily_collection.update_one({"_id": _status_day_id(project_id, scope, day)}, {"$inc": deltas})
+    except Exception as e:
+        print(f"⚠️ Task event log failed: {e}")
+
+def roll_status_days_forward():
+    """Daily rollup: makes sure today's document exists for every tracked project/scope."""
+    today = datetime.now().strftime("%Y-%m-%d")
+    for key in task_status_daily_collection.aggregate([{"$group": {"_id": {"project_id": "$project_id", "scope": "$scope"}}}]):
+        ensure_status_day(key["_id"]["project_id"], key["_id"]["scope"], today)
+
+def get_status_history(project_id: str = "default", scope: str = "tasks", days: int = 14):
+    """
+    Closing status counts for the last `days` days (oldest first) from ONE range query.
+    Days without a rollup carry the previous day's counts forward.
+    """
+    today = datetime.now().date()
+    day_keys = [(today - timedelta(days=i)).strftime("%Y-%m-%d") for i in range(days, -1, -1)]
+    rows = {
+        r["day"]: r.get("counts", {})
+        for r in task_status_daily_collection.find(
+            {"project_id": project_id, "scope": scope, "day": {"$gte": day_keys[0], "$lte": day_keys[-1]}},
+            {"_id": 0, "day": 1, "counts": 1}
+        )
+    }
+    history = []
+    last = dict.fromkeys(TASK_STATUSES, 0)
+    for d in day_keys:
+        if d in rows:
+            last = {s: max(0, rows[d].get(s, 0)) for s in TASK_STATUSES}
+        history.append((d, last))
+    return history
+
+# The Trello board behind N8N_DASHBOARD_URL belongs to one project; only that project
+# mirrors it, so other projects' burndown/flow never count its cards.
+DASHBOARD_BOARD_PROJECT_ID = os.getenv("DASHBOARD_BOARD_PROJECT_ID", "default")
+_card_states_adopted = False
+
+def mirror_board_statuses(cards, project_id: str = "default"):
+    """
+    Trello mirror: diffs the board against the last seen status of every card and
+    logs the transitions (scope="board"). Card state is keyed "<project_id>|<card_id>".
+    """
+    global _card_states_adopted
+    if trello_card_states_collection is None:
+        return
+    try:
+        if not _card_states_adopted:
+            # Rows from before per-project keys used the bare card id; they were the board project's
+            legacy = list(trello_card_states_collection.find({"card_id": {"$exists": False}}, {"status": 1}))
+            if legacy:
+                trello_card_states_collection.bulk_write([
+                    UpdateOne({"_id": f"{project_id}|{d['_id']}"},
+                              {"$setOnInsert": {"status": d.get("status"), "project_id": project_id, "card_id": d["_id"]}}, upsert=True)
+                    for d in legacy
+                ], ordered=False)
+                trello_card_states_collection.delete_many({"_id": {"$in": [d["_id"] for d in legacy]}})
+            _card_states_adopted = True
+        seen = {d["card_id"]: d.get("status") for d in trello_card_states_collection.find({"project_id": project_id, "card_id": {"$exists": True}}, {"card_id": 1, "status": 1})}
+        current = {c["id"]: (card_status(c), c.get("name", "")) for c in cards if c.get("id")}
+
+        transitions = []
+        for card_id, (status, name) in current.items():
+            if seen.get(card_id) != status:
+                transitions.append({"task_id": card_id, "task_name": name, "from_status": seen.get(card_id), "to_status": status})
+        for card_id in seen.keys() - current.keys():
+            transitions.append({"task_id": card_id, "task_name": "", "from_status": seen[card_id], "to_status": None})
+        if not transitions:
+            return
+
+        record_task_transitions(transitions, scope="board", source="trello", project_id=project_id)
+        ops = [UpdateOne({"_id": f"{project_id}|{t['task_id']}"},
+                         {"$set": {"status": t["to_status"], "project_id": project_id, "card_id": t["task_id"]}}, upsert=True)
+               for t in transitions if t["to_status"]]
+        if ops:
+            trello_card_states_collection.bulk_write(ops, ordered=False)
+        removed = [f"{project_id}|{t['task_id']}" for t in transitions if not t["to_status"]]
+        if removed:
+            trello_card_states_collection.delete_many({"_id": {"$in": removed}})
+    except Exception as e:
+        print(f"⚠️ Trello mirror failed: {e}")
+
 # --------------------
 # SYSTEM PROMPT
 # --------------------
@@ -754,7 +1138,7 @@ def internal_create_trello(name, desc, owner, start_hour=10,specific_due_date=No
     member_id = get_trello_id_from_db(owner)
     emp_email = "" 
     try:
-        emp = employees_collection.find_one({"name": {"$regex": f"^{owner}$", "$options": "i"}})
+        emp = find_employee(owner)
         if emp: emp_email = emp.get("email", "")
     except: pass
 
@@ -773,7 +1157,7 @@ def internal_create_trello(name, desc, owner, start_hour=10,specific_due_date=No
         def_owner = get_default_owner()
         if def_owner and def_owner != "Unassigned":
             try:
-                def_emp = employees_collection.find_one({"name": {"$regex": f"^{def_owner}$", "$options": "i"}})
+                def_emp = find_employee(def_owner)
                 if def_emp: emp_email = def_emp.get("email", "")
             except: pass
 
@@ -1008,9 +1392,8 @@ def execute_project_plan(goal: str, tasks: str | list, budget: float = 0, userna
             # B. Rate Est
             emp_rate = 50
             try:
-                if employees_collection:
-                    emp_data = employees_collection.find_one({"name": {"$regex": f"^{owner}$", "$options": "i"}})
-                    if emp_data: emp_rate = emp_data.get("rate", 50)
+                emp_data = find_employee(owner)
+                if emp_data: emp_rate = emp_data.get("rate", 50)
             except: pass
             
             # C. Resource/Tool Cost (from AI)
@@ -1076,7 +1459,9 @@ def execute_project_plan(goal: str, tasks: str | list, budget: float = 0, userna
         state['pending_plan'] = {
             "goal": goal, 
             "tasks": clean_tasks, 
-            "budget_summary": budget_status_msg 
+            "budget_summary": budget_status_msg,
+            "total_cost": total_project_cost,
+            "budget": target_budget
         }
         
         return "PLAN_STAGED"
@@ -1173,12 +1558,111 @@ def check_project_status(dummy: str = "", username: str = "default"):
     except Exception as e:
         return f"Error: {e}"
     
+def is_business_day(d) -> bool:
+    """True if the date is neither a weekend nor a company holiday."""
+    return d.weekday() not in WEEKEND_DAYS and d.strftime("%Y-%m-%d") not in COMPANY_HOLIDAYS
+
+def clamp_to_work_hours(dt: datetime) -> datetime:
+    """Keeps a due time inside the 9-6 working window."""
+    if dt.hour < 9: return dt.replace(hour=10, minute=0)
+    if dt.hour >= 18: return dt.replace(hour=17, minute=0)
+    return dt
+
+def _card_clean_name(name: str) -> str:
+    """'[Owner] Build API' -> 'Build API'."""
+    if "]" in name:
+        return name.split("]", 1)[1].strip()
+    return name.strip()
+
+def _card_blockers(desc: str) -> List[str]:
+    """Parses the '🛑 **Blocked By:** A, B' line written by calculate_smart_timeline."""
+    if not desc or "Blocked By:" not in desc:
+        return []
+    blocker_line = desc.split("Blocked By:")[1].replace("*", "").split("\n")[0].strip()
+    return [_card_clean_name(b) for b in blocker_line.split(",") if b.strip()]
+
+def plan_schedule_healing(cards, now: Optional[datetime] = None):
+    """
+    Computes every card's earliest feasible due date in ONE topological pass.
+    - Overdue (or due today) cards move to the next business day.
+    - Dependent cards move to the business day after their latest blocker.
+    Because blockers are always visited before their dependents, arbitrarily deep
+    chains converge in a single run. Returns the list of moves (nothing is written).
+    """
+    now = now or datetime.now()
+    today = now.date()
+
+    # 1. Normalize cards and index them by full + clean name
+    board = {}
+    name_index = {}
+    for c in cards:
+        if isinstance(c, dict) and "json" in c: c = c["json"]
+        if not isinstance(c, dict) or not c.get("id"): continue
+        try:
+            due = datetime.fromisoformat(c["due"].replace("Z", "")) if c.get("due") else None
+        except Exception:
+            due = None
+        board[c["id"]] = {"card": c, "due": due}
+        name = c.get("name", "")
+        name_index.setdefault(name, c["id"])
+        name_index.setdefault(_card_clean_name(name), c["id"])
+
+    # 2. Dependency graph: card_id -> {blocker card ids}
+    graph = {}
+    for card_id, entry in board.items():
+        blockers = set()
+        for b in _card_blockers(entry["card"].get("desc", "")):
+            blocker_id = name_index.get(b)
+            if blocker_id and blocker_id != card_id:
+                blockers.add(blocker_id)
+        graph[card_id] = blockers
+
+    try:
+        order = list(TopologicalSorter(graph).static_order())
+    except Exception as e:
+        print(f"⚠️ Dependency cycle on board, healing in board order: {e}")
+        order = list(board.keys())
+
+    # 3. Single traversal: earliest feasible due date per card
+    effective_due = {}
+    moves = []
+    for card_id in order:
+        entry = board.get(card_id)
+        if not entry or entry["due"] is None:
+            continue
+        c, due = entry["card"], entry["due"]
+        new_due = due
+        blocker_name = None
+
+        if due.date() <= today:
+            candidate = now if now.time() <= due.time() else now + timedelta(days=1)
+            while not is_business_day(candidate):
+                candidate += timedelta(days=1)
+            new_due = clamp_to_work_hours(datetime.combine(candidate.date(), due.time()))
+
+        blocker_ends = [(effective_due[b], b) for b in graph[card_id] if b in effective_due]
+        if blocker_ends:
+            blocker_end, blocker_id = max(blocker_ends)
+            if new_due <= blocker_end:
+                candidate = blocker_end + timedelta(days=1)
+                while not is_business_day(candidate):
+                    candidate += timedelta(days=1)
+                new_due = clamp_to_work_hours(datetime.combine(candidate.date(), due.time()))
+                blocker_name = _card_clean_name(board[blocker_id]["card"].get("name", ""))
+
+        effective_due[card_id] = new_due
+        if new_due != due:
+            moves.append({"id": card_id, "name": c.get("name"), "old_due": due, "new_due": new_due, "blocked_by": blocker_name})
+
+    return moves
+
 @tool
 def heal_project_schedule(dummy: str = ""):
     """
     1. Scans Trello (Backlog & Doing).
-    2. Phase 1: Moves OVERDUE tasks to the next valid business day.
-    3. Phase 2: Moves DEPENDENT tasks to start after their blockers.
+    2. Builds the board's dependency graph from the 'Blocked By' lines.
+    3. Walks it once in topological order, moving OVERDUE tasks to the next business day
+       and DEPENDENT tasks to start after their blockers, so every chain heals in one run.
     """
     try:
         # Fetch Data
@@ -1195,135 +1679,26 @@ def heal_project_schedule(dummy: str = ""):
             else:
                 cards = [raw_data]
 
-        task_status = {}
         updates = []
-        
-        # =========================================================
-        # PHASE 1: HEAL ROOT CAUSES (Overdue Tasks)
-        # =========================================================
-        for c in cards:
-            if isinstance(c, dict) and "json" in c: c = c["json"]
-            if not isinstance(c, dict): continue
-
+        for move in plan_schedule_healing(cards):
+            new_due = move["new_due"]
             try:
-                if not c.get("due"): continue
-                due = datetime.fromisoformat(c["due"].replace("Z", ""))
-            except:
-                continue 
-
-            effective_due = due
-
-            # Check if overdue OR due today
-            if due.date() <= datetime.now().date():
-                
-                preferred_time = due.time()
-                temp_date = datetime.now()
-                
-                # If time has passed today, start from tomorrow
-                if temp_date.time() > preferred_time:
-                    temp_date += timedelta(days=1)
-
-                days_added = 0
-                while days_added < 1:
-                    is_weekend = temp_date.weekday() in WEEKEND_DAYS
-                    is_holiday = temp_date.strftime("%Y-%m-%d") in COMPANY_HOLIDAYS
-                    if not is_weekend and not is_holiday:
-                        days_added += 1
-                    else:
-                        temp_date += timedelta(days=1)
-                
-                new_due = datetime.combine(temp_date.date(), preferred_time)
-
-                # Enforce 9-6
-                if new_due.hour < 9: new_due = new_due.replace(hour=10, minute=0)
-                elif new_due.hour >= 18: new_due = new_due.replace(hour=17, minute=0)
-
-                try:
-                    requests.put(
-                        f"https://api.trello.com/1/cards/{c['id']}", 
-                        params={"key": TRELLO_API_KEY, "token": TRELLO_TOKEN, "due": new_due.isoformat()}
-                    )
-                    updates.append(f"🔄 Rescheduled Overdue: '{c.get('name')}' to {new_due.strftime('%Y-%m-%d @ %I:%M %p')}")
-                    effective_due = new_due 
-                except Exception as e:
-                    print(f"Failed to update card: {e}")
-
-            task_status[c.get("name")] = effective_due
-            if "]" in c.get("name", ""):
-                clean_name = c["name"].split("]")[1].strip()
-                task_status[clean_name] = effective_due
-
-        # =========================================================
-        # PHASE 2: HEAL DEPENDENCIES
-        # =========================================================
-        for c in cards:
-            if isinstance(c, dict) and "json" in c: c = c["json"]
-            if not isinstance(c, dict): continue
-            
-            desc = c.get("desc", "")
-            if desc and "Blocked By:" in desc:
-                try:
-                    blocker_part = desc.split("Blocked By:")[1]
-                    blocker_clean = blocker_part.replace("*", "")
-                    blocker_line = blocker_clean.split("\n")[0].strip()
-                    
-                    # Handle multiple blockers (comma separated)
-                    raw_blockers = [b.strip() for b in blocker_line.split(",")]
-                    
-                    max_blocker_end = None
-                    active_blocker_name = ""
-
-                    for b in raw_blockers:
-                        if "]" in b: b = b.split("]")[1].strip()
-                        if b in task_status:
-                            b_end = task_status[b]
-                            if max_blocker_end is None or b_end > max_blocker_end:
-                                max_blocker_end = b_end
-                                active_blocker_name = b
-                    
-                    if max_blocker_end:
-                        blocker_end = max_blocker_end
-                        
-                        my_current_due = None
-                        if c.get("due"):
-                            my_current_due = datetime.fromisoformat(c["due"].replace("Z", ""))
-                        
-                        if my_current_due and my_current_due <= blocker_end:
-                            
-                            pref_time = my_current_due.time()
-                            temp_date = blocker_end
-                            days_added = 0
-                            while days_added < 1:
-                                temp_date += timedelta(days=1)
-                                is_weekend = temp_date.weekday() in WEEKEND_DAYS
-                                is_holiday = temp_date.strftime("%Y-%m-%d") in COMPANY_HOLIDAYS
-                                if not is_weekend and not is_holiday:
-                                    days_added += 1
-                                else:
-                                    temp_date += timedelta(days=1)
-                            
-                            new_due = datetime.combine(temp_date.date(), pref_time)
-
-                            if new_due.hour < 9: new_due = new_due.replace(hour=10, minute=0)
-                            elif new_due.hour >= 18: new_due = new_due.replace(hour=17, minute=0)
-
-                            requests.put(
-                                f"https://api.trello.com/1/cards/{c['id']}", 
-                                params={"key": TRELLO_API_KEY, "token": TRELLO_TOKEN, "due": new_due.isoformat()}
-                            )
-                            updates.append(f"🛠️ Pushed Dependent: '{c.get('name')}' to {new_due.strftime('%Y-%m-%d @ %I:%M %p')} (Blocked by {active_blocker_name})")
-                            
-                            # Update status for chains
-                            effective_due = new_due
-                            task_status[c.get("name")] = effective_due
-                            if "]" in c.get("name", ""):
-                                clean_name = c["name"].split("]")[1].strip()
-                                task_status[clean_name] = effective_due
+                requests.put(
+                    f"https://api.trello.com/1/cards/{move['id']}", 
+                    params={"key": TRELLO_API_KEY, "token": TRELLO_TOKEN, "due": new_due.isoformat()}
+                )
+            except Exception as e:
+                print(f"Failed to update card: {e}")
+                continue
 
-                except Exception as e:
-                    print(f"Dependency check error: {e}")
-                    continue
+            when = new_due.strftime('%Y-%m-%d @ %I:%M %p')
+            if move["blocked_by"]:
+                updates.append(f"🛠️ Pushed Dependent: '{move['name']}' to {when} (Blocked by {move['blocked_by']})")
+            else:
+                updates.append(f"🔄 Rescheduled Overdue: '{move['name']}' to {when}")
         
+        if updates:
+            request_dashboard_refresh()
         return "\n".join(updates) if updates else "Schedule Healthy (No conflicts found)."
     except Exception as e:
         return f"Error healing: {e}"
@@ -1368,7 +1743,7 @@ def check_team_workload(dummy: str = ""):
                 owner_counts[owner] = owner_counts.get(owner, 0) + 1
         
         # 3. Cross-reference with employee roster
-        employees = list(employees_collection.find({}, {"_id": 0, "name": 1, "role": 1}))
+        employees = list_employees()
         
         result_lines = []
         for emp in employees:
@@ -1409,7 +1784,8 @@ def log_time(task_name: str, hours: float, note: str = ""):
             "note": note,
             "timestamp": datetime.now()
         }
-        time_logs_collection.insert_one(entry)
+        record_time_log(entry)
+        request_dashboard_refresh()
         return f"✅ Logged {hours}h on \"{task_name}\". {('Note: ' + note) if note else ''}"
     except Exception as e:
         return f"Error logging time: {e}"
@@ -1486,7 +1862,7 @@ def auto_plan_sprint(sprint_name: str, duration_weeks: int = 2, focus_area: str
     """
     try:
         # 1. Calculate Capacity
-        devs = list(employees_collection.find())
+        devs = list_employees()
         sprint_days = duration_weeks * 5
         raw_capacity = len(devs) * sprint_days * 6  # 6 productive hours/day/dev
 
@@ -1497,9 +1873,7 @@ def auto_plan_sprint(sprint_name: str, duration_weeks: int = 2, focus_area: str
             if completed_sprints:
                 velocities = []
                 for cs in completed_sprints:
-                    cs_id = str(cs["_id"])
-                    cs_tasks = list(tasks_collection.find({"sprint_id": cs_id, "status": "done"}))
-                    completed_hours = sum(t.get("actual_hours", t.get("estimated_hours", 0)) for t in cs_tasks)
+                    completed_hours = cs.get("completed_hours", 0)  # Maintained sprint counter
                     cs_days = max(1, (datetime.fromisoformat(cs["end_date"].replace("Z","")) - datetime.fromisoformat(cs["start_date"].replace("Z",""))).days)
                     velocities.append(completed_hours / cs_days)
                 
@@ -1517,7 +1891,9 @@ def auto_plan_sprint(sprint_name: str, duration_weeks: int = 2, focus_area: str
         
         # 3. Get Backlog Tasks (not in any sprint, not done)
         query = {"sprint_id": {"$in": [None, ""]}, "status": {"$ne": "done"}}
-        tasks = list(tasks_collection.find(query))
+        tasks = list(tasks_collection.find(query, {
+            "name": 1, "description": 1, "depends_on": 1, "status": 1, "sprint_id": 1, "estimated_hours": 1, "actual_hours": 1
+        }))
         
         if not tasks:
             return "No tasks in the backlog to plan."
@@ -1547,23 +1923,40 @@ def auto_plan_sprint(sprint_name: str, duration_weeks: int = 2, focus_area: str
             "capacity_hours": capacity_hours,
             "project_id": "default",
             "status": "planning",
+            **SPRINT_COUNTERS_EMPTY,
             "created_by": username,
-            "created_at": datetime.now()
+            "created_at": datetime.now(),
+            "updated_at": datetime.now()
         }
         result = sprints_collection.insert_one(sprint_doc)
         sprint_id = str(result.inserted_id)
         
-        # 5. Fill Sprint to capacity
+        # 5. Fill Sprint to capacity, then assign the whole selection in one write
         assigned_hours = 0
         assigned_tasks = []
+        selected = []
         for t in tasks:
             est = t.get("estimated_hours", 0)
             if est == 0: est = 4
             
             if assigned_hours + est <= capacity_hours:
                 assigned_hours += est
-                tasks_collection.update_one({"_id": t["_id"]}, {"$set": {"sprint_id": sprint_id}})
+                selected.append(t)
                 assigned_tasks.append(t.get("name"))
+        if selected:
+            # Still-unassigned guard: a task grabbed by another sprint meanwhile keeps its sprint
+            selected_ids = [t["_id"] for t in selected]
+            assigned = tasks_collection.update_many(
+                {"_id": {"$in": selected_ids}, "sprint_id": {"$in": [None, ""]}},
+                {"$set": {"sprint_id": sprint_id, "updated_at": datetime.now()}}
+            )
+            if assigned.modified_count < len(selected):
+                # Count only the tasks this sprint actually got
+                ours = {t["_id"] for t in tasks_collection.find({"_id": {"$in": selected_ids}, "sprint_id": sprint_id}, {"_id": 1})}
+                selected = [t for t in selected if t["_id"] in ours]
+                assigned_tasks = [t.get("name") for t in selected]
+                assigned_hours = sum(t.get("estimated_hours", 0) or 4 for t in selected)
+            apply_sprint_counter_changes([(t, {**t, "sprint_id": sprint_id}) for t in selected])
         
         # 6. Send Slack Notification
         summary_msg = f"🏃 **Sprint '{sprint_name}' is locked!**\n\n"
@@ -1585,110 +1978,200 @@ def auto_plan_sprint(sprint_name: str, duration_weeks: int = 2, focus_area: str
     except Exception as e:
         return f"Error planning sprint: {e}"
 
+# ==========================================
+# ⚠️ RISK EVALUATION
+# ==========================================
+# Every risk is keyed by a fingerprint (rule + subject, e.g. "schedule:overdue:<task_id>"),
+# so a rescan upserts the existing row instead of inserting a duplicate, and a risk whose
+# condition has cleared is closed with closed_reason "auto" (and reopened if it comes back).
+# Scans are incremental: only tasks/sprints whose updated_at is past the project's last scan,
+# plus tasks whose due date has since crossed into the warning window, are re-evaluated.
+# Owner load and unassigned counts are a single $group per scan.
+RISK_DEADLINE_DAYS = 2
+RISK_OWNER_TASK_LIMIT = 3
+RISK_UNASSIGNED_LIMIT = 2
+RISK_DEPENDENCY_LIMIT = 3
+RISK_SCOPE_UTILIZATION = 110
+
+def _risk(fingerprint, subject_type, subject_id, title, description, category, probability, impact):
+    return {"fingerprint": fingerprint, "subject_type": subject_type, "subject_id": subject_id,
+            "title": title, "description": description, "category": category,
+            "probability": probability, "impact": impact}
+
+def _task_risks(t, today: str, deadline: str):
+    """Schedule and dependency risks for one open task."""
+    task_id, name = str(t["_id"]), t.get("name", "Unknown task")
+    owner = t.get("assigned_to") or "Unassigned"
+    risks = []
+    due = t.get("due_date") or t.get("end_date")
+    if isinstance(due, datetime):
+        due = due.strftime("%Y-%m-%d")
+    if due and due < today:
+        risks.append(_risk(f"schedule:overdue:{task_id}", "task", task_id, f"OVERDUE: {name}",
+                           f"Task was due {due}. Assigned to: {owner}", "schedule", 5, 4))
+    elif due and due <= deadline:
+        risks.append(_risk(f"schedule:deadline:{task_id}", "task", task_id, f"Tight deadline: {name}",
+                           f"Due {due}. Assigned to: {owner}", "schedule", 4, 3))
+    deps = t.get("depends_on", [])
+    if len(deps) >= RISK_DEPENDENCY_LIMIT:
+        risks.append(_risk(f"dependency:chain:{task_id}", "task", task_id, f"Long dependency chain: {name}",
+                           f"Blocked by {len(deps)} tasks. Any delay cascades here.", "dependency", 3, 4))
+    return risks
+
+def _resource_risks(project_id: str):
+    """Over-allocated owners and the unassigned backlog, from one $group over open tasks."""
+    risks, owners = [], []
+    load = tasks_collection.aggregate([
+        {"$match": {"status": {"$ne": "done"}}},
+        {"$group": {"_id": {"$ifNull": ["$assigned_to", "Unassigned"]}, "count": {"$sum": 1}}},
+    ])
+    for row in load:
+        owner, count = row["_id"] or "Unassigned", row["count"]
+        if owner == "Unassigned":
+            if count > RISK_UNASSIGNED_LIMIT:
+                risks.append(_risk(f"resource:unassigned:{project_id}", "project", project_id,
+                                   f"{count} unassigned tasks in backlog",
+                                   f"{count} open tasks have no owner.", "resource", 3, 3))
+            continue
+        owner_key = normalize_key(owner)
+        owners.append(owner_key)
+        if count > RISK_OWNER_TASK_LIMIT:
+            risks.append(_risk(f"resource:overallocated:{owner_key}", "owner", owner_key, f"Over-allocated: {owner}",
+                               f"{owner} has {count} active tasks. Risk of burnout and delays.", "resource", 4, 3))
+    return risks, owners
+
+def _sprint_risks(s):
+    if s.get("status") != "active":
+        return []
+    capacity = s.get("capacity_hours", 0)
+    assigned_hours = s.get("committed_hours", 0)  # Maintained sprint counter
+    util = (assigned_hours / capacity) * 100 if capacity > 0 else 0
+    if util <= RISK_SCOPE_UTILIZATION:
+        return []
+    sprint_id = str(s["_id"])
+    return [_risk(f"scope:creep:{sprint_id}", "sprint", sprint_id, f"Sprint scope creep: {util:.0f}% utilization",
+                  f"Sprint '{s.get('name')}' is overloaded. {assigned_hours:.0f}h assigned vs {capacity:.0f}h capacity.",
+                  "scope", 5, 4)]
+
+def evaluate_risks(project_id: str = "default", full: bool = False) -> dict:
+    """
+    Re-evaluates what changed since the project's last scan and syncs the risk register:
+    upserts detected risks by fingerprint, auto-closes cleared ones. Returns counts.
+    """
+    started = datetime.now()
+    today = started.strftime("%Y-%m-%d")
+    deadline = (started + timedelta(days=RISK_DEADLINE_DAYS)).strftime("%Y-%m-%d")
+    state = risk_scans_collection.find_one({"_id": project_id})
+    full = full or not state
+    task_fields = {"name": 1, "assigned_to": 1, "status": 1, "due_date": 1, "end_date": 1, "depends_on": 1}
+
+    if full:
+        tasks = tasks_collection.find({}, task_fields)
+        sprints = sprints_collection.find({}, {"name": 1, "status": 1, "capacity_hours": 1, "committed_hours": 1})
+    else:
+        last_run = state["last_run"]
+        # Edited tasks, plus untouched ones whose due date has since become overdue or tight
+        tasks = tasks_collection.find({"$or": [
+            {"updated_at": {"$gte": last_run}},
+            {"due_date": {"$gte": last_run.strftime("%Y-%m-%d"), "$lte": deadline}},
+        ]}, task_fields)
+        sprints = sprints_collection.find({"updated_at": {"$gte": last_run}},
+                                          {"name": 1, "status": 1, "capacity_hours": 1, "committed_hours": 1})
+
+    detected, evaluated = [], {"task": [], "sprint": []}
+    for t in tasks:
+        evaluated["task"].append(str(t["_id"]))
+        if t.get("status") != "done":
+            detected.extend(_task_risks(t, today, deadline))
+    for s in sprints:
+        evaluated["sprint"].append(str(s["_id"]))
+        detected.extend(_sprint_risks(s))
+    resource_risks, evaluated["owner"] = _resource_risks(project_id)
+    detected.extend(resource_risks)
+    evaluated["project"] = [project_id]
+
+    # --- Upsert detected risks ---
+    created = 0
+    if detected:
+        ops = [UpdateOne(
+            {"project_id": project_id, "fingerprint": r["fingerprint"]},
+            {"$set": {"title": r["title"], "description": r["description"], "category": r["category"],
+                      "subject_type": r["subject_type"], "subject_id": r["subject_id"], "last_seen_at": started},
+             "$setOnInsert": {"probability": r["probability"], "impact": r["impact"],
+                              "risk_score": r["probability"] * r["impact"], "status": "open", "mitigation": "",
+                              "detected_at": started.strftime("%Y-%m-%d %H:%M")}},
+            upsert=True
+        ) for r in detected]
+        try:
+            created = risks_collection.bulk_write(ops, ordered=False).upserted_count
+        except BulkWriteError as e:
+            # A concurrent scan upserted the same fingerprint first; its row stands
+            created = e.details.get("nUpserted", 0)
+            print(f"⚠️ Risk upsert conflicts: {len(e.details.get('writeErrors', []))}")
+        risks_collection.update_many(
+            {"project_id": project_id, "fingerprint": {"$in": [r["fingerprint"] for r in detected]},
+             "status": "closed", "closed_reason": "auto"},
+            {"$set": {"status": "open"}, "$unset": {"closed_reason": "", "closed_at": ""}}
+        )
+
+    # --- Auto-close risks whose subject was re-evaluated but no longer trips its rule ---
+    active = {"project_id": project_id, "status": {"$in": ["open", "mitigated"]}}
+    close = {"$set": {"status": "closed", "closed_reason": "auto", "closed_at": started}}
+    detected_fps = [r["fingerprint"] for r in detected]
+    closed = 0
+    for subject_type, subject_ids in evaluated.items():
+        if subject_type == "owner" or subject_ids:
+            closed += risks_collection.update_many(
+                {**active, "subject_type": subject_type, "fingerprint": {"$nin": detected_fps},
+                 # Owners are all evaluated each scan, including ones who no longer have open tasks
+                 **({} if subject_type == "owner" else {"subject_id": {"$in": subject_ids}})},
+                close
+            ).modified_count
+    # Deleted tasks never show up as changed; close whatever still points at them
+    open_task_ids = risks_collection.distinct("subject_id", {**active, "subject_type": "task"})
+    if open_task_ids:
+        existing = {str(t["_id"]) for t in tasks_collection.find(
+            {"_id": {"$in": [ObjectId(i) for i in open_task_ids if ObjectId.is_valid(i)]}}, {"_id": 1})}
+        gone = [i for i in open_task_ids if i not in existing]
+        if gone:
+            closed += risks_collection.update_many(
+                {**active, "subject_type": "task", "subject_id": {"$in": gone}}, close).modified_count
+    if full:
+        # Rows from before fingerprints existed are duplicates of what was just upserted
+        closed += risks_collection.update_many(
+            {"project_id": project_id, "fingerprint": {"$exists": False}, "status": "open", "mitigation": ""},
+            {"$set": {"status": "closed", "closed_reason": "superseded", "closed_at": started}}
+        ).modified_count
+
+    risk_scans_collection.update_one({"_id": project_id}, {"$set": {"last_run": started}}, upsert=True)
+    return {"new": created, "closed": closed, "tasks_evaluated": len(evaluated["task"]), "full": full}
+
 @tool
 def predict_risks(project_id: str = "default"):
     """
-    Proactive Risk Prediction — scans the current project for scheduling, resource, budget, and dependency risks.
-    Generates a ranked Risk Register with probability × impact scoring.
+    Proactive Risk Prediction — scans the current project for scheduling, resource, and dependency risks.
+    Keeps a ranked Risk Register with probability × impact scoring.
     Use when user asks about risks, potential problems, or project health.
     """
     try:
-        risks_found = []
-        today = datetime.now()
-
-        # --- 1. Schedule Risks: Tasks due within 2 days or overdue ---
-        all_tasks = list(tasks_collection.find({"status": {"$ne": "done"}}))
-        for t in all_tasks:
-            due = t.get("due_date") or t.get("end_date")
-            if due:
-                try:
-                    due_dt = datetime.strptime(due, "%Y-%m-%d") if isinstance(due, str) else due
-                    days_left = (due_dt - today).days
-                    if days_left < 0:
-                        risks_found.append({
-                            "title": f"OVERDUE: {t.get('name', 'Unknown task')}",
-                            "description": f"Task is {abs(days_left)} days overdue. Assigned to: {t.get('assigned_to', 'Unassigned')}",
-                            "category": "schedule", "probability": 5, "impact": 4
-                        })
-                    elif days_left <= 2:
-                        risks_found.append({
-                            "title": f"Tight deadline: {t.get('name', 'Unknown task')}",
-                            "description": f"Only {days_left} day(s) remaining. Assigned to: {t.get('assigned_to', 'Unassigned')}",
-                            "category": "schedule", "probability": 4, "impact": 3
-                        })
-                except:
-                    pass
-
-        # --- 2. Resource Risks: Over-allocated team members ---
-        owner_counts = {}
-        for t in all_tasks:
-            owner = t.get("assigned_to", "Unassigned")
-            if owner != "Unassigned":
-                owner_counts[owner] = owner_counts.get(owner, 0) + 1
-
-        for owner, count in owner_counts.items():
-            if count > 3:
-                risks_found.append({
-                    "title": f"Over-allocated: {owner}",
-                    "description": f"{owner} has {count} active tasks. Risk of burnout and delays.",
-                    "category": "resource", "probability": 4, "impact": 3
-                })
-
-        # --- 3. Unassigned Tasks ---
-        unassigned = [t for t in all_tasks if t.get("assigned_to", "Unassigned") == "Unassigned"]
-        if len(unassigned) > 2:
-            risks_found.append({
-                "title": f"{len(unassigned)} unassigned tasks in backlog",
-                "description": f"Tasks without owners: {', '.join([t.get('name','?') for t in unassigned[:5]])}",
-                "category": "resource", "probability": 3, "impact": 3
-            })
-
-        # --- 4. Dependency Chain Risks ---
-        for t in all_tasks:
-            deps = t.get("depends_on", [])
-            if len(deps) >= 3:
-                risks_found.append({
-                    "title": f"Long dependency chain: {t.get('name', 'Unknown')}",
-                    "description": f"Blocked by {len(deps)} tasks. Any delay cascades here.",
-                    "category": "dependency", "probability": 3, "impact": 4
-                })
-
-        # --- 5. Sprint Scope Creep Check ---
-        active_sprint = sprints_collection.find_one({"status": "active"})
-        if active_sprint:
-            capacity = active_sprint.get("capacity_hours", 0)
-            sprint_id = str(active_sprint["_id"])
-            sprint_tasks = list(tasks_collection.find({"sprint_id": sprint_id}))
-            assigned_hours = sum(t.get("estimated_hours", 4) for t in sprint_tasks)
-            if capacity > 0:
-                util = (assigned_hours / capacity) * 100
-                if util > 110:
-                    risks_found.append({
-                        "title": f"Sprint scope creep: {util:.0f}% utilization",
-                        "description": f"Sprint '{active_sprint.get('name')}' is overloaded. {assigned_hours:.0f}h assigned vs {capacity:.0f}h capacity.",
-                        "category": "scope", "probability": 5, "impact": 4
-                    })
-
-        # --- 6. Store in MongoDB ---
-        for r in risks_found:
-            r["risk_score"] = r["probability"] * r["impact"]
-            r["status"] = "open"
-            r["mitigation"] = ""
-            r["detected_at"] = today.strftime("%Y-%m-%d %H:%M")
-            r["project_id"] = project_id
-
-        if risks_found:
-            risks_collection.insert_many(risks_found)
-
-        # --- 7. Format Response ---
-        if not risks_found:
+        result = evaluate_risks(project_id)
+        if result["new"] or result["closed"]:
+            publish_dashboard_event(project_id, "risks", {"new_risks": result["new"], "closed_risks": result["closed"]})
+
+        top = list(risks_collection.find(
+            {"project_id": project_id, "status": "open"},
+            {"title": 1, "description": 1, "risk_score": 1}
+        ).sort([("risk_score", -1), ("_id", -1)]).limit(10))
+        if not top:
             return "✅ No significant risks detected. The project looks healthy!"
 
-        risks_found.sort(key=lambda x: x["risk_score"], reverse=True)
-        msg = f"⚠️ Risk Analysis Complete — {len(risks_found)} risks detected:\n\n"
-        for i, r in enumerate(risks_found, 1):
+        open_count = risks_collection.count_documents({"project_id": project_id, "status": "open"})
+        msg = f"⚠️ Risk Analysis Complete — {open_count} open risks ({result['new']} new, {result['closed']} resolved since last scan):\n\n"
+        for i, r in enumerate(top, 1):
             severity = "🔴 Critical" if r["risk_score"] >= 16 else "🟠 High" if r["risk_score"] >= 9 else "🟡 Medium" if r["risk_score"] >= 4 else "🟢 Low"
             msg += f"{i}. [{severity}] **{r['title']}** (Score: {r['risk_score']})\n   {r['description']}\n\n"
+        if open_count > len(top):
+            msg += f"...and {open_count - len(top)} more in the risk register."
 
         return msg
 
@@ -1717,9 +2200,7 @@ def detect_scope_creep(sprint_id: str = ""):
         if capacity == 0:
             return f"Sprint '{sprint.get('name')}' has no capacity set. Cannot calculate scope health."
 
-        # Get sprint tasks
-        sprint_tasks = list(tasks_collection.find({"sprint_id": sid}))
-        assigned_hours = sum(t.get("estimated_hours", 4) for t in sprint_tasks)
+        assigned_hours = sprint.get("committed_hours", 0)  # Maintained sprint counter
         utilization = (assigned_hours / capacity) * 100
 
         # Categorize
@@ -1745,8 +2226,7 @@ def detect_scope_creep(sprint_id: str = ""):
         # If overloaded, suggest deferrals
         if utilization > 110:
             # Find lowest-priority unstarted tasks
-            unstarted = [t for t in sprint_tasks if t.get("status") == "todo"]
-            unstarted.sort(key=lambda x: x.get("estimated_hours", 4))
+            unstarted = list(tasks_collection.find({"sprint_id": sid, "status": "todo"}).sort("estimated_hours", 1))
 
             excess = assigned_hours - capacity
             defer_list = []
@@ -1755,7 +2235,7 @@ def detect_scope_creep(sprint_id: str = ""):
             for t in unstarted:
                 if deferred_hours >= excess:
                     break
-                hours = t.get("estimated_hours", 4)
+                hours = t.get("estimated_hours", DEFAULT_TASK_ESTIMATE_HOURS)
                 defer_list.append(t)
                 deferred_hours += hours
 
@@ -1810,8 +2290,7 @@ def generate_sprint_retrospective(sprint_id: str = ""):
 
         # Cross-reference with time_logs for more accurate actuals
         task_names = [t.get("name") for t in sprint_tasks]
-        time_logs = list(time_logs_collection.find({"task_name": {"$in": task_names}}))
-        logged_hours = sum(l.get("hours", 0) for l in time_logs)
+        logged_hours = sum(aggregate_logged_hours(task_names).values())
         if logged_hours > total_actual:
             total_actual = logged_hours
 
@@ -1903,11 +2382,11 @@ def analyze_team_health(dummy: str = ""):
     """
     try:
         # 1. Get recent mood entries (last 4 weeks)
-        four_weeks_ago = (datetime.now() - timedelta(weeks=4)).strftime("%Y-%m-%d")
+        four_weeks_ago = datetime.now() - timedelta(weeks=4)
         mood_entries = list(mood_collection.find({"timestamp": {"$gte": four_weeks_ago}}).sort("timestamp", -1))
         
         # 2. Get all employees
-        employees = list(employees_collection.find({}, {"_id": 0}))
+        employees = list_employees()
         
         # 3. Get active tasks per person
         active_tasks = list(tasks_collection.find({"status": {"$ne": "done"}}))
@@ -1980,28 +2459,16 @@ def analyze_commit_cost(developer_name: str = "", days_back: int = 7):
     Use when user asks about developer productivity, commit efficiency, or code output.
     """
     try:
-        cutoff = (datetime.now() - timedelta(days=days_back)).strftime("%Y-%m-%d")
-        
-        # Get commits
-        query = {"timestamp": {"$gte": cutoff}}
-        if developer_name:
-            query["author"] = {"$regex": developer_name, "$options": "i"}
+        since_day = (datetime.now() - timedelta(days=days_back)).strftime("%Y-%m-%d")
         
-        commits = list(commit_logs_collection.find(query).sort("timestamp", -1))
+        # Per-author commit totals from the daily rollup
+        author_stats = commit_stats_by_author(since_day, normalize_key(developer_name) if developer_name else None)
         
-        if not commits:
+        if not author_stats:
             return f"No commit data found in the last {days_back} days. Ensure the GitHub webhook is configured."
 
-        # Group by author
-        author_stats = {}
-        for c in commits:
-            author = c.get("author", "Unknown")
-            if author not in author_stats:
-                author_stats[author] = {"commits": 0, "lines_added": 0, "lines_removed": 0, "files_changed": 0}
-            author_stats[author]["commits"] += 1
-            author_stats[author]["lines_added"] += c.get("lines_added", 0)
-            author_stats[author]["lines_removed"] += c.get("lines_removed", 0)
-            author_stats[author]["files_changed"] += c.get("files_changed", 0)
+        # Hours logged by the same people, also from the daily rollup
+        hours_by_person = logged_hours_by_person([stats["author_key"] for stats in author_stats.values()], since_day)
 
         # Cross-reference with time logs
         report = f"# 🔗 Commit-to-Cost Analysis (Last {days_back} days)\n\n"
@@ -2012,12 +2479,7 @@ def analyze_commit_cost(developer_name: str = "", days_back: int = 7):
         for author, stats in author_stats.items():
             total_lines = stats["lines_added"] + stats["lines_removed"]
             
-            # Find time logged by this developer
-            time_logs = list(time_logs_collection.find({
-                "logged_by": {"$regex": author, "$options": "i"},
-                "timestamp": {"$gte": datetime.strptime(cutoff, "%Y-%m-%d")}
-            }))
-            hours_logged = sum(l.get("hours", 0) for l in time_logs)
+            hours_logged = hours_by_person.get(stats["author_key"], 0)
             
             # Calculate output ratio (lines per hour)
             ratio = total_lines / max(hours_logged, 1) if hours_logged > 0 else 0
@@ -2060,7 +2522,7 @@ llm_with_tools = llm.bind_tools([
 @app.post("/user/profile")
 async def update_profile(profile: ProfileUpdate, username: str = Depends(get_current_user)):
     try:
-        users_collection.update_one(
+        await aio(users_collection).update_one(
             {"username": username},
             {"$set": {"display_name": profile.display_name, "email": profile.email}}
         )
@@ -2070,9 +2532,25 @@ async def update_profile(profile: ProfileUpdate, username: str = Depends(get_cur
 
 @app.get("/user/profile")
 async def get_profile(username: str = Depends(get_current_user)):
-    user = users_collection.find_one({"username": username}, {"_id": 0, "password": 0})
+    user = await aio(users_collection).find_one({"username": username}, {"_id": 0, "password": 0})
     return user or {"display_name": "Project Manager", "email": ""}
 
+# --------------------
+# CHAT STORAGE
+# --------------------
+# - chats: user sessions. Long sessions are compacted: everything but the latest
+#   CHAT_KEEP_RECENT turns is rolled into one "summary" message, originals archived.
+# - system_chats: "system_*" sessions (uploads, plan approvals) written by the backend
+#   for the dashboard, expired by a TTL index (SYSTEM_CHAT_TTL_DAYS in db_indexes.py).
+# - chats_archive: compacted turns and whole sessions idle for CHAT_ARCHIVE_AFTER_DAYS.
+CHAT_COMPACT_THRESHOLD = int(os.getenv("CHAT_COMPACT_THRESHOLD", "200"))
+CHAT_KEEP_RECENT = int(os.getenv("CHAT_KEEP_RECENT", "50"))
+CHAT_ARCHIVE_AFTER_DAYS = int(os.getenv("CHAT_ARCHIVE_AFTER_DAYS", "90"))
+CHAT_MAINTENANCE_SECONDS = int(os.getenv("CHAT_MAINTENANCE_SECONDS", "3600"))
+
+def chat_collection_for(session_id: str):
+    return system_chats_collection if session_id.startswith("system_") else chats_collection
+
 def save_chat_message(session_id: str,role: str, content: str):
     """Saves a message to MongoDB."""
     try:
@@ -2082,24 +2560,123 @@ def save_chat_message(session_id: str,role: str, content: str):
             "content": content,
             "timestamp": datetime.now()
         }
-        chats_collection.insert_one(msg)
+        chat_collection_for(session_id).insert_one(msg)
     except Exception as e:
         print(f"Error saving chat: {e}")
 
+def _move_messages(source, target, query: dict, batch_size: int = 1000) -> int:
+    """Copies matching messages to `target`, then deletes them from `source`. Safe to re-run after a crash."""
+    moved = 0
+    while True:
+        batch = list(source.find(query).limit(batch_size))
+        if not batch:
+            return moved
+        try:
+            target.insert_many(batch, ordered=False)
+        except BulkWriteError as e:
+            # Duplicate _ids = already copied by an interrupted earlier run; anything else is real
+            if any(err.get("code") != 11000 for err in e.details.get("writeErrors", [])):
+                raise
+        source.delete_many({"_id": {"$in": [m["_id"] for m in batch]}})
+        moved += len(batch)
+
+def summarize_chat_turns(turns: list) -> str:
+    transcript = "\n".join(f"{t.get('role')}: {str(t.get('content', ''))[:500]}" for t in turns)
+    try:
+        prompt = f"Summarize this project-management chat in at most 10 bullet points. Keep decisions, task names, owners, dates and numbers.\n\n{transcript[:8000]}"
+        return llm.invoke([HumanMessage(content=prompt)]).content
+    except Exception as e:
+        print(f"⚠️ Chat summary via LLM failed, using excerpt: {e}")
+        asks = [str(t.get("content", ""))[:120] for t in turns if t.get("role") == "user"]
+        return "Earlier requests:\n" + "\n".join(f"- {a}" for a in asks[-20:])
+
+def compact_chat_session(session_id: str) -> int:
+    """Rolls all but the latest CHAT_KEEP_RECENT turns into one summary message. Returns turns archived."""
+    recent = list(chats_collection.find({"session_id": session_id}, {"timestamp": 1}).sort([("timestamp", -1), ("_id", -1)]).skip(CHAT_KEEP_RECENT - 1).limit(1))
+    if not recent:
+        return 0
+    boundary = recent[0]["timestamp"]
+    old_query = {"session_id": session_id, "timestamp": {"$lt": boundary}}
+    old_turns = list(chats_collection.find(old_query, {"role": 1, "content": 1, "timestamp": 1, "compacted_count": 1}).sort("timestamp", 1))
+    if not old_turns:
+        return 0
+
+    # Fold an earlier summary into the new one so only one summary document exists per session
+    summary = "Summary of the earlier conversation:\n" + summarize_chat_turns(old_turns)
+    compacted = sum(t.get("compacted_count", 1) if t.get("role") == "summary" else 1 for t in old_turns)
+    chats_collection.insert_one({
+        "session_id": session_id,
+        "role": "summary",
+        "content": summary,
+        "compacted_count": compacted,
+        "timestamp": old_turns[-1]["timestamp"],
+    })
+    return _move_messages(chats_collection, chats_archive_collection, {**old_query, "_id": {"$in": [t["_id"] for t in old_turns]}})
+
+def maintain_chats() -> dict:
+    """Compacts long sessions, archives idle ones and moves stray system_* messages out of `chats`."""
+    stats = {"compacted": 0, "archived": 0, "partitioned": 0}
+    stats["partitioned"] = _move_messages(chats_collection, system_chats_collection, {"session_id": {"$regex": "^system_"}})
+
+    cutoff = datetime.now() - timedelta(days=CHAT_ARCHIVE_AFTER_DAYS)
+    sessions = chats_collection.aggregate([
+        {"$group": {"_id": "$session_id", "last": {"$max": "$timestamp"}, "count": {"$sum": 1}}},
+        {"$match": {"$or": [{"last": {"$lt": cutoff}}, {"count": {"$gt": CHAT_COMPACT_THRESHOLD}}]}}
+    ])
+    for session in sessions:
+        if session["last"] < cutoff:
+            stats["archived"] += _move_messages(chats_collection, chats_archive_collection, {"session_id": session["_id"]})
+        else:
+            stats["compacted"] += compact_chat_session(session["_id"])
+    return stats
+
+def chat_maintenance_loop():
+    while True:
+        try:
+            stats = maintain_chats()
+            if any(stats.values()):
+                print(f"🗜️ Chat maintenance: {stats}")
+        except Exception as e:
+            print(f"⚠️ Chat maintenance failed: {e}")
+        time_module.sleep(CHAT_MAINTENANCE_SECONDS)
+
+@app.on_event("startup")
+def start_chat_maintenance():
+    if chats_collection is None:
+        return
+    threading.Thread(target=chat_maintenance_loop, name="chat-maintenance", daemon=True).start()
+
+@app.post("/admin/chats/maintain")
+def run_chat_maintenance(user_info: dict = Depends(require_role("admin"))):
+    """Runs chat compaction/archival now instead of waiting for the next cycle."""
+    try:
+        return maintain_chats()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 def get_chat_history(session_id: str,limit=5):
     """Loads context from DB + System Prompt."""
     # Start with System Prompt (We reconstruct it to ensure it's fresh)
     messages = [SystemMessage(content=chat_history[0].content)] if chat_history else []
     
     try:
+        collection = chat_collection_for(session_id)
+        # A compacted session starts with its summary, older than all CHAT_KEEP_RECENT kept turns,
+        # so it never falls inside the last `limit`: read it from the oldest end of the session index
+        oldest = collection.find_one({"session_id": session_id}, {"role": 1, "content": 1}, sort=[("timestamp", 1), ("_id", 1)])
+        if oldest and oldest.get("role") == "summary":
+            messages.append(SystemMessage(content=oldest["content"]))
+
         # Filter MongoDB by "session_id"
-        recent_chats = list(chats_collection.find(
+        recent_chats = list(collection.find(
             {"session_id": session_id} # <--- Filter applied here
         ).sort("timestamp", -1).limit(limit))
         
         # Reverse to put in chronological order (Oldest -> Newest)
         for chat in reversed(recent_chats):
-            if chat["role"] == "user":
+            if chat["role"] == "summary":
+                continue  # Already added above
+            elif chat["role"] == "user":
                 messages.append(HumanMessage(content=chat["content"]))
             else:
                 # Treat AI responses as messages
@@ -2218,6 +2795,104 @@ def process_tool_calls(response, context_messages,username):
             
     return final_text, approval_required
 
+def process_uploaded_document(text: str, filename: str, username: str):
+    """Embeds an uploaded document and runs the meeting/autonomous pipeline. Blocking; runs on the threadpool."""
+    # 2. Embed into Pinecone
+    chunks = [text[i:i+1000] for i in range(0, len(text), 1000)]
+    vectors = []
+    for i, chunk in enumerate(chunks):
+        embedding = generate_embedding(chunk)
+        vectors.append({
+            "id": f"{username}_{filename}_part_{i}", 
+            "values": embedding,
+            "metadata": {"text": chunk, "source": filename, "username": username}
+        })
+    
+    memory_index.upsert(vectors=vectors)
+
+    # 3. Meeting-to-Tasks Pipeline Check
+    is_meeting = any(k in filename.lower() for k in ["meeting", "transcript", "minutes", "standup"])
+    if not is_meeting and any(k in text.lower()[:500] for k in ["action item", "discussed", "attendees"]):
+        is_meeting = True
+
+    if is_meeting:
+        # Extract structured action items and summary
+        extract_prompt = f"""
+        Analyze this meeting transcript and extract the key information in JSON format EXACTLY matching this structure:
+        {{
+            "summary": "Brief 2-sentence summary",
+            "key_decisions": ["Decision 1", "Decision 2"],
+            "action_items": [
+                {{"task": "Specific task to do", "owner": "Name of owner (or Unassigned)", "deadline": "YYYY-MM-DD (or empty)"}}
+            ]
+        }}
+        Transcript:
+        {text[:4000]} # Limit to 4k chars to avoid token limits
+        """
+        
+        try:
+            raw_response = llm.invoke([HumanMessage(content=extract_prompt)]).content
+            # Very basic JSON cleanup if LLM added markdown block
+            json_str = raw_response.replace("```json", "").replace("```", "").strip()
+            import json
+            meeting_data = json.loads(json_str)
+
+            # Auto-create Trello Cards for action items
+            cards_created = 0
+            for item in meeting_data.get("action_items", []):
+                task_name = item.get("task")
+                owner = item.get("owner", "Unassigned")
+                if task_name:
+                    success, _ = internal_create_trello(task_name, f"From meeting: {filename}", owner)
+                    if success:
+                        cards_created += 1
+
+            # Save Meeting Record
+            record = {
+                "filename": filename,
+                "uploaded_by": username,
+                "summary": meeting_data.get("summary", ""),
+                "key_decisions": meeting_data.get("key_decisions", []),
+                "action_items": meeting_data.get("action_items", []),
+                "cards_created": cards_created,
+                "created_at": datetime.now().strftime("%Y-%m-%d %H:%M")
+            }
+            meetings_collection.insert_one(record)
+
+            # Send Slack Recap
+            items_str = "\\n".join([f"• {i.get('task')} (Owner: {i.get('owner')})" for i in meeting_data.get("action_items", [])])
+            slack_msg = f"🎙️ **Meeting Processed:** {filename}\\n"
+            slack_msg += f"**Summary:** {meeting_data.get('summary')}\\n"
+            slack_msg += f"**Action Items (Cards created {cards_created}):**\\n{items_str}"
+            send_slack_announcement.invoke({"message": slack_msg})
+
+            final_reply = f"✅ Extracted meeting data from {filename}. Created {cards_created} Trello cards and posted recap to Slack."
+            save_chat_message("system_upload", "ai", final_reply)
+            return {"status": "processed", "reply": final_reply, "approval_required": False, "is_meeting": True}
+
+        except Exception as parse_error:
+            print(f"Failed to parse meeting pipeline JSON: {parse_error}")
+            # Fallback to normal upload if parsing fails...
+    
+    # 4. Standard AUTONOMOUS TRIGGER
+    system_trigger = f"""
+    SYSTEM_EVENT: User uploaded '{filename}'. 
+    Action Required:
+    1. Read the document content from memory to understand the context.
+    2. Do NOT output the raw content.
+    3. Do NOT generate a plan yet.
+    4. Simply reply: "✅ I have processed {filename} and stored it in memory. I am ready to use this context when you ask."
+    """
+    
+    save_chat_message("system_upload", "user", system_trigger)
+    messages = [HumanMessage(content=system_trigger)]
+    response = llm_with_tools.invoke(messages)
+    
+    final_reply, approval_required = process_tool_calls(response, messages, username)
+    save_chat_message("system_upload", "ai", str(final_reply))
+    
+    return {"status": "processed", "reply": final_reply, "approval_required": approval_required}
+
 @app.post("/upload")
 async def upload_document(file: UploadFile = File(...), username: str = Depends(get_current_user)):
     """
@@ -2229,101 +2904,8 @@ async def upload_document(file: UploadFile = File(...), username: str = Depends(
         content = await file.read()
         text = content.decode("utf-8")
         
-        # 2. Embed into Pinecone
-        chunks = [text[i:i+1000] for i in range(0, len(text), 1000)]
-        vectors = []
-        for i, chunk in enumerate(chunks):
-            embedding = generate_embedding(chunk)
-            vectors.append({
-                "id": f"{username}_{file.filename}_part_{i}", 
-                "values": embedding,
-                "metadata": {"text": chunk, "source": file.filename, "username": username}
-            })
-        
-        memory_index.upsert(vectors=vectors)
-
-        # 3. Meeting-to-Tasks Pipeline Check
-        is_meeting = any(k in file.filename.lower() for k in ["meeting", "transcript", "minutes", "standup"])
-        if not is_meeting and any(k in text.lower()[:500] for k in ["action item", "discussed", "attendees"]):
-            is_meeting = True
-
-        if is_meeting:
-            # Extract structured action items and summary
-            extract_prompt = f"""
-            Analyze this meeting transcript and extract the key information in JSON format EXACTLY matching this structure:
-            {{
-                "summary": "Brief 2-sentence summary",
-                "key_decisions": ["Decision 1", "Decision 2"],
-                "action_items": [
-                    {{"task": "Specific task to do", "owner": "Name of owner (or Unassigned)", "deadline": "YYYY-MM-DD (or empty)"}}
-                ]
-            }}
-            Transcript:
-            {text[:4000]} # Limit to 4k chars to avoid token limits
-            """
-            
-            try:
-                raw_response = llm.invoke([HumanMessage(content=extract_prompt)]).content
-                # Very basic JSON cleanup if LLM added markdown block
-                json_str = raw_response.replace("```json", "").replace("```", "").strip()
-                import json
-                meeting_data = json.loads(json_str)
-
-                # Auto-create Trello Cards for action items
-                cards_created = 0
-                for item in meeting_data.get("action_items", []):
-                    task_name = item.get("task")
-                    owner = item.get("owner", "Unassigned")
-                    if task_name:
-                        success, _ = internal_create_trello(task_name, f"From meeting: {file.filename}", owner)
-                        if success:
-                            cards_created += 1
-
-                # Save Meeting Record
-                record = {
-                    "filename": file.filename,
-                    "uploaded_by": username,
-                    "summary": meeting_data.get("summary", ""),
-                    "key_decisions": meeting_data.get("key_decisions", []),
-                    "action_items": meeting_data.get("action_items", []),
-                    "cards_created": cards_created,
-                    "created_at": datetime.now().strftime("%Y-%m-%d %H:%M")
-                }
-                meetings_collection.insert_one(record)
-
-                # Send Slack Recap
-                items_str = "\\n".join([f"• {i.get('task')} (Owner: {i.get('owner')})" for i in meeting_data.get("action_items", [])])
-                slack_msg = f"🎙️ **Meeting Processed:** {file.filename}\\n"
-                slack_msg += f"**Summary:** {meeting_data.get('summary')}\\n"
-                slack_msg += f"**Action Items (Cards created {cards_created}):**\\n{items_str}"
-                send_slack_announcement.invoke({"message": slack_msg})
-
-                final_reply = f"✅ Extracted meeting data from {file.filename}. Created {cards_created} Trello cards and posted recap to Slack."
-                save_chat_message("system_upload", "ai", final_reply)
-                return {"status": "processed", "reply": final_reply, "approval_required": False, "is_meeting": True}
-
-            except Exception as parse_error:
-                print(f"Failed to parse meeting pipeline JSON: {parse_error}")
-                # Fallback to normal upload if parsing fails...
-        
-        # 4. Standard AUTONOMOUS TRIGGER
-        system_trigger = f"""
-        SYSTEM_EVENT: User uploaded '{file.filename}'. 
-        Action Required:
-        1. Read the document content from memory to understand the context.
-        2. Do NOT output the raw content.
-        3. Do NOT generate a plan yet.
-        4. Simply reply: "✅ I have processed {file.filename} and stored it in memory. I am ready to use this context when you ask."
-        """
-        
-        save_chat_message("system_upload", "user", system_trigger)
-        messages = [HumanMessage(content=system_trigger)]
-        response = llm_with_tools.invoke(messages)
-        
-        final_reply, approval_required = process_tool_calls(response, messages, username)
-        save_chat_message("system_upload", "ai", str(final_reply))
-        
-        return {"status": "processed", "reply": final_reply, "approval_required": approval_required}
+        # 2-4. Embedding, LLM and Trello calls all block, so keep them off the event loop
+        return await run_in_threadpool(process_uploaded_document, text, file.filename, username)
 
     except Exception as e:
         print(f"Upload failed: {e}")
@@ -2334,11 +2916,11 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
     try:
         if users_collection is None or db is None:
             raise HTTPException(status_code=500, detail="Database connection failed.")
-        db.command("ping")
         if not SECRET_KEY or SECRET_KEY == "default_secret":
             raise HTTPException(status_code=500, detail="Server configuration error: SECRET_KEY not set")
-        user = users_collection.find_one({"username": form_data.username})
-        if not user or not pwd_context.verify(form_data.password, user["password"]):
+        user = await aio(users_collection).find_one({"username": form_data.username})
+        # bcrypt is deliberately slow (~100ms+); verifying on the loop would serialize every login
+        if not user or not await run_in_threadpool(pwd_context.verify, form_data.password, user["password"]):
             raise HTTPException(status_code=401, detail="Incorrect username or password")
         user_role = user.get("role", "developer")
         token = jwt.encode({"sub": user["username"], "role": user_role}, SECRET_KEY, algorithm=ALGORITHM)
@@ -2351,7 +2933,8 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
 
 @app.post("/register")
 async def register(user: User):
-    if users_collection.find_one({"username": user.username}):
+    users = aio(users_collection)
+    if await users.find_one({"username": user.username}):
         raise HTTPException(status_code=400, detail="Exists")
     
     # Auto-map profession to role if applicable
@@ -2362,16 +2945,17 @@ async def register(user: User):
         mapped_role = "developer"
 
     # First user auto-becomes admin
-    total_users = users_collection.count_documents({})
+    total_users = await users.count_documents({}, limit=1)
     if total_users == 0:
         mapped_role = "admin"
         
     if mapped_role not in VALID_ROLES:
         mapped_role = "developer"
         
-    users_collection.insert_one({
+    password_hash = await run_in_threadpool(pwd_context.hash, user.password)
+    await users.insert_one({
         "username": user.username,
-        "password": pwd_context.hash(user.password),
+        "password": password_hash,
         "role": mapped_role,
         "display_name": user.full_name or user.username,
         "email": user.email or user.username,
@@ -2385,15 +2969,24 @@ def add_employee(emp: Employee, user_info: dict = Depends(require_role("admin",
     try:
         if not emp.trello_id and emp.email:
             emp.trello_id = get_trello_id_by_email(emp.email)
-        employees_collection.insert_one(emp.dict())
+        employees_collection.insert_one(with_keys("employees", emp.dict()))
+        invalidate_employee_directory()
         refresh_system_prompt()
+        request_dashboard_refresh()
         return {"msg": f"Added {emp.name} (ID: {emp.trello_id})"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/employees")
-def get_employees(username: str = Depends(get_current_user)):
-    return list(employees_collection.find({}, {"_id": 0}))
+def get_employees(response: Response, cursor: Optional[str] = None, limit: int = 100, fields: Optional[str] = None, username: str = Depends(get_current_user)):
+    """Employees ordered by name, a page at a time (next page cursor in X-Next-Cursor)."""
+    projection = field_projection(fields, {"email_key": 0}, always=("_id", "name_key"))
+    page, next_cursor = paginate_sorted(employees_collection, {}, projection, cursor, limit, "name_key", 1)
+    for e in page:
+        del e["_id"]
+        e.pop("name_key", None)
+    set_next_cursor(response, next_cursor)
+    return page
 
 @app.post("/chat")
 def chat_endpoint(req: UserRequest, username: str = Depends(get_current_user)):
@@ -2415,15 +3008,26 @@ def chat_endpoint(req: UserRequest, username: str = Depends(get_current_user)):
     return {"reply": final_text, "approval_required": approval_required}
 
 @app.get("/chat/history/{session_id}")
-def get_full_history(session_id: str, username: str = Depends(get_current_user)):
-    """Returns the full chat history for the UI."""
+def get_full_history(session_id: str, response: Response, cursor: Optional[str] = None, limit: int = 50, fields: Optional[str] = None,
+                     archived: bool = False, username: str = Depends(get_current_user)):
+    """
+    Returns the chat history for the UI, oldest to newest. Pages backwards: the first
+    page is the latest `limit` messages and X-Next-Cursor points at the ones before it.
+    Compacted sessions start with a "summary" message; archived=true pages the original
+    turns. Sessions archived as idle are served from the archive automatically.
+    """
     try:
-        # Fetch all messages for this session, sorted oldest to newest
-        history = list(chats_collection.find(
-            {"session_id": session_id}, 
-            {"_id": 0, "role": 1, "content": 1, "timestamp": 1}
-        ).sort("timestamp", 1))
-        return history
+        collection = chat_collection_for(session_id)
+        if archived or (collection is chats_collection and not chats_collection.find_one({"session_id": session_id}, {"_id": 1})):
+            collection = chats_archive_collection
+        projection = field_projection(fields, {"_id": 1, "role": 1, "content": 1, "timestamp": 1}, always=("_id", "timestamp"))
+        history, next_cursor = paginate_sorted(collection, {"session_id": session_id}, projection, cursor, limit, "timestamp", -1)
+        for msg in history:
+            del msg["_id"]
+        set_next_cursor(response, next_cursor)
+        return history[::-1]
+    except HTTPException:
+        raise
     except Exception as e:
         return {"error": str(e)}
 
@@ -2439,8 +3043,12 @@ def approve_plan(req: ApproveRequest, user_info: dict = Depends(require_role("ad
     # ==========================================
     # 📦 PERSIST HIERARCHY: Epic → Story → Task
     # ==========================================
+    # Ids are allocated client-side so stories/tasks can point at their parents
+    # before anything is written; each level is then one insert_many.
     epic_cache = {}   # epic_name → epic_id (dedup)
     story_cache = {}  # (epic_id, story_name) → story_id (dedup)
+    epic_docs, story_docs, task_docs = [], [], []
+    now = datetime.now()
 
     for t in pending_plan["tasks"]:
         epic_name = t.get("epic") or pending_plan.get("goal", "Default Epic")
@@ -2448,17 +3056,17 @@ def approve_plan(req: ApproveRequest, user_info: dict = Depends(require_role("ad
 
         # --- Create or reuse Epic ---
         if epic_name and epic_name not in epic_cache:
-            epic_doc = {
+            epic_docs.append({
+                "_id": ObjectId(),
                 "name": epic_name,
                 "description": f"Auto-generated from plan: {pending_plan.get('goal', '')}",
                 "project_id": "default",
                 "color": "#6C5DD3",
                 "status": "active",
                 "created_by": username,
-                "created_at": datetime.now()
-            }
-            epic_result = epics_collection.insert_one(epic_doc)
-            epic_cache[epic_name] = str(epic_result.inserted_id)
+                "created_at": now
+            })
+            epic_cache[epic_name] = str(epic_docs[-1]["_id"])
         epic_id = epic_cache.get(epic_name, "")
 
         # --- Create or reuse Story ---
@@ -2466,7 +3074,8 @@ def approve_plan(req: ApproveRequest, user_info: dict = Depends(require_role("ad
         if story_name:
             cache_key = (epic_id, story_name)
             if cache_key not in story_cache:
-                story_doc = {
+                story_docs.append({
+                    "_id": ObjectId(),
                     "name": story_name,
                     "description": "",
                     "epic_id": epic_id,
@@ -2474,14 +3083,14 @@ def approve_plan(req: ApproveRequest, user_info: dict = Depends(require_role("ad
                     "assigned_to": "Unassigned",
                     "status": "todo",
                     "created_by": username,
-                    "created_at": datetime.now()
-                }
-                story_result = stories_collection.insert_one(story_doc)
-                story_cache[cache_key] = str(story_result.inserted_id)
+                    "created_at": now
+                })
+                story_cache[cache_key] = str(story_docs[-1]["_id"])
             story_id = story_cache.get(cache_key, "")
 
         # --- Create Task in MongoDB ---
-        task_doc = {
+        task_docs.append({
+            "_id": ObjectId(),
             "name": t.get("name", "Task"),
             "description": t.get("desc", ""),
             "epic_id": epic_id,
@@ -2494,10 +3103,19 @@ def approve_plan(req: ApproveRequest, user_info: dict = Depends(require_role("ad
             "estimated_hours": t.get("estimated_hours", 0),
             "actual_hours": 0,
             "depends_on": t.get("depends_on", []),
+            "epic_name": epic_name if epic_id else "Unassigned",
+            "epic_color": "#6C5DD3",
             "created_by": username,
-            "created_at": datetime.now()
-        }
-        tasks_collection.insert_one(task_doc)
+            "created_at": now,
+            "updated_at": now
+        })
+
+    for collection, docs in ((epics_collection, epic_docs), (stories_collection, story_docs), (tasks_collection, task_docs)):
+        if docs:
+            collection.insert_many(docs, ordered=False)
+    created_tasks = [{"task_id": str(d["_id"]), "task_name": d["name"], "from_status": None, "to_status": "todo"} for d in task_docs]
+
+    record_task_transitions(created_tasks, source="plan")
 
     # ==========================================
     # 📋 CREATE TRELLO CARDS (original flow)
@@ -2538,6 +3156,21 @@ def approve_plan(req: ApproveRequest, user_info: dict = Depends(require_role("ad
         f"The team has been notified via Slack and Trello cards have been synced to Google Calendars."
     )
 
+    # 🗂 Structured approval record (read by the dashboard sidebar & budget widgets)
+    try:
+        approvals_collection.insert_one({
+            "goal": pending_plan["goal"],
+            "total_cost": pending_plan.get("total_cost", 0),
+            "budget": pending_plan.get("budget", 0),
+            "task_count": len(pending_plan["tasks"]),
+            "approved_by": username,
+            "session_id": req.session_id,
+            "project_id": "default",
+            "timestamp": datetime.now()
+        })
+    except Exception as e:
+        print(f"❌ Error saving approval: {e}")
+
     try:
         save_chat_message("system_plan_management", "ai", dashboard_msg)
         
@@ -2550,16 +3183,21 @@ def approve_plan(req: ApproveRequest, user_info: dict = Depends(require_role("ad
         print(f"❌ Error during save: {e}")
 
     get_user_state(username)['pending_plan'] = None
+    request_dashboard_refresh()
     return {"reply": activation_msg}
 # 🔐 RBAC: Only PM/Admin can modify employees
 @app.put("/employees/{email}")
 def update_employee(email: str, emp: Employee, user_info: dict = Depends(require_role("admin", "pm"))):
-    employees_collection.update_one({"email": email}, {"$set": emp.dict()})
+    employees_collection.update_one({"email_key": normalize_key(email)}, {"$set": with_keys("employees", emp.dict())})
+    invalidate_employee_directory()
+    request_dashboard_refresh()
     return {"msg": "Updated successfully"}
 
 @app.delete("/employees/{email}")
 def delete_employee(email: str, user_info: dict = Depends(require_role("admin", "pm"))):
-    employees_collection.delete_one({"email": email})
+    employees_collection.delete_one({"email_key": normalize_key(email)})
+    invalidate_employee_directory()
+    request_dashboard_refresh()
     return {"msg": "Deleted successfully"}
 
 @app.post("/reject")
@@ -2601,325 +3239,638 @@ def get_risks(username: str = Depends(get_current_user)):
 
 
 # ==========================================
-# 🚀 NEW DASHBOARD ENDPOINT
+# 🚀 DASHBOARD SNAPSHOT (materialized)
 # ==========================================
+# The dashboard is expensive to compute (n8n calls, board parse, chat scan, per-task
+# time logs), so it is built by a background refresher and stored as one document.
+# GET /dashboard/data is then a single _id lookup. Its sources (the n8n board, approvals,
+# tasks, the team) are workspace-wide, so there is one snapshot, not one per project;
+# the board's status history is kept under DASHBOARD_BOARD_PROJECT_ID.
+DASHBOARD_SNAPSHOT_ID = "global"
+
+DASHBOARD_REFRESH_SECONDS = int(os.getenv("DASHBOARD_REFRESH_SECONDS", "120"))
+_dashboard_refresh_event = threading.Event()
+
+def is_known_project(project_id: str) -> bool:
+    """"default" or the id of a project in the projects collection."""
+    if project_id == "default":
+        return True
+    return ObjectId.is_valid(project_id) and projects_collection.find_one({"_id": ObjectId(project_id)}, {"_id": 1}) is not None
+
+def require_known_project(project_id: str):
+    if not is_known_project(project_id):
+        raise HTTPException(status_code=404, detail="Project not found")
+
+def request_dashboard_refresh():
+    """Called by write paths: wakes the background refresher immediately."""
+    _dashboard_refresh_event.set()
+
+def fetch_dashboard_cards():
+    """Fetches and unboxes the board cards used for dashboard analytics."""
+    analytics_url = os.getenv("N8N_DASHBOARD_URL") or N8N_GET_ALL_CARDS_URL
+    response = requests.get(analytics_url, timeout=30)
+    if response.status_code != 200:
+        raise Exception(f"n8n returned {response.status_code}")
+    raw_data = response.json()
 
-@app.get("/dashboard/data", response_model=DashboardStats)
-def get_dashboard_data(username: str = Depends(get_current_user)):
-    real_active_agents = get_active_workflow_count()
-    
-    # 1. INITIALIZE EVERYTHING
-    tasks_due_today = 0
-    overdue_tasks = 0
-    status_counts = {"Completed": 0, "In Progress": 0, "Not Started": 0}
-    total_employees = 0
-    if employees_collection is not None:
-        total_employees = employees_collection.count_documents({})
-    
+    # Handle unboxing logic correctly
+    if isinstance(raw_data, list) and len(raw_data) > 0:
+        first_item = raw_data[0]
+        cards = first_item.get("", raw_data) if isinstance(first_item, dict) else raw_data
+    else:
+        cards = raw_data
+
+    clean_cards = []
+    for c in cards or []:
+        if isinstance(c, dict) and "json" in c: c = c["json"]
+        if isinstance(c, dict): clean_cards.append(c)
+    return clean_cards
+
+def card_status(c) -> str:
+    """Maps a Trello card to 'done', 'in_progress' or 'todo'."""
+    trello_done_list = os.getenv("TRELLO_DONE_LIST_ID", "6922b7e358b2e5d625ad65ba")
+    trello_in_progress_list = os.getenv("TRELLO_IN_PROGRESS_LIST_ID", "6922b7e358b2e5d625ad65b9")
+    if c.get("idList") == trello_done_list or c.get("dueComplete") is True:
+        return "done"
+    if c.get("idList") == trello_in_progress_list:
+        return "in_progress"
+    return "todo"
+
+def _card_due_date(c):
+    if not c.get("due"): return None
+    try:
+        return datetime.fromisoformat(c["due"].replace("Z", "+00:00")).date()
+    except Exception as e:
+        print(f"Date parse error: {e}")
+        return None
+
+def build_dashboard_counters(cards):
     today = datetime.now().date()
-    completed_line = {(today + timedelta(days=i)).strftime("%d %b"): 0 for i in range(-2, 12)}
-    active_line = {(today + timedelta(days=i)).strftime("%d %b"): 0 for i in range(-2, 12)}
-    upcoming_line = {(today + timedelta(days=i)).strftime("%d %b"): 0 for i in range(-2, 12)}
-    sorted_dates = list(completed_line.keys())
-
-    # --- 🚀 STEP A: DYNAMIC SIDEBAR & BUDGET FROM MONGODB ---
-    # Fetch last 3 approvals to fill sidebar and get current project totals
-    # --- 🚀 STEP A: DYNAMIC SIDEBAR & BUDGET FROM MONGODB ---
-    # --- 🚀 STEP A: DYNAMIC SIDEBAR & BUDGET FROM MONGODB ---
-    import re
-
-    approved_chats = list(chats_collection.find(
-        {"content": {"$regex": "APPROVED:"}}, 
-        {"content": 1, "_id": 0}
-    ).sort("timestamp", -1).limit(3))
+    counters = {"tasks_due": 0, "overdue": 0, "resolved_risks": 0, "in_progress": 0, "not_started": 0}
+    for c in cards:
+        status = card_status(c)
+        if status == "done": counters["resolved_risks"] += 1
+        elif status == "in_progress": counters["in_progress"] += 1
+        else: counters["not_started"] += 1
+
+        due = _card_due_date(c)
+        if due and status != "done":
+            if due < today: counters["overdue"] += 1
+            elif due == today: counters["tasks_due"] += 1
+
+    counters["active"] = get_active_workflow_count()
+    counters["total_team"] = len(list_employees()) if employees_collection is not None else 0
+    return counters
+
+def build_line_chart(cards):
+    today = datetime.now().date()
+    sorted_dates = [(today + timedelta(days=i)).strftime("%d %b") for i in range(-2, 12)]
+    lines = {"done": dict.fromkeys(sorted_dates, 0), "in_progress": dict.fromkeys(sorted_dates, 0), "todo": dict.fromkeys(sorted_dates, 0)}
+    for c in cards:
+        due = _card_due_date(c)
+        if not due: continue
+        date_str = due.strftime("%d %b")
+        if date_str in lines["done"]:
+            lines[card_status(c)][date_str] += 1
 
-    sidebar_projects = []
-    total_project_budget = "$0"
-    current_project_name = "Core Operations"
+    return {
+        "labels": sorted_dates,
+        "datasets": [
+            {"label": "Completed", "data": [lines["done"][d] for d in sorted_dates], "borderColor": "#6C5DD3", "backgroundColor": ["transparent"], "tension": 0.4},
+            {"label": "Active", "data": [lines["in_progress"][d] for d in sorted_dates], "borderColor": "#FFCE73", "backgroundColor": ["transparent"], "tension": 0.4},
+            {"label": "Upcoming", "data": [lines["todo"][d] for d in sorted_dates], "borderColor": "#3F8CFF", "backgroundColor": ["transparent"], "tension": 0.4}
+        ]
+    }
 
-    for i, msg in enumerate(approved_chats):
-        content = msg["content"]
-        try:
-            # 1. Capture text after APPROVED: up until the first newline or emoji
-            # The [^\n\r🚨💰✅💵*]+ part ensures we don't grab icons or markdown stars
-            name_match = re.search(r"APPROVED:?\*?\*?\s*([^\n\r🚨💰✅💵*]+)", content)
-            
-            if name_match:
-                # 👈 THE FIX: Explicitly remove literal "\n" strings and extra stars
-                proj_name = name_match.group(1).replace("\\n", "").replace("*", "").strip()
-                
-                if proj_name and proj_name not in sidebar_projects:
-                    sidebar_projects.append(proj_name)
-                
-                # Use the most recent one for main header
-                if i == 0:
-                    current_project_name = proj_name
-                    # Find dollar amount line
-                    budget_match = re.search(r"Total:?\*?\*?\s*(\$[\d,.]+)", content)
-                    if budget_match:
-                        total_project_budget = budget_match.group(1).strip()
-        except Exception as e:
-            print(f"⚠️ Parsing error: {e}")
+def build_donut_chart(cards):
+    counts = Counter(card_status(c) for c in cards)
+    return {
+        "labels": ["Completed", "In Progress", "Not Started"],
+        "datasets": [{
+            "label": "Tasks",
+            "data": [counts["done"], counts["in_progress"], counts["todo"]],
+            "backgroundColor": ["#6C5DD3", "#3F8CFF", "#FFCE73"]
+        }]
+    }
+
+def get_recent_approvals(limit: int = 3):
+    """Latest approved plans, newest first (served by the approvals timestamp index)."""
+    return list(approvals_collection.find(
+        {}, {"_id": 0, "goal": 1, "total_cost": 1, "budget": 1}
+    ).sort("timestamp", -1).limit(limit))
 
+def build_sidebar_widget():
+    """Current project name, its budget and the last 3 approved projects."""
+    approvals = get_recent_approvals(3)
+
+    sidebar_projects = []
+    for a in approvals:
+        if a.get("goal") and a["goal"] not in sidebar_projects:
+            sidebar_projects.append(a["goal"])
     if not sidebar_projects:
         sidebar_projects = ["Nexus Platform", "Agent Core", "Sync Engine"]
-    
-    sidebar_projects = sidebar_projects[:3]
-    
-    # --- 🚀 STEP B: TRELLO DATA PROCESSING ---
+
+    latest = approvals[0] if approvals else {}
+    return {
+        "current_project": latest.get("goal", "Core Operations"),
+        "recent_projects": sidebar_projects[:3],
+        "total_budget": f"${latest.get('total_cost', 0):,.0f}"
+    }
+
+def build_finance_widget(cards):
+    """Board cost burn + native task estimated vs actual hours."""
+    finance_items = [] 
+    total_committed_dollars = 0
+
+    # --- 1. FINANCIAL BURN ANALYSIS (board) ---
+    for c in cards:
+        desc = c.get("desc", "")
+        if "💰 **Cost:**" in desc:
+            try:
+                raw_amt = desc.split("💰 **Cost:**")[1].split("(")[0].replace("$", "").replace(",", "").strip()
+                cost_val = int(float(raw_amt))
+                total_committed_dollars += cost_val 
+
+                if cost_val >= 500:
+                    finance_items.append({
+                        "date": datetime.now().strftime("%b %d"),
+                        "category": "Major Resource",
+                        "details": c.get("name").split("]")[-1].strip(),
+                        "amount": f"${cost_val}",
+                        "status": "Released" if card_status(c) == "done" else "Allocated",
+                        "isPositive": False,
+                        "numeric": cost_val 
+                    })
+            except: pass
+
+    # 2. PM ANALYSIS: Sort by highest risk (highest cost)
+    finance_items.sort(key=lambda x: x.get('numeric', 0), reverse=True)
+
+    # --- BUDGET BURN GAUGE ---
+    burn_percentage = 0
     try:
-        analytics_url = os.getenv("N8N_DASHBOARD_URL") or N8N_GET_ALL_CARDS_URL
-        response = requests.get(analytics_url, timeout=30)
-        
-        # 1. Initialize storage for Analysis
-        finance_items = [] 
-        total_committed_dollars = 0
-        
-        if response.status_code == 200:
-            raw_data = response.json()
+        latest = next(iter(get_recent_approvals(1)), {})
+        # Burn against the approved budget limit, or the plan's total cost if none was set
+        total_b = latest.get("budget") or latest.get("total_cost") or 0
+        if total_b:
+            # Spent = sum of negative finance items
+            spent = sum(
+                float(fi.get("amount","0").replace("$","").replace(",","").replace("-",""))
+                for fi in finance_items if not fi.get("isPositive", True)
+            )
+            burn_percentage = min(round((spent / total_b * 100), 1) if total_b > 0 else 0, 100)
+    except Exception as be:
+        print(f"Burn gauge error: {be}")
+
+    # --- TIME TRACKING & NATIVE PROJECT TASKS: Estimated vs Actual ---
+    try:
+        native_tasks = list(tasks_collection.find({}, {"_id": 0, "name": 1, "due_date": 1, "estimated_hours": 1, "actual_hours": 1}))
+        # One $group for every task's logged hours instead of a query per task
+        logged_hours = aggregate_logged_hours(
+            [t.get("name") for t in native_tasks if not t.get("actual_hours")]
+        )
+        for t in native_tasks:
+            est = t.get("estimated_hours", 0)
+            act = t.get("actual_hours", 0)
             
-            # Handle unboxing logic correctly
-            if isinstance(raw_data, list) and len(raw_data) > 0:
-                first_item = raw_data[0]
-                cards = first_item.get("", raw_data) if isinstance(first_item, dict) else raw_data
-            else:
-                cards = raw_data
+            # If actual_hours is not directly on the task, use the time_logs rollup
+            if act == 0:
+                act = logged_hours.get(t.get("name"), 0)
+                
+            # Calculate cost (assuming $50/hr average blend)
+            est_cost = est * 50
+            act_cost = act * 50
+            
+            if est > 0 or act > 0:
+                status = "✅ Under Budget" if act <= est else "⚠️ Over Budget"
+                finance_items.append({
+                    "date": t.get("due_date", datetime.now().strftime("%b %d")),
+                    "category": "Native Task",
+                    "details": t.get("name", "Unknown Task"),
+                    "amount": f"${act_cost:,.0f} / ${est_cost:,.0f}",
+                    "status": status,
+                    "isPositive": act <= est,
+                    "numeric": act_cost,
+                    "estimated_hours": est,
+                    "actual_hours": act
+                })
+    except Exception as e:
+        print(f"Native task finance calc error: {e}")
 
-            # Define today at the start of the processing block
-            # Define today at the start of the processing block
-            today_dt = datetime.now().date()
+    return {
+        "finance_table": finance_items[:5], # Top 5 High-Impact items
+        "committed_budget": f"${total_committed_dollars}", # Total board reality
+        "burn_percentage": burn_percentage
+    }
 
-            for c in cards:
-                if isinstance(c, dict) and "json" in c: c = c["json"]
-                if not isinstance(c, dict): continue
+def build_workload_widget(cards):
+    owner_card_counts = {}
+    for c in cards:
+        if card_status(c) == "done": continue
+        cn = c.get("name", "")
+        if "[" in cn and "]" in cn:
+            ow = cn.split("]")[0].replace("[", "").strip()
+            owner_card_counts[ow] = owner_card_counts.get(ow, 0) + 1
+
+    workload_items = []
+    for emp in list_employees():
+        emp_name = emp.get("name", "Unknown")
+        count = owner_card_counts.get(emp_name, 0)
+        if count >= 6:
+            wl_status = "overloaded"
+        elif count >= 3:
+            wl_status = "busy"
+        else:
+            wl_status = "available"
+        workload_items.append({"name": emp_name, "role": emp.get("role", ""), "active_tasks": count, "status": wl_status})
+    return {"team_workload": workload_items}
 
-                # --- 1. STATUS & CHART LOGIC ---
-                list_id = c.get("idList")
-                trello_done_list = os.getenv("TRELLO_DONE_LIST_ID", "6922b7e358b2e5d625ad65ba")
-                trello_in_progress_list = os.getenv("TRELLO_IN_PROGRESS_LIST_ID", "6922b7e358b2e5d625ad65b9")
-                
-                is_done = (list_id == trello_done_list) or c.get("dueComplete") is True
+def build_burndown_widget(project_id: str = "default"):
+    """14-day burndown + cumulative flow from the task status rollups."""
+    # The dashboard tracks the board; fall back to native tasks if the board has no history
+    history = get_status_history(project_id, "board", 14)
+    if not any(sum(counts.values()) for _, counts in history):
+        history = get_status_history(project_id, "tasks", 14)
 
-                if is_done:
-                    status_counts["Completed"] += 1
-                elif list_id == trello_in_progress_list:
-                    status_counts["In Progress"] += 1
-                else:
-                    status_counts["Not Started"] += 1
-                
-                # --- 🚨 CHART & COUNTER LOGIC (THE FIX) ---
-                if c.get("due"):
-                    try:
-                        # Standardize date parsing
-                        due_dt_full = datetime.fromisoformat(c["due"].replace("Z", "+00:00"))
-                        due_dt = due_dt_full.date()
-                        date_str = due_dt.strftime("%d %b") # Format to match your sorted_dates keys
-
-                        # A. Update Line Chart Dictionaries if the date exists in our range
-                        if date_str in completed_line:
-                            if is_done:
-                                completed_line[date_str] += 1
-                            elif list_id == trello_in_progress_list:
-                                active_line[date_str] += 1
-                            else:
-                                upcoming_line[date_str] += 1
-
-                        # B. Update Dashboard Top Counters
-                        if not is_done:
-                            if due_dt < today_dt:
-                                overdue_tasks += 1
-                            elif due_dt == today_dt:
-                                tasks_due_today += 1
-                    except Exception as e:
-                        print(f"Date parse error: {e}")
-
-                # --- 2. FINANCIAL BURN ANALYSIS ---
-                desc = c.get("desc", "")
-                if "💰 **Cost:**" in desc:
-                    try:
-                        raw_amt = desc.split("💰 **Cost:**")[1].split("(")[0].replace("$", "").replace(",", "").strip()
-                        cost_val = int(float(raw_amt))
-                        total_committed_dollars += cost_val 
-
-                        if cost_val >= 500:
-                            finance_items.append({
-                                "date": datetime.now().strftime("%b %d"),
-                                "category": "Major Resource",
-                                "details": c.get("name").split("]")[-1].strip(),
-                                "amount": f"${cost_val}",
-                                "status": "Released" if is_done else "Allocated",
-                                "isPositive": False,
-                                "numeric": cost_val 
-                            })
-                    except: pass
+    labels = [datetime.strptime(d, "%Y-%m-%d").strftime("%b %d") for d, _ in history]
+    remaining = [counts["todo"] + counts["in_progress"] for _, counts in history]
 
-            # 2. PM ANALYSIS: Sort by highest risk (highest cost)
-            finance_items.sort(key=lambda x: x.get('numeric', 0), reverse=True)
+    # Planned: linear burn from the first day's open work to 0
+    start_remaining = remaining[0] if remaining else 0
+    steps = max(len(history) - 1, 1)
+    planned = [max(0, round(start_remaining - start_remaining * i / steps)) for i in range(len(history))]
 
-            # --- BUDGET BURN GAUGE ---
-            burn_percentage = 0
-            try:
-                budget_str = total_budget_str if 'total_budget_str' in dir() else "0"
-                # Parse numeric from strings like "$45,000" or "45000"
-                budget_nums = [float(x.replace(",","").replace("$","").replace("-","")) 
-                               for x in [budget_str] if any(c.isdigit() for c in x)]
-                if budget_nums:
-                    total_b = budget_nums[0]
-                    # Spent = sum of negative finance items
-                    spent = sum(
-                        float(fi.get("amount","0").replace("$","").replace(",","").replace("-",""))
-                        for fi in finance_items if not fi.get("isPositive", True)
-                    )
-                    burn_percentage = min(round((spent / total_b * 100), 1) if total_b > 0 else 0, 100)
-            except Exception as be:
-                print(f"Burn gauge error: {be}")
-
-            # --- BURNDOWN CHART DATA ---
-            burndown_data = {"labels": [], "planned": [], "actual": []}
-            try:
-                today_bd = datetime.now().date()
-                # Build a 14-day burndown: total tasks minus done per day
-                total_bd_tasks = len(cards)
-                done_cards = [c for c in cards
-                              if (c.get("json", c) if isinstance(c, dict) else c).get("dueComplete")]
-                
-                burndown_labels = []
-                planned_line = []
-                actual_line = []
-                
-                for i in range(14, -1, -1):
-                    day = today_bd - timedelta(days=i)
-                    burndown_labels.append(day.strftime("%b %d"))
-                    # Planned: linear burn from total to 0
-                    planned_line.append(max(0, total_bd_tasks - round((14 - i) * total_bd_tasks / 14)))
-                    # Actual: remaining tasks (simplified)
-                    done_by_day = sum(1 for c in done_cards if True)  # simplified
-                    actual_remaining = max(0, total_bd_tasks - round(len(done_cards) * (14 - i) / 14))
-                    actual_line.append(actual_remaining)
-                
-                burndown_data = {
-                    "labels": burndown_labels,
-                    "planned": planned_line,
-                    "actual": actual_line
-                }
-            except Exception as bde:
-                print(f"Burndown calc error: {bde}")
+    return {
+        "burndown_chart": {"labels": labels, "planned": planned, "actual": remaining},
+        "cumulative_flow": {
+            "labels": labels,
+            "datasets": [
+                {"label": "Done", "data": [c["done"] for _, c in history], "borderColor": "#6C5DD3"},
+                {"label": "In Progress", "data": [c["in_progress"] for _, c in history], "borderColor": "#3F8CFF"},
+                {"label": "To Do", "data": [c["todo"] for _, c in history], "borderColor": "#FFCE73"}
+            ]
+        }
+    }
 
-            # --- TEAM WORKLOAD CALCULATION ---
-            workload_items = []
-            try:
-                all_employees = list(employees_collection.find({}, {"_id": 0, "name": 1, "role": 1}))
-                owner_card_counts = {}
-                trello_done_id = os.getenv("TRELLO_DONE_LIST_ID", "6922b7e358b2e5d625ad65ba")
-                for c in cards:
-                    card_data = c
-                    if isinstance(card_data, dict) and "json" in card_data: card_data = card_data["json"]
-                    if not isinstance(card_data, dict): continue
-                    if card_data.get("idList") == trello_done_id or card_data.get("dueComplete"): continue
-                    cn = card_data.get("name", "")
-                    if "[" in cn and "]" in cn:
-                        ow = cn.split("]")[0].replace("[", "").strip()
-                        owner_card_counts[ow] = owner_card_counts.get(ow, 0) + 1
-                
-                for emp in all_employees:
-                    emp_name = emp.get("name", "Unknown")
-                    emp_role = emp.get("role", "")
-                    count = owner_card_counts.get(emp_name, 0)
-                    if count >= 6:
-                        wl_status = "overloaded"
-                    elif count >= 3:
-                        wl_status = "busy"
-                    else:
-                        wl_status = "available"
-                    workload_items.append({"name": emp_name, "role": emp_role, "active_tasks": count, "status": wl_status})
-            except Exception as e:
-                print(f"Workload calc error: {e}")
+# --- Per-widget cache ---
+# Each widget is served on its own (GET /dashboard/widgets/{name}) with its own TTL,
+# so one slow or failing upstream only affects the widgets that depend on it.
+# Widgets: builder(cards) → dict of DashboardStats fields.
+DASHBOARD_WIDGETS = {
+    "counters":   lambda cards: build_dashboard_counters(cards),
+    "sidebar":    lambda cards: build_sidebar_widget(),
+    "line-chart": lambda cards: {"line_chart": build_line_chart(cards)},
+    "donut":      lambda cards: {"donut_chart": build_donut_chart(cards)},
+    "finance":    lambda cards: build_finance_widget(cards),
+    "workload":   lambda cards: build_workload_widget(cards),
+    "burndown":   lambda cards: build_burndown_widget(DASHBOARD_BOARD_PROJECT_ID),
+}
+BOARD_WIDGETS = {"counters", "line-chart", "donut", "finance", "workload"}  # Need the Trello board
+
+# Seconds a built widget is served before it is rebuilt
+DASHBOARD_WIDGET_TTLS = {
+    "counters": 60, "sidebar": 300, "line-chart": 120, "donut": 60,
+    "finance": 300, "workload": 120, "burndown": 600,
+}
+DASHBOARD_BOARD_TTL_SECONDS = int(os.getenv("DASHBOARD_BOARD_TTL_SECONDS", "30"))
+
+_board_cards_cache = None  # (fetched_at, cards); replaced whole, so reads need no lock
+_board_fetch_lock = threading.Lock()  # Single flight: at most one n8n board fetch at a time
+_widget_cache = {}         # widget → (built_at, value)
+_widget_cache_lock = threading.Lock()
+
+def get_board_cards(max_age: int = DASHBOARD_BOARD_TTL_SECONDS):
+    """
+    Board cards shared by every board widget, fetched by one caller at a time.
+    While a fetch is running, callers with cards to fall back on get those instead of
+    waiting; a cold cache or forced refresh (max_age=0) waits and reuses its result.
+    """
+    global _board_cards_cache
+    requested_at = time_module.time()
+    cached = _board_cards_cache
+    if cached and requested_at - cached[0] < max_age:
+        return cached[1]
+    if not _board_fetch_lock.acquire(blocking=not cached or max_age == 0):
+        return cached[1]
+    try:
+        cached = _board_cards_cache
+        if cached and cached[0] >= requested_at:  # Fetched by the caller we waited for
+            return cached[1]
+        cards = fetch_dashboard_cards()
+        mirror_board_statuses(cards, DASHBOARD_BOARD_PROJECT_ID)
+        _board_cards_cache = (time_module.time(), cards)
+        return cards
+    finally:
+        _board_fetch_lock.release()
+
+def load_dashboard_widget(name: str, force: bool = False, cards: list = None):
+    """
+    Returns (value, built_at) for one widget.
+    Serves the cached value within its TTL; if a rebuild fails, the last good value
+    is served instead. Raises only when the widget has never been built.
+    Board widgets use `cards` when given, so a full rebuild fetches the board once.
+    """
+    key = name
+    cached = _widget_cache.get(key)
+    if cached and not force and time_module.time() - cached[0] < DASHBOARD_WIDGET_TTLS[name]:
+        return cached[1], datetime.fromtimestamp(cached[0])
 
-            # --- TIME TRACKING & NATIVE PROJECT TASKS: Estimated vs Actual ---
+    try:
+        if name in BOARD_WIDGETS and cards is None:
+            cards = get_board_cards(0 if force else DASHBOARD_BOARD_TTL_SECONDS)
+        value = DASHBOARD_WIDGETS[name](cards)
+    except Exception as e:
+        print(f"⚠️ Dashboard widget '{name}' failed: {e}")
+        if cached:
+            return cached[1], datetime.fromtimestamp(cached[0])
+        raise
+
+    built_at = time_module.time()
+    with _widget_cache_lock:
+        _widget_cache[key] = (built_at, value)
+    return value, datetime.fromtimestamp(built_at)
+
+def build_dashboard_snapshot(previous: dict = None):
+    """Computes the full (user-independent) dashboard document from the widgets."""
+    # A widget that fails keeps its value from the previous snapshot
+    if previous is None:
+        previous = dashboard_snapshots_collection.find_one({"_id": DASHBOARD_SNAPSHOT_ID}) or {}
+    snapshot = dict(previous)
+    try:
+        cards = get_board_cards(0)  # One fresh fetch shared by every board widget
+    except Exception as e:
+        print(f"⚠️ Dashboard board fetch failed: {e}")
+        cards = None
+    for name, builder in DASHBOARD_WIDGETS.items():
+        try:
+            if name in BOARD_WIDGETS and cards is None:
+                raise RuntimeError("board unavailable")
+            value, _ = load_dashboard_widget(name, force=True, cards=cards)
+        except Exception:
+            if previous:
+                continue
             try:
-                # Add native tasks to finance_items
-                native_tasks = list(tasks_collection.find({}, {"_id": 0}))
-                for t in native_tasks:
-                    est = t.get("estimated_hours", 0)
-                    act = t.get("actual_hours", 0)
-                    
-                    # If actual_hours is not directly on the task, sum from time_logs
-                    if act == 0 and time_logs_collection:
-                        logs = list(time_logs_collection.find({"task_name": t.get("name")}))
-                        act = sum(l.get("hours", 0) for l in logs)
-                        
-                    # Calculate cost (assuming $50/hr average blend)
-                    est_cost = est * 50
-                    act_cost = act * 50
-                    
-                    # We add this as a finance item
-                    if est > 0 or act > 0:
-                        status = "✅ Under Budget" if act <= est else "⚠️ Over Budget"
-                        finance_items.append({
-                            "date": t.get("due_date", datetime.now().strftime("%b %d")),
-                            "category": "Native Task",
-                            "details": t.get("name", "Unknown Task"),
-                            "amount": f"${act_cost:,.0f} / ${est_cost:,.0f}",
-                            "status": status,
-                            "isPositive": act <= est,
-                            "numeric": act_cost,
-                            "estimated_hours": est,
-                            "actual_hours": act
-                        })
-            except Exception as e:
-                print(f"Native task finance calc error: {e}")
+                value = builder([])  # First build with the board down: empty board
+            except Exception:
+                continue
+        snapshot.update(value)
+
+    snapshot["_id"] = DASHBOARD_SNAPSHOT_ID
+    snapshot["generated_at"] = datetime.now()
+    return snapshot
+
+def refresh_dashboard_snapshot():
+    """Rebuilds and stores the dashboard document."""
+    previous = dashboard_snapshots_collection.find_one({"_id": DASHBOARD_SNAPSHOT_ID}) or {}
+    snapshot = build_dashboard_snapshot(previous)
+    dashboard_snapshots_collection.replace_one({"_id": DASHBOARD_SNAPSHOT_ID}, snapshot, upsert=True)
+
+    # Open dashboards only receive what changed (every stream: project_id None)
+    delta = diff_dashboard_snapshots(previous, snapshot) if previous else None
+    if delta:
+        publish_dashboard_event(None, "delta", {**delta, "generated_at": snapshot["generated_at"]})
+    return snapshot
+
+def dashboard_refresher_loop():
+    """Background thread: rebuilds the snapshot on a timer or when a write path asks."""
+    # Snapshots used to be stored per project id, each a copy of the same data
+    dashboard_snapshots_collection.delete_many({"_id": {"$ne": DASHBOARD_SNAPSHOT_ID}})
+    while True:
+        _dashboard_refresh_event.wait(timeout=DASHBOARD_REFRESH_SECONDS)
+        _dashboard_refresh_event.clear()
+        try:
+            roll_status_days_forward()
+            refresh_dashboard_snapshot()
+        except Exception as e:
+            print(f"⚠️ Dashboard refresh failed: {e}")
 
-            # 🚀 FIND THE USER RECORD USING THE AUTHENTICATED USERNAME
-            user_record = users_collection.find_one({"username": username}, {"display_name": 1, "role": 1})
-            
-            # 🚀 FALLBACK: If they haven't set a name yet, use "Project Manager"
-            display_name = user_record.get("display_name", "Project Manager") if user_record else "Project Manager"
-            user_role = user_record.get("role", "developer") if user_record else "developer"
-            return {
-                "tasks_due": tasks_due_today,
-                "overdue": overdue_tasks,
-                "active": real_active_agents,
-                "resolved_risks": status_counts["Completed"],
-                "in_progress": status_counts["In Progress"], 
-                "not_started": status_counts["Not Started"], 
-                "total_team": total_employees,
-                "total_budget": total_project_budget,
-                "user_display_name": display_name,
-                "committed_budget": f"${total_committed_dollars}", # Total board reality
-                "current_project": current_project_name,
-                "recent_projects": sidebar_projects,
-                "line_chart": {
-                    "labels": sorted_dates,
-                    "datasets": [
-                        {"label": "Completed", "data": [completed_line[d] for d in sorted_dates], "borderColor": "#6C5DD3", "backgroundColor": ["transparent"], "tension": 0.4},
-                        {"label": "Active", "data": [active_line[d] for d in sorted_dates], "borderColor": "#FFCE73", "backgroundColor": ["transparent"], "tension": 0.4},
-                        {"label": "Upcoming", "data": [upcoming_line[d] for d in sorted_dates], "borderColor": "#3F8CFF", "backgroundColor": ["transparent"], "tension": 0.4}
-                    ]
-                },
-                "donut_chart": {
-                    "labels": ["Completed", "In Progress", "Not Started"],
-                    "datasets": [{
-                        "label": "Tasks",
-                        "data": [status_counts["Completed"], status_counts["In Progress"], status_counts["Not Started"]],
-                        "backgroundColor": ["#6C5DD3", "#3F8CFF", "#FFCE73"]
-                    }]
-                },
-                "finance_table": finance_items[:5], # Top 5 High-Impact items
-                "team_workload": workload_items,
-                "burn_percentage": burn_percentage,
-                "burndown_chart": burndown_data,
-                "user_role": user_role
-            }
+# Every registered hot query must be served by an index: "strict" refuses to start, "warn" only logs
+MONGO_INDEX_CHECK = os.getenv("MONGO_INDEX_CHECK", "strict")
 
+@app.on_event("startup")
+def check_query_indexes():
+    if db is None or MONGO_INDEX_CHECK == "off" or storage.backend == "memory":  # No query planner in memory
+        return
+    try:
+        verify_hot_queries(db)
+    except RuntimeError as e:
+        if MONGO_INDEX_CHECK == "strict":
+            raise
+        print(f"⚠️ {e}")
     except Exception as e:
-        print(f"⚠️ Dashboard Analytics Error: {e}")
-        return {}
+        print(f"⚠️ Index check skipped: {e}")
+
+@app.on_event("startup")
+def start_dashboard_refresher():
+    if dashboard_snapshots_collection is None:
+        return
+    threading.Thread(target=dashboard_refresher_loop, name="dashboard-refresher", daemon=True).start()
+    request_dashboard_refresh()
+
+@app.get("/dashboard/data", response_model=DashboardStats)
+def get_dashboard_data(refresh: bool = False, user_info: dict = Depends(get_current_user_with_role)):
+    """
+    Returns the materialized dashboard.
+    PMs/Admins can pass ?refresh=true to rebuild it synchronously.
+    """
+    if refresh and user_info["role"] not in ("admin", "pm"):
+        raise HTTPException(status_code=403, detail="Only PMs can force a dashboard refresh.")
+
+    snapshot = None if refresh else dashboard_snapshots_collection.find_one({"_id": DASHBOARD_SNAPSHOT_ID})
+    if snapshot is None:
+        snapshot = refresh_dashboard_snapshot()
+    snapshot.pop("_id", None)
+    snapshot.update(get_dashboard_profile(user_info))
+    return snapshot
+
+@app.get("/dashboard/profile")
+def get_dashboard_profile(user_info: dict = Depends(get_current_user_with_role)):
+    """Display name + role for the dashboard header (per user, never cached)."""
+    # 🚀 FIND THE USER RECORD USING THE AUTHENTICATED USERNAME
+    user_record = users_collection.find_one({"username": user_info["username"]}, {"display_name": 1, "role": 1})
+    return {
+        "user_display_name": user_record.get("display_name", "Project Manager") if user_record else "Project Manager",
+        "user_role": user_record.get("role", "developer") if user_record else "developer"
+    }
+
+@app.get("/dashboard/widgets/{widget}")
+def get_dashboard_widget(widget: str, refresh: bool = False, user_info: dict = Depends(get_current_user_with_role)):
+    """
+    One dashboard widget: counters, sidebar, line-chart, donut, finance, workload or burndown.
+    Each has its own cache TTL; a failing upstream returns the last good value, or 503.
+    """
+    if widget not in DASHBOARD_WIDGETS:
+        raise HTTPException(status_code=404, detail=f"Unknown dashboard widget '{widget}'.")
+    if refresh and user_info["role"] not in ("admin", "pm"):
+        raise HTTPException(status_code=403, detail="Only PMs can force a dashboard refresh.")
+    try:
+        value, built_at = load_dashboard_widget(widget, force=refresh)
+    except Exception:
+        raise HTTPException(status_code=503, detail=f"Dashboard widget '{widget}' is temporarily unavailable.")
+    return {**value, "generated_at": built_at}
+
+# ==========================================
+# 📡 DASHBOARD STREAM (Server-Sent Events)
+# ==========================================
+# Snapshot refreshes publish deltas into a ring buffer with increasing ids.
+# GET /dashboard/stream replays anything after Last-Event-ID, then waits; idle
+# connections cost one sleeping coroutine and a heartbeat comment.
+
+DASHBOARD_STREAM_BUFFER = int(os.getenv("DASHBOARD_STREAM_BUFFER", "500"))
+DASHBOARD_STREAM_HEARTBEAT_SECONDS = int(os.getenv("DASHBOARD_STREAM_HEARTBEAT_SECONDS", "15"))
+
+_dashboard_events = deque(maxlen=DASHBOARD_STREAM_BUFFER)  # (id, project_id, event, data)
+_dashboard_evicted = {}  # project_id (None = all streams) → id of its newest event pushed out of the buffer
+_dashboard_events_lock = threading.Lock()
+_dashboard_event_seq = 0
+_dashboard_stream_loop = None       # Event loop serving the streams (set at startup)
+_dashboard_stream_wakeup = None     # asyncio.Event replaced on every publish
+
+def _chart_points(old, new):
+    """[[dataset, point, value]] for a chart whose labels/series are unchanged, else None."""
+    if not (isinstance(old, dict) and isinstance(new, dict)) or "datasets" not in new:
+        return None
+    if old.get("labels") != new.get("labels") or len(old.get("datasets", [])) != len(new["datasets"]):
+        return None
+    points = []
+    for di, (o, n) in enumerate(zip(old["datasets"], new["datasets"])):
+        o_data, n_data = o.get("data", []), n.get("data", [])
+        if len(o_data) != len(n_data) or {k: v for k, v in o.items() if k != "data"} != {k: v for k, v in n.items() if k != "data"}:
+            return None
+        points += [[di, pi, v] for pi, (ov, v) in enumerate(zip(o_data, n_data)) if ov != v]
+    return points
+
+def diff_dashboard_snapshots(old: dict, new: dict):
+    """
+    Changed fields between two snapshots: {"changed": {field: value}, "points": {chart: [[ds, i, v]]}}.
+    Charts whose shape is unchanged are sent point by point.
+    """
+    changed, points = {}, {}
+    for field, value in new.items():
+        if field in ("_id", "generated_at") or old.get(field) == value:
+            continue
+        chart_points = _chart_points(old.get(field), value)
+        if chart_points is not None:
+            points[field] = chart_points
+        else:
+            changed[field] = value
+    if not changed and not points:
+        return None
+    return {"changed": changed, "points": points}
+
+def _wake_dashboard_streams():
+    global _dashboard_stream_wakeup
+    _dashboard_stream_wakeup.set()
+    _dashboard_stream_wakeup = asyncio.Event()
+
+def publish_dashboard_event(project_id: str, event: str, data: dict):
+    """
+    Thread-safe: appends an event to the ring buffer and wakes every open stream.
+    project_id None (dashboard deltas) goes to every stream.
+    """
+    global _dashboard_event_seq
+    with _dashboard_events_lock:
+        if len(_dashboard_events) == _dashboard_events.maxlen:
+            evicted_id, evicted_project = _dashboard_events[0][:2]
+            _dashboard_evicted[evicted_project] = evicted_id
+        _dashboard_event_seq += 1
+        _dashboard_events.append((_dashboard_event_seq, project_id, event, json.dumps(data, default=str)))
+    if _dashboard_stream_loop is not None:
+        _dashboard_stream_loop.call_soon_threadsafe(_wake_dashboard_streams)
+
+def dashboard_events_after(last_id: int, project_id: str):
+    """
+    Buffered events for this project after last_id, or None if one of them was already
+    pushed out of the buffer, or last_id is from before a restart (client must resync).
+    Other projects' traffic never forces a resync.
+    """
+    with _dashboard_events_lock:
+        events = list(_dashboard_events)
+        seq = _dashboard_event_seq
+        lost = max(_dashboard_evicted.get(project_id, 0), _dashboard_evicted.get(None, 0))
+    if last_id > seq or lost > last_id:
+        return None
+    return [e for e in events if e[0] > last_id and e[1] in (None, project_id)]
+
+@app.on_event("startup")
+async def start_dashboard_stream():
+    global _dashboard_stream_loop, _dashboard_stream_wakeup
+    _dashboard_stream_loop = asyncio.get_running_loop()
+    _dashboard_stream_wakeup = asyncio.Event()
+
+@app.get("/dashboard/stream")
+async def dashboard_stream(request: Request, project_id: str = "default", token: Optional[str] = None, last_event_id: Optional[int] = None):
+    """
+    SSE stream of dashboard deltas.
+    EventSource cannot send headers, so the JWT may be passed as ?token=.
+    Resumes from the Last-Event-ID header (sent automatically on reconnect).
+    """
+    auth = request.headers.get("authorization", "")
+    get_current_user_with_role(token or auth.replace("Bearer ", ""))
+    await run_in_threadpool(require_known_project, project_id)
+
+    header_id = request.headers.get("last-event-id")
+    if header_id and header_id.isdigit():
+        last_event_id = int(header_id)
+    if last_event_id is None:
+        with _dashboard_events_lock:
+            last_event_id = _dashboard_event_seq
+
+    async def event_source():
+        last_id = last_event_id
+        yield f"retry: 5000\nid: {last_id}\n\n"
+        while not await request.is_disconnected():
+            wakeup = _dashboard_stream_wakeup  # Taken before reading, so no publish is missed
+            events = dashboard_events_after(last_id, project_id)
+            if events is None:
+                # Gap (buffer overrun or server restart): tell the client to reload everything
+                with _dashboard_events_lock:
+                    last_id = _dashboard_event_seq
+                yield f"id: {last_id}\nevent: reset\ndata: {{}}\n\n"
+                continue
+            for event_id, _, event, data in events:
+                last_id = event_id
+                yield f"id: {event_id}\nevent: {event}\ndata: {data}\n\n"
+            if events:
+                continue
+            try:
+                await asyncio.wait_for(wakeup.wait(), timeout=DASHBOARD_STREAM_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": heartbeat\n\n"
+
+    return StreamingResponse(event_source(), media_type="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"  # Don't let a reverse proxy buffer the stream
+    })
     
 
 # ==========================================
 # ⏱ TIME TRACKING ENDPOINTS
 # ==========================================
 
+@app.on_event("startup")
+def ensure_log_rollups():
+    """First start after upgrading: build the daily rollups from the existing raw logs."""
+    if time_log_daily_collection is None:
+        return
+    try:
+        missing = (time_log_daily_collection.estimated_document_count() == 0 and time_logs_collection.estimated_document_count() > 0) or \
+                  (commit_daily_collection.estimated_document_count() == 0 and commit_logs_collection.estimated_document_count() > 0)
+        if missing:
+            threading.Thread(target=rebuild_log_rollups, name="log-rollup-rebuild", daemon=True).start()
+    except Exception as e:
+        print(f"⚠️ Log rollup check skipped: {e}")
+
+@app.post("/admin/rollups/rebuild")
+def rebuild_rollups(user_info: dict = Depends(require_role("admin"))):
+    """Recomputes time_log_daily and commit_daily from the raw logs."""
+    try:
+        rebuild_log_rollups()
+        request_dashboard_refresh()
+        return {"msg": f"Rebuilt {time_log_daily_collection.count_documents({})} time-log and {commit_daily_collection.count_documents({})} commit rollups"}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.post("/time-log")
 def create_time_log(log: TimeLogRequest, username: str = Depends(get_current_user)):
     """Log hours spent on a task."""
@@ -2931,21 +3882,26 @@ def create_time_log(log: TimeLogRequest, username: str = Depends(get_current_use
             "note": log.note,
             "timestamp": datetime.now()
         }
-        time_logs_collection.insert_one(entry)
+        record_time_log(entry)
+        request_dashboard_refresh()
         return {"msg": f"Logged {log.hours}h on '{log.task_name}'"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/time-log/{task_name}")
-def get_time_logs(task_name: str, username: str = Depends(get_current_user)):
-    """Get all time entries for a specific task."""
+def get_time_logs(task_name: str, cursor: Optional[str] = None, limit: int = 100, fields: Optional[str] = None, username: str = Depends(get_current_user)):
+    """Time entries for a specific task, newest first, a page at a time. total_hours covers every entry."""
     try:
-        logs = list(time_logs_collection.find(
-            {"task_name": {"$regex": task_name, "$options": "i"}},
-            {"_id": 0}
-        ).sort("timestamp", -1))
-        total_hours = sum(l.get("hours", 0) for l in logs)
-        return {"task_name": task_name, "total_hours": total_hours, "entries": logs}
+        query = {"task_name_key": normalize_key(task_name)}
+        projection = field_projection(fields, {"task_name_key": 0, "logged_by_key": 0}, always=("_id", "timestamp"))
+        logs, next_cursor = paginate_sorted(time_logs_collection, query, projection, cursor, limit, "timestamp", -1)
+        for l in logs:
+            del l["_id"]
+        totals = list(time_logs_collection.aggregate([{"$match": query}, {"$group": {"_id": None, "hours": {"$sum": "$hours"}}}]))
+        total_hours = totals[0]["hours"] if totals else 0
+        return {"task_name": task_name, "total_hours": total_hours, "entries": logs, "next_cursor": next_cursor}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -3021,6 +3977,19 @@ def update_user_role(target_username: str, role: str, user_info: dict = Depends(
 # ==========================================
 # 📦 EPIC → STORY → TASK HIERARCHY
 # ==========================================
+# Tasks carry a denormalized copy of their epic's name/color (epic_name, epic_color)
+# so views like the Gantt chart need no epic lookups. update_epic keeps them in sync.
+EPIC_DISPLAY_DEFAULTS = {"epic_name": "Unassigned", "epic_color": "#6C5DD3"}
+
+def epic_display_fields(epic_ids):
+    """{epic_id: {"epic_name", "epic_color"}} for the given ids, from one $in query."""
+    object_ids = [ObjectId(e) for e in set(epic_ids) if e and ObjectId.is_valid(e)]
+    if not object_ids:
+        return {}
+    return {
+        str(e["_id"]): {"epic_name": e.get("name", "Unassigned"), "epic_color": e.get("color", "#6C5DD3")}
+        for e in epics_collection.find({"_id": {"$in": object_ids}}, {"name": 1, "color": 1})
+    }
 
 @app.post("/epics")
 def create_epic(epic: EpicCreate, user_info: dict = Depends(require_role("admin", "pm"))):
@@ -3054,14 +4023,26 @@ def update_epic(epic_id: str, epic: EpicUpdate, user_info: dict = Depends(requir
     """Update an epic."""
     update_data = {k: v for k, v in epic.dict().items() if v is not None}
     epics_collection.update_one({"_id": ObjectId(epic_id)}, {"$set": update_data})
+
+    # Keep the denormalized copy on tasks in sync
+    task_fields = {f"epic_{k}": update_data[k] for k in ("name", "color") if k in update_data}
+    if task_fields:
+        tasks_collection.update_many({"epic_id": epic_id}, {"$set": task_fields})
     return {"msg": "Epic updated"}
 
 @app.delete("/epics/{epic_id}")
 def delete_epic(epic_id: str, user_info: dict = Depends(require_role("admin", "pm"))):
     """Delete an epic and all its stories/tasks."""
+    doomed = list(tasks_collection.find({"epic_id": epic_id}, {"name": 1, "status": 1, "sprint_id": 1, "estimated_hours": 1, "actual_hours": 1}))
+    removed = [
+        {"task_id": str(t["_id"]), "task_name": t.get("name", ""), "from_status": t.get("status"), "to_status": None}
+        for t in doomed
+    ]
     epics_collection.delete_one({"_id": ObjectId(epic_id)})
     stories_collection.delete_many({"epic_id": epic_id})
     tasks_collection.delete_many({"epic_id": epic_id})
+    apply_sprint_counter_changes([(t, None) for t in doomed])
+    record_task_transitions(removed)
     return {"msg": "Epic and all children deleted"}
 
 # --- STORIES ---
@@ -3115,38 +4096,78 @@ def create_task(task: TaskItemCreate, username: str = Depends(get_current_user))
         "estimated_hours": task.estimated_hours,
         "actual_hours": 0,
         "depends_on": task.depends_on,
+        **epic_display_fields([task.epic_id]).get(task.epic_id, EPIC_DISPLAY_DEFAULTS),
         "created_by": username,
-        "created_at": datetime.now()
+        "created_at": datetime.now(),
+        "updated_at": datetime.now()
     }
     result = tasks_collection.insert_one(doc)
+    apply_sprint_counter_changes([(None, doc)])
+    record_task_transitions([{"task_id": str(result.inserted_id), "task_name": task.name, "from_status": None, "to_status": task.status}])
+    request_dashboard_refresh()
     return {"msg": f"Task '{task.name}' created", "id": str(result.inserted_id)}
 
 @app.get("/tasks")
-def get_tasks(story_id: str = None, epic_id: str = None, username: str = Depends(get_current_user)):
-    """List tasks, optionally filtered."""
+def get_tasks(response: Response, story_id: str = None, epic_id: str = None, cursor: Optional[str] = None, limit: int = 100, fields: Optional[str] = None, username: str = Depends(get_current_user)):
+    """List tasks, optionally filtered, in creation order (next page cursor in X-Next-Cursor)."""
     query = {}
     if story_id: query["story_id"] = story_id
     if epic_id: query["epic_id"] = epic_id
-    all_tasks = []
-    for t in tasks_collection.find(query):
+    tasks, next_cursor = paginate_by_id(tasks_collection, query, field_projection(fields, None), cursor, limit)
+    for t in tasks:
         t["id"] = str(t["_id"])
         del t["_id"]
-        all_tasks.append(t)
-    return all_tasks
+    set_next_cursor(response, next_cursor)
+    return tasks
 
 @app.put("/tasks/{task_id}")
 def update_task(task_id: str, task: TaskItemUpdate, username: str = Depends(get_current_user)):
     """Update a task."""
     update_data = {k: v for k, v in task.dict().items() if v is not None}
-    tasks_collection.update_one({"_id": ObjectId(task_id)}, {"$set": update_data})
+    before = tasks_collection.find_one_and_update(
+        {"_id": ObjectId(task_id)}, {"$set": {**update_data, "updated_at": datetime.now()}},
+        projection={"name": 1, "status": 1, "sprint_id": 1, "estimated_hours": 1, "actual_hours": 1},
+        return_document=ReturnDocument.BEFORE
+    )
+    if before:
+        apply_sprint_counter_changes([(before, {**before, **update_data})])
+    if before and "status" in update_data:
+        record_task_transitions([{
+            "task_id": task_id, "task_name": before.get("name", ""),
+            "from_status": before.get("status"), "to_status": update_data["status"]
+        }])
+    request_dashboard_refresh()
     return {"msg": "Task updated"}
 
 # --- WORK BREAKDOWN TREE ---
 @app.get("/work-breakdown")
 def get_work_breakdown(username: str = Depends(get_current_user)):
     """Returns the full Epic → Story → Task tree."""
+    return build_work_breakdown()
+
+def build_work_breakdown():
+    """
+    Builds the Epic → Story → Task tree from three bulk queries (epics, stories, tasks),
+    grouped in memory. The number of round trips no longer grows with the hierarchy.
+    """
+    epics = list(epics_collection.find({}, {"name": 1, "description": 1, "color": 1, "status": 1}))
+    stories_by_epic = defaultdict(list)
+    for story in stories_collection.find({}, {"epic_id": 1, "name": 1, "description": 1, "story_points": 1, "assigned_to": 1, "status": 1}):
+        stories_by_epic[story.get("epic_id")].append(story)
+
+    tasks_by_story = defaultdict(list)
+    loose_tasks_by_epic = defaultdict(list)  # Tasks directly under an epic (no story)
+    for task in tasks_collection.find({}, {
+        "epic_id": 1, "story_id": 1, "name": 1, "description": 1, "assigned_to": 1, "status": 1,
+        "due_date": 1, "start_date": 1, "estimated_hours": 1, "actual_hours": 1, "depends_on": 1
+    }):
+        if task.get("story_id"):
+            tasks_by_story[task["story_id"]].append(task)
+        elif task.get("story_id") == "":
+            loose_tasks_by_epic[task.get("epic_id")].append(task)
+
     tree = []
-    for epic in epics_collection.find({}):
+    for epic in epics:
         epic_id = str(epic["_id"])
         epic_node = {
             "id": epic_id,
@@ -3158,7 +4179,7 @@ def get_work_breakdown(username: str = Depends(get_current_user)):
             "stories": []
         }
         
-        for story in stories_collection.find({"epic_id": epic_id}):
+        for story in stories_by_epic.get(epic_id, []):
             story_id = str(story["_id"])
             story_node = {
                 "id": story_id,
@@ -3171,7 +4192,7 @@ def get_work_breakdown(username: str = Depends(get_current_user)):
                 "tasks": []
             }
             
-            for task in tasks_collection.find({"story_id": story_id}):
+            for task in tasks_by_story.get(story_id, []):
                 task_node = {
                     "id": str(task["_id"]),
                     "name": task.get("name"),
@@ -3190,7 +4211,7 @@ def get_work_breakdown(username: str = Depends(get_current_user)):
             epic_node["stories"].append(story_node)
         
         # Also get tasks directly under epic (no story)
-        for task in tasks_collection.find({"epic_id": epic_id, "story_id": ""}):
+        for task in loose_tasks_by_epic.get(epic_id, []):
             task_node = {
                 "id": str(task["_id"]),
                 "name": task.get("name"),
@@ -3206,28 +4227,310 @@ def get_work_breakdown(username: str = Depends(get_current_user)):
     
     return tree
 
+# --------------------
+# Cursor pagination
+# --------------------
+# Cursors are opaque to clients: URL-safe base64 of a small JSON document
+# (for _id keyset pagination: {"after": "<last _id>"}).
+def encode_cursor(position: dict) -> str:
+    return base64.urlsafe_b64encode(json.dumps(position, default=str).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, *fields: str) -> dict:
+    """The cursor's position document; 400 unless it is an object carrying every one of `fields`."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        position = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except Exception:
+        position = None
+    if not isinstance(position, dict) or any(f not in position for f in fields):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return position
+
+def cursor_object_id(value) -> ObjectId:
+    """An _id taken from a cursor; 400 if it isn't one."""
+    if not isinstance(value, str) or not ObjectId.is_valid(value):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return ObjectId(value)
+
+def paginate_by_id(collection, query: dict, projection: dict, cursor: Optional[str], limit: int):
+    """One page of `query` in _id order. Returns (docs, next_cursor or None)."""
+    limit = max(1, min(limit, 200))
+    if cursor:
+        query = {**query, "_id": {"$gt": cursor_object_id(decode_cursor(cursor, "after")["after"])}}
+    docs = list(collection.find(query, projection).sort("_id", 1).limit(limit + 1))
+    next_cursor = encode_cursor({"after": docs[limit - 1]["_id"]}) if len(docs) > limit else None
+    return docs[:limit], next_cursor
+
+def _to_cursor_value(value):
+    # Sort keys are datetimes on some collections; keep the type through the JSON round trip
+    return {"$dt": value.isoformat()} if isinstance(value, datetime) else value
+
+def _from_cursor_value(value):
+    if not isinstance(value, dict):
+        return value
+    try:
+        return datetime.fromisoformat(value["$dt"])
+    except (KeyError, TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def paginate_sorted(collection, query: dict, projection: dict, cursor: Optional[str], limit: int, sort_field: str, direction: int = -1):
+    """
+    One page of `query` ordered by (sort_field, _id) in `direction`, for keyset paging
+    over an index ending in (sort_field, _id). The projection must keep _id and sort_field.
+    Returns (docs, next_cursor or None).
+    """
+    limit = max(1, min(limit, 200))
+    if cursor:
+        position = decode_cursor(cursor, "key", "id")
+        after, after_id = _from_cursor_value(position["key"]), cursor_object_id(position["id"])
+        op = "$lt" if direction < 0 else "$gt"
+        query = {"$and": [query, {"$or": [{sort_field: {op: after}}, {sort_field: after, "_id": {op: after_id}}]}]}
+    docs = list(collection.find(query, projection).sort([(sort_field, direction), ("_id", direction)]).limit(limit + 1))
+    next_cursor = None
+    if len(docs) > limit:
+        last = docs[limit - 1]
+        next_cursor = encode_cursor({"key": _to_cursor_value(last.get(sort_field)), "id": str(last["_id"])})
+    return docs[:limit], next_cursor
+
+def field_projection(fields: Optional[str], default: dict, always: tuple = ("_id",)) -> dict:
+    """`?fields=a,b,c` as a Mongo inclusion projection (plus the fields paging needs), else `default`."""
+    names = [f.strip() for f in (fields or "").split(",") if f.strip() and not f.strip().startswith("$")]
+    if not names:
+        return default
+    return {**{name: 1 for name in names}, **{name: 1 for name in always}}
+
+def set_next_cursor(response: Response, next_cursor: Optional[str]):
+    """Array-returning list endpoints keep their body shape and send the next page cursor as a header."""
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+
+# --------------------
+# Lazy work-breakdown tree (backlog view)
+# --------------------
+# Epics come first with child counts and rolled-up progress; stories and tasks are
+# fetched per node, a page at a time, when the node is expanded.
+
+def _task_progress(match: dict, group_by: str):
+    """{group value: {"tasks": n, "done": n}} from one $group over tasks."""
+    rows = tasks_collection.aggregate([
+        {"$match": match},
+        {"$group": {"_id": f"${group_by}", "tasks": {"$sum": 1}, "done": {"$sum": {"$cond": [{"$eq": ["$status", "done"]}, 1, 0]}}}}
+    ])
+    return {r["_id"]: {"tasks": r["tasks"], "done": r["done"]} for r in rows}
+
+def _progress(counts: dict) -> int:
+    return round(counts["done"] * 100 / counts["tasks"]) if counts.get("tasks") else 0
+
+@app.get("/work-breakdown/epics")
+def get_work_breakdown_epics(cursor: Optional[str] = None, limit: int = 50, include_description: bool = False, username: str = Depends(get_current_user)):
+    """Epics with story/task counts and progress. Totals cover the whole project."""
+    projection = {"name": 1, "color": 1, "status": 1, **({"description": 1} if include_description else {})}
+    epics, next_cursor = paginate_by_id(epics_collection, {}, projection, cursor, limit)
+    epic_ids = [str(e["_id"]) for e in epics]
+
+    story_counts = {
+        r["_id"]: r for r in stories_collection.aggregate([
+            {"$match": {"epic_id": {"$in": epic_ids}}},
+            {"$group": {"_id": "$epic_id", "stories": {"$sum": 1}, "points": {"$sum": {"$ifNull": ["$story_points", 0]}}}}
+        ])
+    }
+    task_counts = _task_progress({"epic_id": {"$in": epic_ids}}, "epic_id")
+    loose_counts = _task_progress({"epic_id": {"$in": epic_ids}, "story_id": ""}, "epic_id")
+
+    items = []
+    for epic in epics:
+        epic_id = str(epic["_id"])
+        counts = task_counts.get(epic_id, {"tasks": 0, "done": 0})
+        node = {
+            "id": epic_id,
+            "name": epic.get("name"),
+            "color": epic.get("color", "#6C5DD3"),
+            "status": epic.get("status", "active"),
+            "type": "epic",
+            "story_count": story_counts.get(epic_id, {}).get("stories", 0),
+            "loose_task_count": loose_counts.get(epic_id, {}).get("tasks", 0),
+            "task_count": counts["tasks"],
+            "done_count": counts["done"],
+            "progress": _progress(counts),
+            "story_points": story_counts.get(epic_id, {}).get("points", 0)
+        }
+        if include_description:
+            node["description"] = epic.get("description", "")
+        items.append(node)
+
+    response = {"epics": items, "next_cursor": next_cursor}
+    if not cursor:
+        # First page also carries project-wide totals for the stats bar
+        points = next(stories_collection.aggregate([{"$group": {"_id": None, "points": {"$sum": {"$ifNull": ["$story_points", 0]}}}}]), {})
+        response["totals"] = {
+            "epics": epics_collection.estimated_document_count(),
+            "stories": stories_collection.estimated_document_count(),
+            "tasks": tasks_collection.estimated_document_count(),
+            "points": points.get("points", 0)
+        }
+    return response
+
+@app.get("/work-breakdown/epics/{epic_id}/stories")
+def get_work_breakdown_stories(epic_id: str, cursor: Optional[str] = None, limit: int = 50, include_description: bool = False, username: str = Depends(get_current_user)):
+    """One page of an epic's stories, with task counts and progress."""
+    projection = {"name": 1, "story_points": 1, "assigned_to": 1, "status": 1, **({"description": 1} if include_description else {})}
+    stories, next_cursor = paginate_by_id(stories_collection, {"epic_id": epic_id}, projection, cursor, limit)
+    task_counts = _task_progress({"story_id": {"$in": [str(s["_id"]) for s in stories]}}, "story_id")
+
+    items = []
+    for story in stories:
+        story_id = str(story["_id"])
+        counts = task_counts.get(story_id, {"tasks": 0, "done": 0})
+        node = {
+            "id": story_id,
+            "name": story.get("name"),
+            "story_points": story.get("story_points", 0),
+            "assigned_to": story.get("assigned_to", "Unassigned"),
+            "status": story.get("status", "todo"),
+            "type": "story",
+            "task_count": counts["tasks"],
+            "done_count": counts["done"],
+            "progress": _progress(counts)
+        }
+        if include_description:
+            node["description"] = story.get("description", "")
+        items.append(node)
+    return {"stories": items, "next_cursor": next_cursor}
+
+def _lazy_task_page(query: dict, cursor: Optional[str], limit: int, include_description: bool):
+    projection = {"name": 1, "assigned_to": 1, "status": 1, "due_date": 1, "start_date": 1, "estimated_hours": 1, "actual_hours": 1, "depends_on": 1,
+                  **({"description": 1} if include_description else {})}
+    tasks, next_cursor = paginate_by_id(tasks_collection, query, projection, cursor, limit)
+    items = []
+    for task in tasks:
+        node = {
+            "id": str(task["_id"]),
+            "name": task.get("name"),
+            "assigned_to": task.get("assigned_to", "Unassigned"),
+            "status": task.get("status", "todo"),
+            "due_date": task.get("due_date"),
+            "start_date": task.get("start_date"),
+            "estimated_hours": task.get("estimated_hours", 0),
+            "actual_hours": task.get("actual_hours", 0),
+            "depends_on": task.get("depends_on", []),
+            "type": "task"
+        }
+        if include_description:
+            node["description"] = task.get("description", "")
+        items.append(node)
+    return {"tasks": items, "next_cursor": next_cursor}
+
+@app.get("/work-breakdown/stories/{story_id}/tasks")
+def get_work_breakdown_story_tasks(story_id: str, cursor: Optional[str] = None, limit: int = 50, include_description: bool = False, username: str = Depends(get_current_user)):
+    """One page of a story's tasks."""
+    return _lazy_task_page({"story_id": story_id}, cursor, limit, include_description)
+
+@app.get("/work-breakdown/epics/{epic_id}/tasks")
+def get_work_breakdown_epic_tasks(epic_id: str, cursor: Optional[str] = None, limit: int = 50, include_description: bool = False, username: str = Depends(get_current_user)):
+    """One page of the tasks directly under an epic (no story)."""
+    return _lazy_task_page({"epic_id": epic_id, "story_id": ""}, cursor, limit, include_description)
+
 # ==========================================
 # 📊 GANTT CHART DATA ENDPOINT
 # ==========================================
 
+def gantt_window_query(start: Optional[str], end: Optional[str]) -> dict:
+    """Tasks whose [start_date, due_date] overlaps the window (served by the start_date+due_date index)."""
+    if not start and not end:
+        return {}
+    start, end = start or "0000-00-00", end or "9999-99-99"
+    return {"$or": [
+        {"start_date": {"$lte": end}, "due_date": {"$gte": start}},
+        {"start_date": None, "due_date": {"$gte": start, "$lte": end}}
+    ]}
+
+def in_gantt_window(item_start: Optional[str], item_end: Optional[str], start: Optional[str], end: Optional[str]) -> bool:
+    """In-memory twin of gantt_window_query, for Trello cards."""
+    if not item_end:
+        return False
+    return (not end or (item_start or item_end) <= end) and (not start or item_end >= start)
+
+def aggregate_gantt_weeks(items: list) -> list:
+    """Zoomed-out view: one bar per epic per week instead of one per task."""
+    buckets = {}
+    for item in items:
+        if not item.get("end_date"): continue
+        try:
+            end_day = datetime.strptime(item["end_date"][:10], "%Y-%m-%d").date()
+            start_day = datetime.strptime(item["start_date"][:10], "%Y-%m-%d").date() if item.get("start_date") else end_day
+        except ValueError:
+            continue
+        week = end_day - timedelta(days=end_day.weekday())  # Bucket by the week the task is due
+        key = (item["epic_name"], week)
+        bar = buckets.setdefault(key, {
+            "id": f"{item['epic_name']}:{week.isoformat()}",
+            "epic_name": item["epic_name"],
+            "epic_color": item["epic_color"],
+            "start": start_day, "end": end_day,
+            "statuses": Counter(), "estimated_hours": 0, "owners": Counter()
+        })
+        bar["start"] = min(bar["start"], start_day)
+        bar["end"] = max(bar["end"], end_day)
+        bar["statuses"][item["status"]] += 1
+        bar["owners"][item.get("owner", "Unassigned")] += 1
+        bar["estimated_hours"] += item.get("estimated_hours", 0) or 0
+
+    bars = []
+    for (epic_name, week), bar in sorted(buckets.items(), key=lambda kv: (kv[0][0], kv[0][1])):
+        count = sum(bar["statuses"].values())
+        if bar["statuses"]["done"] == count:
+            status = "done"
+        elif bar["statuses"]["in_progress"] or bar["statuses"]["done"]:
+            status = "in_progress"
+        else:
+            status = "todo"
+        bars.append({
+            "id": bar["id"],
+            "name": f"{epic_name} · {count} task{'s' if count != 1 else ''}",
+            "start_date": bar["start"].isoformat(),
+            "end_date": bar["end"].isoformat(),
+            "owner": bar["owners"].most_common(1)[0][0],
+            "status": status,
+            "epic_name": epic_name,
+            "epic_color": bar["epic_color"],
+            "depends_on": [],
+            "estimated_hours": bar["estimated_hours"],
+            "is_critical_path": False,
+            "task_count": count,
+            "week": week.isoformat()
+        })
+    return bars
+
 @app.get("/gantt-data")
-def get_gantt_data(username: str = Depends(get_current_user)):
-    """Returns all tasks formatted for Gantt chart rendering with critical path."""
+def get_gantt_data(start: Optional[str] = None, end: Optional[str] = None, zoom: str = "day", username: str = Depends(get_current_user)):
+    """
+    Returns tasks formatted for Gantt chart rendering with critical path.
+    start/end (YYYY-MM-DD) limit the payload to tasks overlapping that window;
+    zoom=week returns one aggregate bar per epic per week instead of individual tasks.
+    """
     gantt_items = []
     all_tasks_map = {}
     
-    # 1. Build task list from MongoDB hierarchy
-    for task in tasks_collection.find({}):
+    # 1. Build task list from MongoDB hierarchy (epic name/color are denormalized on the task)
+    tasks = list(tasks_collection.find(gantt_window_query(start, end), {
+        "name": 1, "start_date": 1, "due_date": 1, "assigned_to": 1, "status": 1,
+        "epic_id": 1, "epic_name": 1, "epic_color": 1, "depends_on": 1, "estimated_hours": 1
+    }))
+
+    # Tasks written before denormalization: one $in lookup, then backfill them
+    stale = [t for t in tasks if t.get("epic_id") and "epic_name" not in t]
+    if stale:
+        epic_fields = epic_display_fields(t["epic_id"] for t in stale)
+        for t in stale:
+            t.update(epic_fields.get(t["epic_id"], EPIC_DISPLAY_DEFAULTS))
+        tasks_collection.bulk_write([
+            UpdateOne({"_id": t["_id"]}, {"$set": {"epic_name": t["epic_name"], "epic_color": t["epic_color"]}}) for t in stale
+        ], ordered=False)
+
+    for task in tasks:
         task_id = str(task["_id"])
-        
-        # Look up epic name
-        epic_name = "Unassigned"
-        epic_color = "#6C5DD3"
-        if task.get("epic_id"):
-            epic = epics_collection.find_one({"_id": ObjectId(task["epic_id"])})
-            if epic:
-                epic_name = epic.get("name", "Unassigned")
-                epic_color = epic.get("color", "#6C5DD3")
+        epic_name = task.get("epic_name", "Unassigned")
+        epic_color = task.get("epic_color", "#6C5DD3")
         
         item = {
             "id": task_id,
@@ -3317,10 +4620,17 @@ def get_gantt_data(username: str = Depends(get_current_user)):
                         "estimated_hours": 0,
                         "is_critical_path": False
                     }
+                    # Same window as the task query
+                    if (start or end) and not in_gantt_window(start_str, end_str, start, end):
+                        continue
                     gantt_items.append(item)
                     all_tasks_map[card_id] = item
     except Exception as e:
         print(f"Gantt Trello fetch error: {e}")
+
+    if zoom == "week":
+        bars = aggregate_gantt_weeks(gantt_items)
+        return {"tasks": bars, "total": len(gantt_items), "zoom": "week"}
     
     # 3. Compute Critical Path (longest dependency chain)
     def get_chain_length(item_id, visited=None):
@@ -3354,7 +4664,7 @@ def get_gantt_data(username: str = Depends(get_current_user)):
             if chain_lengths.get(item["id"], 0) == max_chain:
                 item["is_critical_path"] = True
     
-    return {"tasks": gantt_items, "total": len(gantt_items)}
+    return {"tasks": gantt_items, "total": len(gantt_items), "zoom": "day"}
 
 # ==========================================
 # 🏃 SPRINT MANAGEMENT ENDPOINTS
@@ -3371,12 +4681,101 @@ def create_sprint(sprint: SprintCreate, user_info: dict = Depends(require_role("
         "capacity_hours": sprint.capacity_hours,
         "project_id": sprint.project_id,
         "status": "planning",  # planning, active, completed
+        **SPRINT_COUNTERS_EMPTY,
         "created_by": user_info["username"],
-        "created_at": datetime.now()
+        "created_at": datetime.now(),
+        "updated_at": datetime.now()
     }
     result = sprints_collection.insert_one(doc)
     return {"msg": f"Sprint '{sprint.name}' created", "id": str(result.inserted_id)}
 
+# --- Sprint counters ---
+# Each sprint document carries task_count, done_count, committed_hours and
+# completed_hours, kept current with $inc whenever a task is added, moved,
+# re-estimated or completed. A reconciliation job recomputes them to fix drift.
+SPRINT_COUNTERS_EMPTY = {"task_count": 0, "done_count": 0, "committed_hours": 0, "completed_hours": 0}
+SPRINT_RECONCILE_SECONDS = int(os.getenv("SPRINT_RECONCILE_SECONDS", "3600"))
+
+DEFAULT_TASK_ESTIMATE_HOURS = 4  # Unestimated tasks still take sprint capacity
+
+def sprint_contribution(task: dict) -> dict:
+    """What one task adds to its sprint's counters."""
+    done = task.get("status") == "done"
+    estimate = task.get("estimated_hours")
+    return {
+        "task_count": 1,
+        "done_count": 1 if done else 0,
+        "committed_hours": estimate if estimate is not None else DEFAULT_TASK_ESTIMATE_HOURS,
+        "completed_hours": (task.get("actual_hours", 0) or 0) if done else 0
+    }
+
+def apply_sprint_counter_changes(changes):
+    """
+    changes: [(before, after)] task states (None = task absent). Applies the net
+    difference to every affected sprint with one $inc each, in a single bulk_write.
+    """
+    deltas = defaultdict(Counter)
+    for before, after in changes:
+        for task, sign in ((before, -1), (after, 1)):
+            if task and task.get("sprint_id"):
+                for field, value in sprint_contribution(task).items():
+                    deltas[task["sprint_id"]][field] += sign * value
+
+    ops = []
+    for sid, delta in deltas.items():
+        inc = {k: v for k, v in delta.items() if v}
+        if inc and ObjectId.is_valid(sid):
+            ops.append(UpdateOne({"_id": ObjectId(sid)}, {"$inc": inc, "$set": {"updated_at": datetime.now()}}))
+    if ops:
+        try:
+            sprints_collection.bulk_write(ops, ordered=False)
+        except Exception as e:
+            print(f"⚠️ Sprint counter update failed (reconciler will fix): {e}")
+
+def sprint_task_metrics(sprint_ids: list) -> dict:
+    """Recomputes the sprint counters from tasks for many sprints in one $group."""
+    is_done = {"$eq": ["$status", "done"]}
+    rows = tasks_collection.aggregate([
+        {"$match": {"sprint_id": {"$in": sprint_ids}}},
+        {"$group": {
+            "_id": "$sprint_id",
+            "task_count": {"$sum": 1},
+            "committed_hours": {"$sum": {"$ifNull": ["$estimated_hours", DEFAULT_TASK_ESTIMATE_HOURS]}},
+            "done_count": {"$sum": {"$cond": [is_done, 1, 0]}},
+            "completed_hours": {"$sum": {"$cond": [is_done, {"$ifNull": ["$actual_hours", 0]}, 0]}}
+        }}
+    ])
+    return {r.pop("_id"): r for r in rows}
+
+def reconcile_sprint_counters():
+    """Rewrites every sprint's counters from the tasks; returns how many had drifted."""
+    sprints = list(sprints_collection.find({}, list(SPRINT_COUNTERS_EMPTY)))
+    metrics = sprint_task_metrics([str(s["_id"]) for s in sprints])
+    ops = []
+    for s in sprints:
+        actual = {**SPRINT_COUNTERS_EMPTY, **metrics.get(str(s["_id"]), {})}
+        if any(s.get(k) != v for k, v in actual.items()):
+            ops.append(UpdateOne({"_id": s["_id"]}, {"$set": {**actual, "updated_at": datetime.now()}}))
+    if ops:
+        sprints_collection.bulk_write(ops, ordered=False)
+    return len(ops)
+
+def sprint_reconciler_loop():
+    while True:
+        try:
+            drifted = reconcile_sprint_counters()
+            if drifted:
+                print(f"🔧 Reconciled counters on {drifted} sprint(s)")
+        except Exception as e:
+            print(f"⚠️ Sprint reconciliation failed: {e}")
+        time_module.sleep(SPRINT_RECONCILE_SECONDS)
+
+@app.on_event("startup")
+def start_sprint_reconciler():
+    if sprints_collection is None:
+        return
+    threading.Thread(target=sprint_reconciler_loop, name="sprint-reconciler", daemon=True).start()
+
 @app.get("/sprints")
 def get_sprints(project_id: str = "default", username: str = Depends(get_current_user)):
     """List all sprints for a project."""
@@ -3389,13 +4788,11 @@ def get_sprints(project_id: str = "default", username: str = Depends(get_current
         if "created_at" in s and hasattr(s["created_at"], "isoformat"):
             s["created_at"] = s["created_at"].isoformat()
         
-        # Dynamically calculate sprint metrics
-        tasks_in_sprint = list(tasks_collection.find({"sprint_id": s["id"]}))
-        s["committed_tasks"] = len(tasks_in_sprint)
-        s["committed_hours"] = sum(t.get("estimated_hours", 0) for t in tasks_in_sprint)
-        s["completed_tasks"] = sum(1 for t in tasks_in_sprint if t.get("status") == "done")
-        s["completed_hours"] = sum(t.get("actual_hours", 0) for t in tasks_in_sprint if t.get("status") == "done")
-        
+        # Sprint metrics are maintained on the sprint document
+        s["committed_tasks"] = s.get("task_count", 0)
+        s["committed_hours"] = s.get("committed_hours", 0)
+        s["completed_tasks"] = s.get("done_count", 0)
+        s["completed_hours"] = s.get("completed_hours", 0)
         all_sprints.append(s)
         
     # Sort sprints by start_date
@@ -3406,7 +4803,7 @@ def get_sprints(project_id: str = "default", username: str = Depends(get_current
 def update_sprint(sprint_id: str, sprint: SprintUpdate, user_info: dict = Depends(require_role("admin", "pm"))):
     """Update a sprint."""
     update_data = {k: v for k, v in sprint.dict().items() if v is not None}
-    sprints_collection.update_one({"_id": ObjectId(sprint_id)}, {"$set": update_data})
+    sprints_collection.update_one({"_id": ObjectId(sprint_id)}, {"$set": {**update_data, "updated_at": datetime.now()}})
     return {"msg": "Sprint updated"}
 
 @app.get("/sprints/{sprint_id}/burndown")
@@ -3431,9 +4828,9 @@ def get_sprint_burndown(sprint_id: str, username: str = Depends(get_current_user
     total_days = (end_dt - start_dt).days
     if total_days <= 0: total_days = 1
     
-    # Get all time logs for tasks in this sprint
+    # Hours logged per day for tasks in this sprint
     task_names = [t.get("name") for t in tasks]
-    time_logs = list(time_logs_collection.find({"task_name": {"$in": task_names}}))
+    hours_by_day = aggregate_logged_hours(task_names, by_day=True)
     
     remaining = total_estimated
     day_count = 0
@@ -3449,10 +4846,8 @@ def get_sprint_burndown(sprint_id: str, username: str = Depends(get_current_user
         
         # Actual line
         if current_dt.date() <= now_dt.date():
-            # Sum hours logged ON this day for these tasks
-            logs_today = [l for l in time_logs if l["timestamp"].strftime("%Y-%m-%d") == date_str]
-            hours_burned = sum(l.get("hours", 0) for l in logs_today)
-            remaining -= hours_burned
+            # Hours logged ON this day for these tasks
+            remaining -= hours_by_day.get(date_str, 0)
             actual_line.append(max(0, remaining))
         else:
             actual_line.append(None) # Future dates
@@ -3493,11 +4888,14 @@ def get_meeting(meeting_id: str, username: str = Depends(get_current_user)):
 # ⚠️ RISK REGISTER
 # ==========================================
 @app.get("/risk-register")
-def get_risk_register(project_id: str = "default", username: str = Depends(get_current_user)):
-    rs = list(risks_collection.find({"project_id": project_id}).sort("risk_score", -1))
+def get_risk_register(response: Response, project_id: str = "default", status: Optional[str] = None, cursor: Optional[str] = None, limit: int = 100, fields: Optional[str] = None, username: str = Depends(get_current_user)):
+    projection = field_projection(fields, None, always=("_id", "risk_score"))
+    query = {"project_id": project_id, **({"status": status} if status else {})}
+    rs, next_cursor = paginate_sorted(risks_collection, query, projection, cursor, limit, "risk_score", -1)
     for r in rs:
         r["id"] = str(r["_id"])
         del r["_id"]
+    set_next_cursor(response, next_cursor)
     return rs
 
 @app.put("/risk-register/{risk_id}")
@@ -3514,6 +4912,8 @@ def update_risk(risk_id: str, risk_update: RiskUpdate, user_info: dict = Depends
         update_data["risk_score"] = prob * imp
         
     risks_collection.update_one({"_id": ObjectId(risk_id)}, {"$set": update_data})
+    risk = risks_collection.find_one({"_id": ObjectId(risk_id)}, {"project_id": 1}) or {}
+    publish_dashboard_event(risk.get("project_id", "default"), "risks", {"updated": risk_id})
     return {"msg": "Risk updated"}
 
 # ==========================================
@@ -3526,8 +4926,7 @@ def get_sprint_scope_health(sprint_id: str, username: str = Depends(get_current_
         raise HTTPException(status_code=404, detail="Sprint not found")
         
     capacity = sprint.get("capacity_hours", 0)
-    sprint_tasks = list(tasks_collection.find({"sprint_id": sprint_id}))
-    assigned_hours = sum(t.get("estimated_hours", 0) for t in sprint_tasks)
+    assigned_hours = sprint.get("committed_hours", 0)  # Maintained sprint counter
     
     if capacity == 0:
         return {"capacity": 0, "assigned": assigned_hours, "utilization_pct": 0, "is_overloaded": False, "defer_suggestions": []}
@@ -3537,15 +4936,16 @@ def get_sprint_scope_health(sprint_id: str, username: str = Depends(get_current_
     
     defer_suggestions = []
     if is_overloaded:
-        unstarted = [t for t in sprint_tasks if t.get("status") == "todo"]
-        unstarted.sort(key=lambda x: x.get("estimated_hours", 4))
+        unstarted = tasks_collection.find(
+            {"sprint_id": sprint_id, "status": "todo"}, {"name": 1, "estimated_hours": 1, "assigned_to": 1}
+        ).sort("estimated_hours", 1)
         
         excess = assigned_hours - capacity
         deferred_hours = 0
         for t in unstarted:
             if deferred_hours >= excess:
                 break
-            hours = t.get("estimated_hours", 4)
+            hours = t.get("estimated_hours", DEFAULT_TASK_ESTIMATE_HOURS)
             defer_suggestions.append({
                 "id": str(t["_id"]),
                 "name": t.get("name"),
@@ -3579,9 +4979,9 @@ def receive_mood_webhook(mood: MoodSubmit):
             "score": max(1, min(5, mood.score)),  # Clamp 1-5
             "note": mood.note,
             "week": now.strftime("%Y-W%W"),
-            "timestamp": now.strftime("%Y-%m-%d %H:%M")
+            "timestamp": now
         }
-        mood_collection.insert_one(entry)
+        mood_collection.insert_one(with_keys("mood_entries", entry))
         
         # Alert if mood is critically low
         if mood.score <= 2:
@@ -3603,8 +5003,8 @@ def get_mood_history(username: str = None, weeks: int = 8, current_user: str = D
     try:
         query = {}
         if username:
-            query["username"] = {"$regex": username, "$options": "i"}
-        entries = list(mood_collection.find(query, {"_id": 0}).sort("timestamp", -1).limit(weeks * 7))
+            query["username_key"] = normalize_key(username)
+        entries = list(mood_collection.find(query, {"_id": 0, "username_key": 0}).sort("timestamp", -1).limit(weeks * 7))
         return entries
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -3629,21 +5029,16 @@ def receive_commit_webhook(commit: CommitWebhookPayload):
             "lines_added": commit.lines_added,
             "lines_removed": commit.lines_removed,
             "files_changed": commit.files_changed,
-            "timestamp": now.strftime("%Y-%m-%d %H:%M")
+            "timestamp": now
         }
-        commit_logs_collection.insert_one(doc)
+        record_commit(doc)
         
-        # Check for low-output pattern
-        total_lines = commit.lines_added + commit.lines_removed
+        # Check for low-output pattern: today's lines and hours for this developer, from the daily rollups
+        author_key = normalize_key(commit.author)
         today_str = now.strftime("%Y-%m-%d")
-        
-        # Find time logged today by this developer
-        today_start = datetime.strptime(today_str, "%Y-%m-%d")
-        today_logs = list(time_logs_collection.find({
-            "logged_by": {"$regex": commit.author, "$options": "i"},
-            "timestamp": {"$gte": today_start}
-        }))
-        hours_today = sum(l.get("hours", 0) for l in today_logs)
+        today_commits = commit_daily_collection.find_one({"_id": f"{today_str}|{author_key}"}) or {}
+        total_lines = today_commits.get("lines_added", 0) + today_commits.get("lines_removed", 0)
+        hours_today = logged_hours_by_person([author_key], today_str).get(author_key, 0)
         
         # Flag if > 8 hours logged but very few lines changed total today
         alert_sent = False
@@ -3661,28 +5056,87 @@ def receive_commit_webhook(commit: CommitWebhookPayload):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/commit-analysis")
-def get_commit_analysis(days: int = 7, username: str = Depends(get_current_user)):
-    """Returns commit log data for dashboard visualization."""
+def get_commit_analysis(days: int = 7, cursor: Optional[str] = None, limit: int = 100, fields: Optional[str] = None, username: str = Depends(get_current_user)):
+    """Returns commit log data for dashboard visualization. Commits are paged; author_stats cover the whole period."""
     try:
-        cutoff = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d")
-        commits = list(commit_logs_collection.find(
-            {"timestamp": {"$gte": cutoff}}, {"_id": 0}
-        ).sort("timestamp", -1))
-        
-        # Calculate per-author totals
-        author_stats = {}
+        cutoff = (datetime.now() - timedelta(days=days)).replace(hour=0, minute=0, second=0, microsecond=0)
+        query = {"timestamp": {"$gte": cutoff}}
+        projection = field_projection(fields, {"author_key": 0}, always=("_id", "timestamp"))
+        commits, next_cursor = paginate_sorted(commit_logs_collection, query, projection, cursor, limit, "timestamp", -1)
         for c in commits:
-            author = c.get("author", "Unknown")
-            if author not in author_stats:
-                author_stats[author] = {"commits": 0, "lines_added": 0, "lines_removed": 0}
-            author_stats[author]["commits"] += 1
-            author_stats[author]["lines_added"] += c.get("lines_added", 0)
-            author_stats[author]["lines_removed"] += c.get("lines_removed", 0)
-        
-        return {"commits": commits, "author_stats": author_stats, "period_days": days}
+            del c["_id"]
+        
+        # Per-author totals for the whole period, from the daily rollup
+        author_stats = {
+            author: {"commits": st["commits"], "lines_added": st["lines_added"], "lines_removed": st["lines_removed"]}
+            for author, st in commit_stats_by_author(cutoff.strftime("%Y-%m-%d")).items()
+        }
+        
+        return {"commits": commits, "author_stats": author_stats, "period_days": days, "next_cursor": next_cursor}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# ==========================================
+# 📤 STREAMING EXPORTS
+# ==========================================
+# Full-collection dumps for reporting. Documents are read through a batched cursor
+# and written out one line at a time, so memory stays flat whatever the size.
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+EXPORTS = {
+    # name: (collection attribute, sort key, default CSV columns)
+    "tasks": ("tasks_collection", "_id", ["id", "name", "status", "assigned_to", "epic_id", "story_id", "sprint_id",
+                                          "start_date", "due_date", "estimated_hours", "actual_hours"]),
+    "time-logs": ("time_logs_collection", "timestamp", ["id", "task_name", "logged_by", "hours", "note", "timestamp"]),
+    "commits": ("commit_logs_collection", "timestamp", ["id", "repo", "commit_sha", "author", "message",
+                                                        "lines_added", "lines_removed", "files_changed", "timestamp"]),
+}
+EXPORT_HIDDEN_FIELDS = {"name_key": 0, "email_key": 0, "logged_by_key": 0, "task_name_key": 0, "username_key": 0, "author_key": 0}
+
+def iter_export(name: str, fmt: str = "ndjson", fields: Optional[str] = None, chunk_docs: int = 100):
+    """Yields an export as NDJSON lines or CSV rows (header first), `chunk_docs` documents per chunk."""
+    collection_attr, sort_key, columns = EXPORTS[name]
+    collection = globals()[collection_attr]
+    columns = [f.strip() for f in fields.split(",") if f.strip()] if fields else columns
+    projection = field_projection(fields, EXPORT_HIDDEN_FIELDS)
+    cursor = collection.find({}, projection, batch_size=EXPORT_BATCH_SIZE).sort(sort_key, 1)
+
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction="ignore")
+    if fmt == "csv":
+        writer.writeheader()
+    pending = 0
+    for doc in cursor:
+        doc["id"] = str(doc.pop("_id"))
+        if fmt == "csv":
+            writer.writerow({k: (json.dumps(v, default=str) if isinstance(v, (list, dict)) else v) for k, v in doc.items()})
+        else:
+            buffer.write(json.dumps(doc, default=str) + "\n")
+        pending += 1
+        if pending >= chunk_docs:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    if buffer.tell():
+        yield buffer.getvalue()
+
+@app.get("/export/{name}")
+def export_collection(name: str, format: str = "ndjson", fields: Optional[str] = None, user_info: dict = Depends(require_role("admin", "pm"))):
+    """Streams every task, time log or commit as NDJSON (default) or CSV."""
+    if name not in EXPORTS:
+        raise HTTPException(status_code=404, detail=f"Unknown export '{name}'. Available: {', '.join(EXPORTS)}")
+    if format not in ("ndjson", "csv"):
+        raise HTTPException(status_code=400, detail="format must be 'ndjson' or 'csv'")
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    filename = f"{name}-{datetime.now().strftime('%Y%m%d')}.{'csv' if format == 'csv' else 'ndjson'}"
+    return StreamingResponse(
+        iter_export(name, format, fields),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
 # ==========================================
 # 🧠 TEAM HEALTH ENDPOINT
 # ==========================================
@@ -3690,8 +5144,8 @@ def get_commit_analysis(days: int = 7, username: str = Depends(get_current_user)
 def get_team_health_report(username: str = Depends(get_current_user)):
     """Returns team health data correlating mood with velocity."""
     try:
-        employees = list(employees_collection.find({}, {"_id": 0}))
-        four_weeks_ago = (datetime.now() - timedelta(weeks=4)).strftime("%Y-%m-%d")
+        employees = list_employees()
+        four_weeks_ago = datetime.now() - timedelta(weeks=4)
         mood_entries = list(mood_collection.find({"timestamp": {"$gte": four_weeks_ago}}))
         active_tasks = list(tasks_collection.find({"status": {"$ne": "done"}}))
         
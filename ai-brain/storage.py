@@ -0,0 +1,71 @@
+import os
+from pymongo import MongoClient
+from db_indexes import ensure_time_series, ensure_indexes, backfill_keys
+
+# ==========================================
+# 🗄️ STORAGE BACKENDS
+# ==========================================
+# The API only ever touches collections handed out by a Storage. "mongo" is the real
+# server; "memory" is an in-process mongomock database (same pymongo API, no server)
+# for benchmarks and load tests that should measure Python-side hot paths without
+# database latency. Pick one with STORAGE_BACKEND=mongo|memory.
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "mongo")
+
+class Storage:
+    """A database plus the setup it needs before serving requests."""
+    backend = "mongo"
+
+    def __init__(self, client, db_name: str):
+        self.client = client
+        self.db = client[db_name]
+
+    def collection(self, name: str):
+        return self.db[name]
+
+    def prepare(self):
+        """Checks the connection, creates time-series collections and indexes, backfills lookup keys."""
+        self.client.admin.command("ping")
+        ensure_time_series(self.db)  # Before any insert can implicitly create them as regular collections
+        ensure_indexes(self.db)
+        backfill_keys(self.db)
+
+    def drop(self):
+        self.client.drop_database(self.db.name)
+
+class MongoStorage(Storage):
+    def __init__(self, uri: str, db_name: str, **client_options):
+        super().__init__(MongoClient(uri, **client_options), db_name)
+
+class MemoryStorage(Storage):
+    """In-process stand-in. Data lives only as long as the process."""
+    backend = "memory"
+
+    def __init__(self, db_name: str):
+        try:
+            import mongomock
+        except ImportError:
+            raise RuntimeError("STORAGE_BACKEND=memory needs mongomock (pip install mongomock)")
+        super().__init__(mongomock.MongoClient(), db_name)
+
+    def prepare(self):
+        # No server: nothing to ping, no time-series buckets. Indexes still enforce uniqueness.
+        ensure_indexes(self.db)
+        backfill_keys(self.db)
+
+def open_storage(uri: str, db_name: str, backend: str = None, **client_options) -> Storage:
+    backend = backend or STORAGE_BACKEND
+    if backend == "memory":
+        return MemoryStorage(db_name)
+    if backend != "mongo":
+        raise ValueError(f"Unknown STORAGE_BACKEND '{backend}' (expected 'mongo' or 'memory')")
+    return MongoStorage(uri, db_name, **client_options)
+
+if __name__ == "__main__":
+    # Smoke check: python storage.py [mongo|memory] — opens the backend and runs its startup setup
+    import sys
+    from dotenv import load_dotenv
+    load_dotenv()
+    backend = sys.argv[1] if len(sys.argv) >= 2 else None
+    storage = open_storage(os.getenv("MONGO_URI", "mongodb://localhost:27017"), os.getenv("MONGO_DB_NAME", "ai_project_manager"), backend)
+    storage.prepare()
+    print(f"✅ SUCCESS: {storage.backend} storage prepared")
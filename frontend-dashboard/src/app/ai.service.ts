@@ -1,8 +1,8 @@
 import { Inject, Injectable, PLATFORM_ID } from '@angular/core';
 import { isPlatformBrowser } from '@angular/common';
 import { HttpClient, HttpHeaders } from '@angular/common/http';
-import { Observable, tap, of } from 'rxjs';
-import { delay } from 'rxjs/operators';
+import { Observable, tap, of, EMPTY } from 'rxjs';
+import { delay, expand, reduce } from 'rxjs/operators';
 import { environment } from '../environments/environment';
 
 @Injectable({ providedIn: 'root' })
@@ -19,7 +19,7 @@ export class AiService {
     this.isBrowser = isPlatformBrowser(platformId);
   }
 
-  getDashboardData(): Observable<any> {
+  getDashboardData(forceRefresh: boolean = false): Observable<any> {
     if (this.USE_MOCK) {
       return of({
         tasks_due: 5, overdue: 2, active_agents: 11, resolved_risks: 15,
@@ -37,7 +37,38 @@ export class AiService {
         ]
       }).pipe(delay(500));
     }
-    return this.http.get<any>(`${this.apiUrl}/dashboard/data`, this.getAuthOptions());
+    const url = forceRefresh ? `${this.apiUrl}/dashboard/data?refresh=true` : `${this.apiUrl}/dashboard/data`;
+    return this.http.get<any>(url, this.getAuthOptions());
+  }
+
+  // One dashboard widget (counters, sidebar, line-chart, donut, finance, workload, burndown)
+  getDashboardWidget(widget: string, forceRefresh: boolean = false): Observable<any> {
+    if (this.USE_MOCK) {
+      return this.getDashboardData();
+    }
+    const url = forceRefresh ? `${this.apiUrl}/dashboard/widgets/${widget}?refresh=true` : `${this.apiUrl}/dashboard/widgets/${widget}`;
+    return this.http.get<any>(url, this.getAuthOptions());
+  }
+
+  // 📡 Live dashboard deltas over Server-Sent Events. EventSource resends Last-Event-ID
+  // on reconnect, so the server replays whatever was missed.
+  streamDashboard(): Observable<{ event: string; data: any }> {
+    return new Observable(observer => {
+      if (this.USE_MOCK || !this.isBrowser) return;
+      const token = localStorage.getItem(this.tokenKey) || '';
+      const source = new EventSource(`${this.apiUrl}/dashboard/stream?token=${encodeURIComponent(token)}`);
+      ['delta', 'risks', 'reset'].forEach(event =>
+        source.addEventListener(event, (e: MessageEvent) => observer.next({ event, data: JSON.parse(e.data) }))
+      );
+      return () => source.close();
+    });
+  }
+
+  getDashboardProfile(): Observable<any> {
+    if (this.USE_MOCK) {
+      return of({ user_display_name: 'Project Manager', user_role: 'admin' });
+    }
+    return this.http.get<any>(`${this.apiUrl}/dashboard/profile`, this.getAuthOptions());
   }
   
   // ==========================================
@@ -129,7 +160,8 @@ export class AiService {
         { role: 'assistant', content: 'How can I help you manage your project today?' }
       ]).pipe(delay(500));
     }
-    return this.http.get<any[]>(`${this.apiUrl}/chat/history/${sessionId}`, this.getAuthOptions());
+    // Pages run newest → oldest, so each older page goes in front
+    return this.getAllPages<any>(`${this.apiUrl}/chat/history/${sessionId}`, {}, true);
   }
 
   uploadFile(file: File): Observable<any> {
@@ -164,7 +196,7 @@ export class AiService {
         { name: 'John Doe', role: 'Lead Dev', skills: ['Angular', 'Python'], email: 'john@nexus.com', rate: 95 }
       ]).pipe(delay(400));
     }
-    return this.http.get<any[]>(`${this.apiUrl}/employees`, this.getAuthOptions()); 
+    return this.getAllPages<any>(`${this.apiUrl}/employees`); 
   }
   
   addEmployee(name: string, role: string, skills: string[], email: string, rate: number): Observable<any> {
@@ -277,12 +309,10 @@ export class AiService {
 
   getTasks(storyId?: string, epicId?: string): Observable<any[]> {
     if (this.USE_MOCK) return of([]).pipe(delay(300));
-    let url = `${this.apiUrl}/tasks`;
-    const params: string[] = [];
-    if (storyId) params.push(`story_id=${storyId}`);
-    if (epicId) params.push(`epic_id=${epicId}`);
-    if (params.length) url += '?' + params.join('&');
-    return this.http.get<any[]>(url, this.getAuthOptions());
+    const params: Record<string, string> = {};
+    if (storyId) params['story_id'] = storyId;
+    if (epicId) params['epic_id'] = epicId;
+    return this.getAllPages<any>(`${this.apiUrl}/tasks`, params);
   }
 
   createTask(task: any): Observable<any> {
@@ -298,6 +328,24 @@ export class AiService {
     return this.http.get<any[]>(`${this.apiUrl}/work-breakdown`, this.getAuthOptions());
   }
 
+  // 🌲 Lazy backlog tree: epics first, children a page at a time on expand
+  getBacklogEpics(cursor?: string): Observable<any> {
+    if (this.USE_MOCK) return of({ epics: [], next_cursor: null, totals: { epics: 0, stories: 0, tasks: 0, points: 0 } }).pipe(delay(300));
+    return this.http.get<any>(`${this.apiUrl}/work-breakdown/epics`, { ...this.getAuthOptions(), params: cursor ? { cursor } : {} });
+  }
+
+  getEpicStories(epicId: string, cursor?: string): Observable<any> {
+    return this.http.get<any>(`${this.apiUrl}/work-breakdown/epics/${epicId}/stories`, { ...this.getAuthOptions(), params: cursor ? { cursor } : {} });
+  }
+
+  getEpicTasks(epicId: string, cursor?: string): Observable<any> {
+    return this.http.get<any>(`${this.apiUrl}/work-breakdown/epics/${epicId}/tasks`, { ...this.getAuthOptions(), params: cursor ? { cursor } : {} });
+  }
+
+  getStoryTasks(storyId: string, cursor?: string): Observable<any> {
+    return this.http.get<any>(`${this.apiUrl}/work-breakdown/stories/${storyId}/tasks`, { ...this.getAuthOptions(), params: cursor ? { cursor } : {} });
+  }
+
   // ==========================================
   // 🎙️ MEETINGS & PRE-MORTEM AI (SPRINT 3)
   // ==========================================
@@ -313,7 +361,7 @@ export class AiService {
 
   getRiskRegister(projectId: string = 'default'): Observable<any[]> {
     if (this.USE_MOCK) return of([]).pipe(delay(300));
-    return this.http.get<any[]>(`${this.apiUrl}/risk-register?project_id=${projectId}`, this.getAuthOptions());
+    return this.getAllPages<any>(`${this.apiUrl}/risk-register`, { project_id: projectId });
   }
 
   updateRisk(id: string, data: any): Observable<any> {
@@ -332,9 +380,13 @@ export class AiService {
   // ==========================================
   // 📊 GANTT CHART
   // ==========================================
-  getGanttData(): Observable<any> {
+  // start/end (YYYY-MM-DD) limit the payload to the visible window; zoom 'week' returns per-epic weekly bars
+  getGanttData(start?: string, end?: string, zoom: 'day' | 'week' = 'day'): Observable<any> {
     if (this.USE_MOCK) return of({ tasks: [], total: 0 }).pipe(delay(300));
-    return this.http.get<any>(`${this.apiUrl}/gantt-data`, this.getAuthOptions());
+    const params: any = { zoom };
+    if (start) params.start = start;
+    if (end) params.end = end;
+    return this.http.get<any>(`${this.apiUrl}/gantt-data`, { ...this.getAuthOptions(), params });
   }
 
   // ==========================================
@@ -374,6 +426,26 @@ export class AiService {
   // ==========================================
   // 🔧 HELPER
   // ==========================================
+  // List endpoints return one page (max 200) and the next page's cursor in X-Next-Cursor;
+  // follow it to the end so views that expect the full list still get it.
+  private getAllPages<T>(url: string, params: Record<string, string> = {}, prepend: boolean = false): Observable<T[]> {
+    const page = (cursor?: string) => this.http.get<T[]>(url, {
+      ...this.getAuthOptions(),
+      observe: 'response' as const,
+      params: { ...params, limit: '200', ...(cursor ? { cursor } : {}) }
+    });
+    return page().pipe(
+      expand(res => {
+        const next = res.headers.get('X-Next-Cursor');
+        return next ? page(next) : EMPTY;
+      }),
+      reduce((all: T[], res) => {
+        const items = Array.isArray(res.body) ? res.body : [];
+        return prepend ? [...items, ...all] : [...all, ...items];
+      }, [] as T[])
+    );
+  }
+
   private getAuthOptions() {
     if (!this.isBrowser) return {};
     const token = localStorage.getItem(this.tokenKey);
@@ -31,6 +31,7 @@ export class BacklogComponent implements OnInit {
   totalStories = 0;
   totalTasks = 0;
   totalPoints = 0;
+  epicsCursor: string | null = null;
 
   constructor(private aiService: AiService) {}
 
@@ -41,36 +42,81 @@ export class BacklogComponent implements OnInit {
 
   loadTree() {
     this.isLoading = true;
-    this.aiService.getWorkBreakdown().subscribe({
-      next: (data: any[]) => {
-        this.tree = data;
-        this.calculateStats();
+    this.expandedStories.clear();
+    this.aiService.getBacklogEpics().subscribe({
+      next: (data: any) => {
+        this.tree = data.epics.map((e: any) => this.asEpicNode(e));
+        this.epicsCursor = data.next_cursor;
+        this.applyTotals(data.totals);
         this.isLoading = false;
-        // Auto-expand all epics if few
-        if (data.length <= 5) {
-          data.forEach(e => this.expandedEpics.add(e.id));
+        // Keep open epics open across reloads; auto-expand all epics if few
+        for (const epic of this.tree) {
+          if (this.tree.length <= 5 || this.expandedEpics.has(epic.id)) {
+            this.expandedEpics.add(epic.id);
+            this.loadEpicChildren(epic);
+          }
         }
       },
       error: () => { this.isLoading = false; }
     });
   }
 
-  calculateStats() {
-    this.totalEpics = this.tree.length;
-    this.totalStories = 0;
-    this.totalTasks = 0;
-    this.totalPoints = 0;
-    for (const epic of this.tree) {
-      for (const story of epic.stories || []) {
-        if (story.type === 'story') {
-          this.totalStories++;
-          this.totalPoints += story.story_points || 0;
-          this.totalTasks += (story.tasks || []).length;
-        } else {
-          this.totalTasks++; // Direct tasks under epic
-        }
-      }
+  loadMoreEpics() {
+    if (!this.epicsCursor) return;
+    this.aiService.getBacklogEpics(this.epicsCursor).subscribe((data: any) => {
+      this.tree.push(...data.epics.map((e: any) => this.asEpicNode(e)));
+      this.epicsCursor = data.next_cursor;
+    });
+  }
+
+  private asEpicNode(epic: any) {
+    // Children are fetched on expand; cursors track the next page of each list
+    return { ...epic, stories: [], loaded: false, storiesCursor: null, tasksCursor: null };
+  }
+
+  applyTotals(totals: any) {
+    if (!totals) return;
+    this.totalEpics = totals.epics;
+    this.totalStories = totals.stories;
+    this.totalTasks = totals.tasks;
+    this.totalPoints = totals.points;
+  }
+
+  loadEpicChildren(epic: any) {
+    epic.loaded = true;
+    this.aiService.getEpicStories(epic.id).subscribe((data: any) => {
+      epic.stories.unshift(...data.stories.map((s: any) => ({ ...s, tasks: [], loaded: false, tasksCursor: null })));
+      epic.storiesCursor = data.next_cursor;
+    });
+    this.aiService.getEpicTasks(epic.id).subscribe((data: any) => {
+      epic.stories.push(...data.tasks);
+      epic.tasksCursor = data.next_cursor;
+    });
+  }
+
+  loadMoreEpicChildren(epic: any) {
+    if (epic.storiesCursor) {
+      this.aiService.getEpicStories(epic.id, epic.storiesCursor).subscribe((data: any) => {
+        const firstTask = epic.stories.findIndex((n: any) => n.type === 'task');
+        const stories = data.stories.map((s: any) => ({ ...s, tasks: [], loaded: false, tasksCursor: null }));
+        epic.stories.splice(firstTask === -1 ? epic.stories.length : firstTask, 0, ...stories);
+        epic.storiesCursor = data.next_cursor;
+      });
     }
+    if (epic.tasksCursor) {
+      this.aiService.getEpicTasks(epic.id, epic.tasksCursor).subscribe((data: any) => {
+        epic.stories.push(...data.tasks);
+        epic.tasksCursor = data.next_cursor;
+      });
+    }
+  }
+
+  loadStoryTasks(story: any) {
+    story.loaded = true;
+    this.aiService.getStoryTasks(story.id, story.tasksCursor || undefined).subscribe((data: any) => {
+      story.tasks.push(...data.tasks);
+      story.tasksCursor = data.next_cursor;
+    });
   }
 
   toggleEpic(epicId: string) {
@@ -78,14 +124,17 @@ export class BacklogComponent implements OnInit {
       this.expandedEpics.delete(epicId);
     } else {
       this.expandedEpics.add(epicId);
+      const epic = this.tree.find(e => e.id === epicId);
+      if (epic && !epic.loaded) this.loadEpicChildren(epic);
     }
   }
 
-  toggleStory(storyId: string) {
-    if (this.expandedStories.has(storyId)) {
-      this.expandedStories.delete(storyId);
+  toggleStory(story: any) {
+    if (this.expandedStories.has(story.id)) {
+      this.expandedStories.delete(story.id);
     } else {
-      this.expandedStories.add(storyId);
+      this.expandedStories.add(story.id);
+      if (!story.loaded) this.loadStoryTasks(story);
     }
   }
 
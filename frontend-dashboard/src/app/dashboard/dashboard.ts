@@ -1,7 +1,8 @@
 import { CommonModule } from '@angular/common';
 import { FormsModule } from '@angular/forms';
 import { Chart, registerables, ChartConfiguration, ChartOptions } from 'chart.js';
-import { Component, OnInit, Output, EventEmitter, ViewChild, ElementRef, AfterViewInit } from '@angular/core';
+import { Component, OnInit, OnDestroy, Output, EventEmitter, ViewChild, ElementRef, AfterViewInit } from '@angular/core';
+import { Subscription } from 'rxjs';
 import { AiService } from '../ai.service';
 import { ChangeDetectorRef } from '@angular/core';
 
@@ -15,7 +16,7 @@ Chart.register(...registerables);
   templateUrl: './dashboard.html',
   styleUrls: ['./dashboard.css']
 })
-export class DashboardComponent implements OnInit, AfterViewInit {
+export class DashboardComponent implements OnInit, AfterViewInit, OnDestroy {
   @Output() navigate = new EventEmitter<string>();
   @ViewChild('lineCanvas', { static: false }) lineCanvas!: ElementRef<HTMLCanvasElement>;
   @ViewChild('donutCanvas', { static: false }) donutCanvas!: ElementRef<HTMLCanvasElement>;
@@ -37,9 +38,14 @@ stats: any = {
   team_workload: [],
   burn_percentage: 0,
   burndown_chart: null,
+  cumulative_flow: null,
   user_role: 'developer'
 };
   isPM = false;
+  generatedAt: string | null = null;  // When the server-side snapshot was built
+  isRefreshing = false;
+  private streamSub?: Subscription;  // Live deltas from /dashboard/stream
+  showFlow = false;  // Burndown card: false = burndown, true = cumulative flow
   financeData: any[] = [];
   recentMeetings: any[] = [];
   scopeHealth: any = null;
@@ -67,6 +73,11 @@ stats: any = {
     this.loadTrelloLink();
     this.loadProjects();
     this.loadSprint3Data();
+    this.streamSub = this.aiService.streamDashboard().subscribe(msg => this.onStreamEvent(msg));
+  }
+
+  ngOnDestroy(): void {
+    this.streamSub?.unsubscribe();
   }
 
   ngAfterViewInit(): void {
@@ -74,66 +85,120 @@ stats: any = {
     this.initCharts();
   }
 
-  // 🚀 NEW FUNCTION: Bridges Frontend to Backend
-  loadRealData() {
-  this.aiService.getDashboardData().subscribe({
-    next: (data: any) => {
-      console.log('✅ Dashboard Data Received:', data);
-
-      // 1. Map all individual stats for HTML display
-      this.stats = {
-        tasks_due: data.tasks_due,
-        overdue: data.overdue,
-        active: data.active,
-        resolved_risks: data.resolved_risks,
-        total_team: data.total_team,
-        in_progress: data.in_progress,
-        not_started: data.not_started,
-        total_budget: data.total_budget,
-        current_project: data.current_project,
-        recent_projects: data.recent_projects,
-        user_display_name: data.user_display_name,
-        team_workload: data.team_workload || [],
-        burn_percentage: data.burn_percentage || 0,
-        burndown_chart: data.burndown_chart || null,
-        user_role: data.user_role || 'developer'
-      };
-      this.isPM = (data.user_role === 'pm' || data.user_role === 'admin');
-
-      this.financeData = data.finance_table;
-
-      // Update Burndown Chart
-      if (data.burndown_chart && this.burndownChart) {
-        this.burndownChart.data.labels = data.burndown_chart.labels;
-        this.burndownChart.data.datasets[0].data = data.burndown_chart.planned;
-        this.burndownChart.data.datasets[1].data = data.burndown_chart.actual;
-        this.burndownChart.update();
-      }
-
-      // 2. Update Line Chart (Curved lines logic)
-      if (this.lineChart && data.line_chart) {
-        data.line_chart.datasets.forEach((dataset: any) => {
-          dataset.tension = 0.4; // 🔥 Smooth curves
-          dataset.borderWidth = 3;
-          dataset.pointRadius = 4;
-        });
-        this.lineChart.data = data.line_chart;
-        this.lineChart.update();
-      }
+  // 🚀 Each widget is fetched on its own, so a slow upstream only delays its own card
+  readonly DASHBOARD_WIDGETS = ['counters', 'sidebar', 'line-chart', 'donut', 'finance', 'workload', 'burndown'];
 
-      // 3. Update Donut Chart (Segments logic)
-      if (this.donutChart) {
-        this.donutChart.data.datasets[0].data = [
-          data.resolved_risks, 
-          data.in_progress, 
-          data.not_started
-        ];
-        this.donutChart.update();
-      }
+  loadRealData(forceRefresh: boolean = false) {
+  this.aiService.getDashboardProfile().subscribe({
+    next: (profile: any) => {
+      this.stats = { ...this.stats, ...profile };
+      this.isPM = (profile.user_role === 'pm' || profile.user_role === 'admin');
       this.cdr.detectChanges();
     },
-    error: (err: any) => console.error('❌ Failed to fetch backend data:', err)
+    error: (err: any) => console.error('❌ Failed to fetch dashboard profile:', err)
   });
+
+  let pending = this.DASHBOARD_WIDGETS.length;
+  this.DASHBOARD_WIDGETS.forEach(widget => {
+    this.aiService.getDashboardWidget(widget, forceRefresh).subscribe({
+      next: (data: any) => this.applyWidget(widget, data),
+      error: (err: any) => console.error(`❌ Failed to fetch dashboard widget '${widget}':`, err)
+    }).add(() => {
+      if (--pending === 0) {
+        this.isRefreshing = false;
+        this.cdr.detectChanges();
+      }
+    });
+  });
+}
+
+// 📡 Snapshot field → widget that renders it
+private readonly FIELD_WIDGETS: { [field: string]: string } = {
+  line_chart: 'line-chart', donut_chart: 'donut', finance_table: 'finance',
+  burndown_chart: 'burndown', cumulative_flow: 'burndown'
+};
+
+onStreamEvent(msg: { event: string; data: any }) {
+  if (msg.event === 'reset') {
+    this.loadRealData();
+    return;
+  }
+  if (msg.event !== 'delta') return;
+
+  const { changed = {}, points = {}, generated_at } = msg.data;
+  // Patch chart points in place, then re-render like any other changed field
+  Object.entries(points).forEach(([field, list]: [string, any]) => {
+    const chart = this.stats[field];
+    if (!chart) return;
+    list.forEach(([ds, i, value]: [number, number, any]) => chart.datasets[ds].data[i] = value);
+    changed[field] = chart;
+  });
+  Object.entries(changed).forEach(([field, value]) =>
+    this.applyWidget(this.FIELD_WIDGETS[field] || 'counters', { [field]: value, generated_at })
+  );
+}
+
+applyWidget(widget: string, data: any) {
+  const { generated_at, ...fields } = data;
+  this.stats = { ...this.stats, ...fields };
+
+  if (widget === 'counters') {
+    this.generatedAt = generated_at || null;
+  } else if (widget === 'finance') {
+    this.financeData = data.finance_table || [];
+  } else if (widget === 'burndown') {
+    this.renderBurndown();
+  } else if (widget === 'line-chart' && this.lineChart && data.line_chart) {
+    data.line_chart.datasets.forEach((dataset: any) => {
+      dataset.tension = 0.4; // 🔥 Smooth curves
+      dataset.borderWidth = 3;
+      dataset.pointRadius = 4;
+    });
+    this.lineChart.data = data.line_chart;
+    this.lineChart.update();
+  } else if (widget === 'donut' && this.donutChart && data.donut_chart) {
+    this.donutChart.data.datasets[0].data = data.donut_chart.datasets[0].data;
+    this.donutChart.update();
+  }
+  this.cdr.detectChanges();
+}
+
+// 🔄 PM-only: rebuild the server-side snapshot instead of reading the cached one
+refreshDashboard() {
+  this.isRefreshing = true;
+  this.loadRealData(true);
+}
+
+toggleFlow() {
+  this.showFlow = !this.showFlow;
+  this.renderBurndown();
+}
+
+renderBurndown() {
+  if (!this.burndownChart) return;
+  const burndown = this.stats.burndown_chart;
+  const flow = this.stats.cumulative_flow;
+
+  if (this.showFlow && flow) {
+    this.burndownChart.data.labels = flow.labels;
+    this.burndownChart.data.datasets = flow.datasets.map((d: any) => ({
+      ...d,
+      backgroundColor: d.borderColor + '33',
+      tension: 0.3,
+      borderWidth: 2,
+      pointRadius: 0,
+      fill: true
+    }));
+    (this.burndownChart.options.scales as any).y.stacked = true;
+  } else if (burndown) {
+    this.burndownChart.data.labels = burndown.labels;
+    this.burndownChart.data.datasets = [
+      { label: 'Planned', data: burndown.planned, borderColor: '#6C5DD3', backgroundColor: 'rgba(108,93,211,0.08)', tension: 0.4, borderWidth: 2, pointRadius: 3, fill: true },
+      { label: 'Actual', data: burndown.actual, borderColor: '#FF754C', backgroundColor: 'rgba(255,117,76,0.08)', tension: 0.4, borderWidth: 2, pointRadius: 3, borderDash: [5, 3], fill: true }
+    ];
+    (this.burndownChart.options.scales as any).y.stacked = false;
+  }
+  this.burndownChart.update();
 }
 
 
@@ -38,6 +38,9 @@ export class TimelineComponent implements OnInit, AfterViewInit {
   isLoading = true;
   isBrowser: boolean;
   zoomLevel = 1;  // 1 = day, 2 = half-day
+  weekView = false;  // Server-aggregated bars: one per epic per week
+  windowStart = this.daysFromToday(-14);  // Only this window is fetched from the server
+  windowWeeks = 10;
   filterEpic = '';
   epics: string[] = [];
   hoveredTask: GanttTask | null = null;
@@ -72,7 +75,8 @@ export class TimelineComponent implements OnInit, AfterViewInit {
 
   loadData() {
     this.isLoading = true;
-    this.aiService.getGanttData().subscribe({
+    const windowEnd = new Date(this.windowStart.getTime() + this.windowWeeks * 7 * 86400000);
+    this.aiService.getGanttData(this.toIsoDate(this.windowStart), this.toIsoDate(windowEnd), this.weekView ? 'week' : 'day').subscribe({
       next: (data: any) => {
         this.tasks = data.tasks || [];
         this.totalTasks = data.total || 0;
@@ -85,10 +89,28 @@ export class TimelineComponent implements OnInit, AfterViewInit {
     });
   }
 
-  computeDateRange() {
+  private daysFromToday(days: number): Date {
     const now = new Date();
-    let min = new Date(now.getFullYear(), now.getMonth(), now.getDate() - 3);
-    let max = new Date(now.getFullYear(), now.getMonth(), now.getDate() + 21);
+    return new Date(now.getFullYear(), now.getMonth(), now.getDate() + days);
+  }
+
+  private toIsoDate(d: Date): string {
+    return `${d.getFullYear()}-${String(d.getMonth() + 1).padStart(2, '0')}-${String(d.getDate()).padStart(2, '0')}`;
+  }
+
+  shiftWindow(weeks: number) {
+    this.windowStart = new Date(this.windowStart.getTime() + weeks * 7 * 86400000);
+    this.loadData();
+  }
+
+  toggleWeekView() {
+    this.weekView = !this.weekView;
+    this.loadData();
+  }
+
+  computeDateRange() {
+    let min = new Date(this.windowStart);
+    let max = new Date(this.windowStart.getTime() + this.windowWeeks * 7 * 86400000);
 
     for (const t of this.tasks) {
       if (t.start_date) {